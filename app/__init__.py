@@ -2,10 +2,14 @@ from flask import Flask
 from config import Config
 from .extensions import db, migrate, jwt, cors, CustomJSONProvider
 from .routes import register_routes
+from .utils.cache import init_cache
+from .middleware.auth_middleware import register_password_reset_guard
 import logging 
 from flask import jsonify
 from flasgger import Swagger
 from app.tasks.scheduler import start_scheduler
+from app.tasks.job_runner import start_job_workers
+from app.tasks.notification_outbox import start_outbox_workers
 
 def setup_roles_on_startup(app):
     """Automatically setup roles when the app starts."""
@@ -52,9 +56,12 @@ def create_app(config_object=None):
     # cors.init_app(app)
     cors.init_app(app, resources={r"/*": {"origins": "*"}})
     app.json_encoder = CustomJSONProvider(app)
+    init_cache(app)
 
     setup_roles_on_startup(app)
     start_scheduler()
+    start_job_workers(app)
+    start_outbox_workers(app)
 
 
      # Initialize Swagger
@@ -104,6 +111,7 @@ def create_app(config_object=None):
 
     # register routes/blueprints
     register_routes(app)
+    register_password_reset_guard(app)
 
      # -------------------------------
     # 💠 Base route for your brand
@@ -1,15 +1,174 @@
+import hashlib
+from datetime import datetime
+from sqlalchemy import bindparam, select, text, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
 from ..extensions import db
 from ..models import Attendance
+from ..models.attendance import NATURAL_KEY_ELEMENTS
+from ..utils import attendance_rollups
+from ..utils.csv_import import IMPORT_BATCH_SIZE, import_csv_rows
+from ..utils.periods import period_start
+from .attendance_monitor_controller import invalidate_monitor_summary
+
+# -----------------------------
+# NATURAL-KEY UPSERT
+# -----------------------------
+
+NATURAL_KEY_FIELDS = ("service_type", "year", "month", "week", "state_id", "region_id",
+                      "old_group_id", "group_id", "district_id")
+
+
+class DuplicateAttendanceError(ValueError):
+    """An update would move a record onto the natural key of another existing record."""
+
+
+class InvalidAttendanceError(ValueError):
+    """An update breaks another database constraint (a required field set to null, an unknown hierarchy id)."""
+
+
+def _is_natural_key_violation(error):
+    """True if an IntegrityError comes from uq_attendance_natural_key rather than another constraint."""
+    # psycopg2 names the constraint; SQLite only lists the columns of the unique index
+    constraint = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    if constraint:
+        return constraint == "uq_attendance_natural_key"
+    message = str(error.orig)
+    return "uq_attendance_natural_key" in message or message.startswith("UNIQUE constraint failed: attendance.")
+
+
+# Values a new row gets when the caller leaves them out
+ATTENDANCE_DEFAULTS = {
+    "old_group_id": None,
+    "group_id": None,
+    "district_id": None,
+    **{field: 0 for field in attendance_rollups.COUNT_FIELDS},
+}
+
+
+def natural_key(values):
+    """The uq_attendance_natural_key value of a row dict (NULL ids count as 0, like the index)."""
+    return tuple(values.get(field) or 0 if field.endswith("_id") else values.get(field)
+                 for field in NATURAL_KEY_FIELDS)
+
+
+def _natural_key_lock_id(key):
+    """A stable signed 64-bit id for a natural key, for pg_advisory_xact_lock."""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def lock_natural_keys(keys):
+    """
+    Make concurrent writers of the same natural keys (upserts, edits, deletes)
+    wait for each other until commit, so each one reads the counts it replaces
+    after the previous writer is done. Postgres takes transaction-scoped
+    advisory locks in id order (no deadlocks between batches); other backends
+    rely on the FOR UPDATE read in _existing_by_natural_key.
+    """
+    if not keys or db.session.get_bind().dialect.name != "postgresql":
+        return
+    lock_ids = sorted({_natural_key_lock_id(key) for key in keys})
+    db.session.execute(
+        text("SELECT pg_advisory_xact_lock(k) FROM unnest(CAST(:ids AS bigint[])) AS k ORDER BY k"),
+        {"ids": lock_ids},
+    )
+
+
+def _existing_by_natural_key(keys):
+    """Current rows for the given natural keys, as {key: row dict} - one query."""
+    periods = {(key[1], key[2]) for key in keys}
+    state_ids = {key[4] for key in keys}
+    columns = [Attendance.id, *[getattr(Attendance, f) for f in NATURAL_KEY_FIELDS],
+               *[getattr(Attendance, f) for f in attendance_rollups.COUNT_FIELDS]]
+    query = select(*columns).where(
+        tuple_(Attendance.year, Attendance.month).in_(periods),
+        Attendance.state_id.in_(state_ids),
+    )
+    if db.session.get_bind().dialect.name != "postgresql":
+        query = query.order_by(Attendance.id).with_for_update()
+    rows = db.session.execute(query).all()
+
+    existing = {}
+    for row in rows:
+        values = row._asdict()
+        key = natural_key(values)
+        if key in keys:
+            existing[key] = values
+    return existing
+
+
+def upsert_attendance_rows(rows):
+    """
+    Insert rows, or overwrite the counts of rows that already exist for the same
+    natural key, keeping the rollup table in step. Does not commit.
+    Later rows win over earlier ones with the same key, so the counts are of
+    distinct rows written. Returns (inserted, updated).
+    """
+    latest = {natural_key(values): values for values in rows}
+    # 🎯 Read the counts being replaced only once no other writer can change them
+    lock_natural_keys(latest.keys())
+    existing = _existing_by_natural_key(latest.keys())
+    rows = list(latest.values())
+    table = Attendance.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(NATURAL_KEY_ELEMENTS),
+            set_={
+                **{field: stmt.excluded[field] for field in attendance_rollups.COUNT_FIELDS},
+                "updated_at": datetime.utcnow(),
+            },
+        )
+        db.session.execute(stmt, rows)
+    else:
+        # No native upsert - update the rows we found, insert the rest
+        updates = [{**values, "_id": existing[key]["id"]} for key, values in latest.items() if key in existing]
+        inserts = [values for key, values in latest.items() if key not in existing]
+        if updates:
+            db.session.execute(
+                table.update().where(table.c.id == bindparam("_id")).values(
+                    {field: bindparam(field) for field in attendance_rollups.COUNT_FIELDS}
+                ),
+                updates,
+            )
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+
+    # Replace each overwritten row's contribution with the new counts
+    attendance_rollups.apply_snapshots(
+        [attendance_rollups.snapshot(values) for values in existing.values()], sign=-1
+    )
+    attendance_rollups.add_records(rows)
+    return len(latest) - len(existing), len(existing)
+
+
+def find_by_natural_key(values):
+    return Attendance.query.filter_by(
+        **{field: values.get(field) for field in NATURAL_KEY_FIELDS}
+    ).first()
+
 
 def create_attendance(data):
-    attendance = Attendance(**data)
-    db.session.add(attendance)
+    """Create the record for this entity/service/week, or update the existing one in place."""
+    values = {**ATTENDANCE_DEFAULTS, **data}
+    # Keep the rollup table in the same transaction as the raw row
+    upsert_attendance_rows([values])
     db.session.commit()
-    return attendance
+    invalidate_monitor_summary(values["year"], values["month"])
+    return find_by_natural_key(values)
 
 
-def get_all_attendance(service_type=None, state_id=None, region_id=None, district_id=None, 
-                      group_id=None, old_group_id=None, year=None, month=None):
+def build_attendance_query(service_type=None, state_id=None, region_id=None, district_id=None,
+                           group_id=None, old_group_id=None, year=None, month=None,
+                           period_from=None, period_to=None):
+    """
+    Build the filtered attendance query without executing it.
+    period_from / period_to are month-start dates bounding period_start (inclusive).
+    """
     query = Attendance.query
 
     print(f"🔍 [ATTENDANCE CONTROLLER] Building query with filters:")
@@ -36,12 +195,85 @@ def get_all_attendance(service_type=None, state_id=None, region_id=None, distric
         query = query.filter_by(year=year)
     if month:
         query = query.filter_by(month=month)
+    if period_from:
+        query = query.filter(Attendance.period_start >= period_from)
+    if period_to:
+        query = query.filter(Attendance.period_start <= period_to)
+
+    return query
+
+
+def get_all_attendance(service_type=None, state_id=None, region_id=None, district_id=None, 
+                      group_id=None, old_group_id=None, year=None, month=None,
+                      period_from=None, period_to=None):
+    query = build_attendance_query(
+        service_type=service_type,
+        state_id=state_id,
+        region_id=region_id,
+        district_id=district_id,
+        group_id=group_id,
+        old_group_id=old_group_id,
+        year=year,
+        month=month,
+        period_from=period_from,
+        period_to=period_to
+    )
     
     results = query.all()
     print(f"🔍 [ATTENDANCE CONTROLLER] Query returned {len(results)} records")
     
     return results
 
+
+def _keyset_page(query, after_id, limit):
+    """Fetch one page of `query` ordered by id, starting after `after_id`."""
+    query = query.order_by(Attendance.id)
+    if after_id is not None:
+        query = query.filter(Attendance.id > after_id)
+
+    # Fetch one extra row to know whether another page exists
+    records = query.limit(limit + 1).all()
+    next_cursor = records[limit - 1].id if len(records) > limit else None
+    return records[:limit], next_cursor
+
+
+def get_attendance_page(after_id=None, limit=100, **filters):
+    """
+    Keyset pagination on attendance.id.
+    Returns (records, next_cursor); next_cursor is None on the last page.
+    """
+    return _keyset_page(build_attendance_query(**filters), after_id, limit)
+
+
+def iter_attendance(batch_size=1000, **filters):
+    """Yield matching attendance records in id order, one keyset batch at a time."""
+    query = build_attendance_query(**filters)
+    after_id = None
+    while True:
+        records, after_id = _keyset_page(query, after_id, batch_size)
+        for record in records:
+            yield record
+        if after_id is None:
+            break
+
+
+# Columns of an attendance export - the CSV upload columns, plus id
+EXPORT_FIELDS = (
+    "id", "service_type", "state_id", "region_id", "old_group_id", "group_id", "district_id",
+    "year", "month", "week", "men", "women", "youth_boys", "youth_girls", "children_boys", "children_girls",
+)
+
+
+def iter_attendance_rows(batch_size=1000, **filters):
+    """
+    Yield EXPORT_FIELDS tuples for matching records in id order, streamed
+    from a server-side cursor `batch_size` rows at a time (no ORM objects).
+    """
+    columns = [getattr(Attendance, field) for field in EXPORT_FIELDS]
+    query = build_attendance_query(**filters).with_entities(*columns).order_by(Attendance.id)
+    for row in query.yield_per(batch_size):
+        yield tuple(row)
+
 # def get_all_attendance(service_type=None, state_id=None, region_id=None, district_id=None, 
 #                       group_id=None, old_group_id=None, year=None, month=None):
 #     query = Attendance.query
@@ -69,19 +301,110 @@ def get_all_attendance(service_type=None, state_id=None, region_id=None, distric
 def get_attendance_by_id(attendance_id):
     return Attendance.query.get(attendance_id)
 
+def _get_attendance_for_update(attendance_id, data=None):
+    """
+    Load a record locked against concurrent edits and deletes, with its natural
+    key - and the one `data` moves it to - locked against concurrent upserts.
+    Returns None if the record doesn't exist.
+    """
+    attendance = db.session.get(Attendance, attendance_id)
+    locked_key = None
+    while attendance is not None:
+        current = {field: getattr(attendance, field) for field in NATURAL_KEY_FIELDS}
+        # Stop once the locked key is still the record's key (another edit may have moved it meanwhile)
+        if natural_key(current) == locked_key:
+            break
+        locked_key = natural_key(current)
+        lock_natural_keys([locked_key, natural_key({**current, **(data or {})})])
+        attendance = db.session.get(Attendance, attendance_id, with_for_update=True, populate_existing=True)
+    return attendance
+
 def update_attendance(attendance_id, data):
-    attendance = Attendance.query.get(attendance_id)
+    attendance = _get_attendance_for_update(attendance_id, data)
     if not attendance:
         return None
-    for key, value in data.items():
-        setattr(attendance, key, value)
-    db.session.commit()
+    before = attendance_rollups.snapshot(attendance)
+    try:
+        for key, value in data.items():
+            setattr(attendance, key, value)
+        attendance.period_start = period_start(attendance.year, attendance.month)
+        # Move the record's contribution from its old rollup keys to the new ones
+        attendance_rollups.apply_snapshots([before], sign=-1)
+        attendance_rollups.add_records([attendance])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if _is_natural_key_violation(e):
+            # The new entity / service / week is already taken by another record
+            raise DuplicateAttendanceError(
+                "An attendance record for this entity, service type and week already exists"
+            )
+        raise InvalidAttendanceError(f"Invalid attendance data: {str(e.orig).splitlines()[0]}")
+    invalidate_monitor_summary(before["year"], before["month"])
+    invalidate_monitor_summary(attendance.year, attendance.month)
     return attendance
 
 def delete_attendance(attendance_id):
-    attendance = Attendance.query.get(attendance_id)
+    attendance = _get_attendance_for_update(attendance_id)
     if attendance:
+        attendance_rollups.remove_records([attendance])
         db.session.delete(attendance)
         db.session.commit()
+        invalidate_monitor_summary(attendance.year, attendance.month)
         return True
-    return False
\ No newline at end of file
+    return False
+
+# -----------------------------
+# BULK CSV IMPORT
+# -----------------------------
+
+# Required integer columns of an attendance CSV row
+CSV_INT_FIELDS = (
+    "state_id", "region_id", "week", "year",
+    "men", "women", "youth_boys", "youth_girls", "children_boys", "children_girls",
+)
+
+# Optional hierarchy columns - blank means "not set"
+CSV_OPTIONAL_ID_FIELDS = ("district_id", "group_id", "old_group_id")
+
+
+def parse_attendance_row(row):
+    """
+    Convert one CSV row (dict of strings) into Attendance column values.
+    Raises KeyError for a missing column and ValueError for a bad value.
+    """
+    values = {
+        "service_type": row["service_type"],
+        "month": row["month"],
+    }
+    for field in CSV_INT_FIELDS:
+        values[field] = int(row[field])
+    for field in CSV_OPTIONAL_ID_FIELDS:
+        raw = row.get(field)
+        values[field] = int(raw) if raw and raw.strip() else None
+    return values
+
+
+def import_attendance_rows(rows, partial=False, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Validate and insert attendance rows from any iterable of CSV dicts.
+    See `import_csv_rows` for the strict / partial modes and the report format.
+    """
+    periods = set()
+
+    def insert_batch(batch):
+        # Re-uploaded rows overwrite their earlier version instead of duplicating it
+        periods.update((values["year"], values["month"]) for values in batch)
+        return upsert_attendance_rows(batch)
+
+    try:
+        report = import_csv_rows(rows, parse_attendance_row, insert_batch,
+                                 partial=partial, batch_size=batch_size, progress=progress)
+    finally:
+        # Partial imports may have committed batches before failing
+        for year, month in periods:
+            invalidate_monitor_summary(year, month)
+
+    print(f"📥 Imported {report['inserted']} attendance records "
+          f"({report['updated']} updated in place, {report['error_count']} rejected)")
+    return report
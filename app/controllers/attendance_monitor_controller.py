@@ -1,103 +1,171 @@
 from app.models import State, Region, District, Group, OldGroup, Attendance
 from app.utils.attendance_monitor import get_attendance_status
-from sqlalchemy import func, case
+from sqlalchemy import func, case, literal, select, tuple_, union_all
 from datetime import datetime
+from flask import current_app
 from ..extensions import db
+from ..utils.cache import get_cache
 
-def get_attendance_monitor_summary():
-    current_year = datetime.now().year
-    current_month = datetime.now().strftime('%B')  # e.g., "November"
-    
-    # Get all attendance data in ONE query
-    attendance_data = db.session.query(
-        Attendance.state_id,
-        Attendance.region_id, 
-        Attendance.district_id,
-        Attendance.group_id,
-        Attendance.old_group_id,
-        func.max(Attendance.week).label('last_week')
-    ).filter(
-        Attendance.year == current_year,
-        Attendance.month == current_month
-    ).group_by(
-        Attendance.state_id,
-        Attendance.region_id,
-        Attendance.district_id, 
-        Attendance.group_id,
-        Attendance.old_group_id
-    ).all()
-    
-    # Convert to dictionaries for fast lookup
-    state_weeks = {}
-    region_weeks = {}
-    district_weeks = {}
-    group_weeks = {}
-    old_group_weeks = {}
-    
-    for record in attendance_data:
-        if record.state_id:
-            state_weeks[record.state_id] = record.last_week
-        if record.region_id:
-            region_weeks[record.region_id] = record.last_week
-        if record.district_id:
-            district_weeks[record.district_id] = record.last_week
-        if record.group_id:
-            group_weeks[record.group_id] = record.last_week
-        if record.old_group_id:
-            old_group_weeks[record.old_group_id] = record.last_week
+
+def _monitor_version_key(year, month):
+    return f"monitor_version:{year}:{month}"
+
+
+def _monitor_summary_key(year, month, scope):
+    version = get_cache().get(_monitor_version_key(year, month)) or 0
+    return f"monitor_summary:{year}:{month}:v{version}:{scope}"
+
+
+def invalidate_monitor_summary(year, month):
+    """Bump the period's version so every cached summary for it is skipped."""
+    if year is None or not month:
+        return
+    get_cache().incr(_monitor_version_key(year, month))
+
+
+def get_cached_monitor_summary(year=None, month=None, scope="all", builder=None):
+    """
+    Return the monitor summary for (year, month, scope) from the cache,
+    building and storing it on a miss. Defaults to the current month.
+    """
+    year = year or datetime.now().year
+    month = month or datetime.now().strftime('%B')
+    builder = builder or (lambda: build_attendance_monitor_summary(year, month))
+
+    cache = get_cache()
+    key = _monitor_summary_key(year, month, scope)
+    summary = cache.get(key)
+    if summary is None:
+        summary = builder()
+        cache.set(key, summary, ttl=current_app.config.get("MONITOR_CACHE_TTL", 300))
+    return summary
+
+
+# Summary key -> hierarchy model listed under it
+SUMMARY_MODELS = {
+    "states": State,
+    "regions": Region,
+    "districts": District,
+    "groups": Group,
+    "old_groups": OldGroup,
+}
+
+# Scope level -> {summary key: column on that key's model matched against the scope id}.
+# Summary keys missing from a scope are returned empty.
+MONITOR_SCOPES = {
+    "state": {"states": "id", "regions": "state_id", "districts": "state_id", "groups": "state_id", "old_groups": "state_id"},
+    "region": {"regions": "id", "districts": "region_id", "groups": "region_id", "old_groups": "region_id"},
+    "district": {"districts": "id"},
+    "group": {"groups": "id"},
+    "old_group": {"old_groups": "id", "groups": "old_group_id"},
+}
+
+
+# Summary key -> Attendance column carrying that level's id
+LEVEL_COLUMNS = {
+    "states": Attendance.state_id,
+    "regions": Attendance.region_id,
+    "districts": Attendance.district_id,
+    "groups": Attendance.group_id,
+    "old_groups": Attendance.old_group_id,
+}
+
+
+def get_last_weeks_by_level(year, month, scope_level=None, scope_id=None):
+    """
+    Max week per entity for every hierarchy level in a single query.
+    Returns {"states": {state_id: week}, "regions": {...}, ...}.
+
+    Each level is grouped on its own column, so a state's value is the max
+    over all of its rows rather than whichever (state, region, ...) group
+    happened to come last. PostgreSQL does this with GROUPING SETS in one
+    scan; other databases (SQLite) get a UNION ALL of per-level GROUP BYs.
+    """
+    conditions = [Attendance.year == year, Attendance.month == month]
+    if scope_level is not None:
+        conditions.append(getattr(Attendance, f"{scope_level}_id") == scope_id)
+
+    level_weeks = {key: {} for key in LEVEL_COLUMNS}
+    keys = list(LEVEL_COLUMNS)
+    columns = list(LEVEL_COLUMNS.values())
+
+    if db.engine.dialect.name == "postgresql":
+        # GROUPING(c1..c5) is a bitmask with a 1 for every column NOT in the
+        # row's grouping set; c1 is the most significant bit.
+        grouping_mask = {
+            (2 ** len(columns) - 1) ^ (1 << (len(columns) - 1 - i)): key
+            for i, key in enumerate(keys)
+        }
+        rows = db.session.query(
+            *columns,
+            func.grouping(*columns).label('grouping_mask'),
+            func.max(Attendance.week).label('last_week')
+        ).filter(*conditions).group_by(
+            func.grouping_sets(*[tuple_(column) for column in columns])
+        ).all()
+
+        for row in rows:
+            key = grouping_mask[row.grouping_mask]
+            entity_id = row[keys.index(key)]
+            if entity_id is not None:
+                level_weeks[key][entity_id] = row.last_week
+        return level_weeks
+
+    per_level = [
+        select(
+            literal(key).label('level'),
+            column.label('entity_id'),
+            func.max(Attendance.week).label('last_week')
+        ).where(*conditions, column.isnot(None)).group_by(column)
+        for key, column in LEVEL_COLUMNS.items()
+    ]
+    for row in db.session.execute(union_all(*per_level)):
+        level_weeks[row.level][row.entity_id] = row.last_week
+    return level_weeks
+
+
+def get_attendance_monitor_summary(year=None, month=None, scope_level=None, scope_id=None):
+    """
+    Monitor summary for the whole hierarchy, or only the subtree under
+    (scope_level, scope_id) - e.g. ("region", 3) - when a scope is given.
+    """
+    if scope_level is None:
+        return get_cached_monitor_summary(year, month)
+
+    return get_cached_monitor_summary(
+        year, month,
+        scope=f"{scope_level}:{scope_id}",
+        builder=lambda: build_attendance_monitor_summary(year, month, scope_level, scope_id)
+    )
+
+
+def build_attendance_monitor_summary(year=None, month=None, scope_level=None, scope_id=None):
+    current_year = year or datetime.now().year
+    current_month = month or datetime.now().strftime('%B')  # e.g., "November"
     
-    summary = {
-        "states": [],
-        "regions": [],
-        "districts": [],
-        "groups": [],
-        "old_groups": []
-    }
-
-    # STATES - Single query
-    states = State.query.all()
-    summary["states"] = [{
-        "id": state.id,
-        "name": state.name,
-        "last_filled_week": state_weeks.get(state.id, 0),
-        "status": get_attendance_status(state_weeks.get(state.id, 0))
-    } for state in states]
-
-    # REGIONS - Single query  
-    regions = Region.query.all()
-    summary["regions"] = [{
-        "id": region.id,
-        "name": region.name,
-        "last_filled_week": region_weeks.get(region.id, 0),
-        "status": get_attendance_status(region_weeks.get(region.id, 0))
-    } for region in regions]
-
-    # DISTRICTS - Single query
-    districts = District.query.all()
-    summary["districts"] = [{
-        "id": district.id,
-        "name": district.name,
-        "last_filled_week": district_weeks.get(district.id, 0),
-        "status": get_attendance_status(district_weeks.get(district.id, 0))
-    } for district in districts]
-
-    # GROUPS - Single query
-    groups = Group.query.all()
-    summary["groups"] = [{
-        "id": group.id,
-        "name": group.name,
-        "last_filled_week": group_weeks.get(group.id, 0),
-        "status": get_attendance_status(group_weeks.get(group.id, 0))
-    } for group in groups]
-
-    # OLD GROUPS - Single query
-    old_groups = OldGroup.query.all()
-    summary["old_groups"] = [{
-        "id": old_group.id,
-        "name": old_group.name,
-        "last_filled_week": old_group_weeks.get(old_group.id, 0),
-        "status": get_attendance_status(old_group_weeks.get(old_group.id, 0))
-    } for old_group in old_groups]
+    # Last filled week per entity at every level, in ONE round trip
+    level_weeks = get_last_weeks_by_level(current_year, current_month, scope_level, scope_id)
+
+    summary = {}
+    scope_columns = MONITOR_SCOPES[scope_level] if scope_level is not None else None
+
+    for key, model in SUMMARY_MODELS.items():
+        if scope_columns is not None and key not in scope_columns:
+            summary[key] = []
+            continue
+
+        # Only id/name are needed - skip loading full rows
+        entities = db.session.query(model.id, model.name)
+        if scope_columns is not None:
+            entities = entities.filter(getattr(model, scope_columns[key]) == scope_id)
+
+        weeks = level_weeks[key]
+        summary[key] = [{
+            "id": entity.id,
+            "name": entity.name,
+            "last_filled_week": weeks.get(entity.id, 0),
+            "status": get_attendance_status(weeks.get(entity.id, 0))
+        } for entity in entities.all()]
 
     return summary
 
@@ -1,72 +1,111 @@
+from sqlalchemy import func, select
 from app.utils.notification_service import notification_service
-from app.utils.attendance_monitor import get_last_attendance_week, get_attendance_status
-from app.models import User
+from app.utils.attendance_monitor import CURRENT_YEAR, CURRENT_MONTH, get_attendance_status
+from app.models import User, Role, Attendance
+from app.models.user import user_roles
 from app.models.hierarchy import State, Region, District, Group, OldGroup
+from ..extensions import db
 
-def send_manual_reminders(entity_type, methods=['email', 'whatsapp']):
+# Entity type -> (hierarchy model, Attendance column, User column, admin role names for that level)
+REMINDER_LEVELS = {
+    "state": (State, Attendance.state_id, User.state_id, ("State Admin",)),
+    "region": (Region, Attendance.region_id, User.region_id, ("Region Admin",)),
+    "district": (District, Attendance.district_id, User.district_id, ("District Admin",)),
+    "group": (Group, Attendance.group_id, User.group_id, ("Group Admin",)),
+    # Both spellings of the old group role are in use
+    "old_group": (OldGroup, Attendance.old_group_id, User.old_group_id, ("Old Group Admin", "Old_Group Admin")),
+}
+
+
+def get_reminder_recipients(entity_type, entity_id=None):
+    """
+    Admins responsible for every entity at `entity_type` level (or just
+    `entity_id`), each with that entity's last filled week this month.
+    Returns [(user, last_week)] from a single query: the max week per
+    entity is aggregated once and joined to the admins through their
+    hierarchy link and role, so the cost no longer grows with the user count.
+    """
+    Model, attendance_column, user_column, role_names = REMINDER_LEVELS[entity_type]
+
+    conditions = [Attendance.year == CURRENT_YEAR, Attendance.month == CURRENT_MONTH]
+    if entity_id is not None:
+        conditions.append(attendance_column == entity_id)
+    last_weeks = select(
+        attendance_column.label("entity_id"),
+        func.max(Attendance.week).label("last_week")
+    ).where(*conditions).group_by(attendance_column).subquery()
+
+    admins_with_role = select(user_roles.c.user_id).join(
+        Role, Role.id == user_roles.c.role_id
+    ).where(Role.name.in_(role_names))
+
+    query = db.session.query(
+        User, func.coalesce(last_weeks.c.last_week, 0)
+    ).join(
+        Model, Model.id == user_column
+    ).outerjoin(
+        last_weeks, last_weeks.c.entity_id == Model.id
+    ).filter(
+        User.id.in_(admins_with_role),
+        User.is_active.isnot(False)
+    )
+    if entity_id is not None:
+        query = query.filter(Model.id == entity_id)
+
+    return [(user, last_week) for user, last_week in query.order_by(User.id).all()]
+
+
+def send_manual_reminders(entity_type, methods=['email', 'whatsapp'], created_by=None):
     """
     entity_type: state / region / district / group / old_group
     methods: list of notification methods ['email', 'whatsapp']
+
+    Reminds the admins of every entity at that level whose attendance isn't
+    up to date. Reminders are queued on the notification outbox and sent by
+    its workers; failed_list holds users with no address for any requested method.
     """
     
     failed_list = []
     notification_results = []
 
-    users = User.query.all()
-
-    for user in users:
-        last_week = get_last_attendance_week(entity_type, user.state_id)
-
-        if last_week == 0 or get_attendance_status(last_week) != "green":
-            results = notification_service.send_attendance_reminder(
-                user=user,
-                week=last_week,
-                methods=methods
-            )
-            
-            notification_results.append({
-                'user': user.email,
-                'results': results
-            })
-            
-            # If both methods failed, add to failed list
-            if not results['email_sent'] and not results['whatsapp_sent']:
-                failed_list.append(user.email)
+    # Work out who needs a reminder first, then queue them all in one go
+    reminders = [
+        (user, last_week)
+        for user, last_week in get_reminder_recipients(entity_type)
+        if last_week == 0 or get_attendance_status(last_week) != "green"
+    ]
+
+    queued = notification_service.queue_attendance_reminders(reminders, methods=methods, created_by=created_by)
+
+    for (user, _), results in zip(reminders, queued):
+        notification_results.append({
+            'user': user.email,
+            'results': results
+        })
+
+        # Nothing could be queued for this user
+        if not results['email_queued'] and not results['whatsapp_queued']:
+            failed_list.append(user.email)
 
     return {
         'failed_list': failed_list,
         'notification_results': notification_results
     }
 
-def send_targeted_reminders(entity_type, entity_id, methods=['email', 'whatsapp']):
-    model_map = {
-        "state": State,
-        "region": Region,
-        "district": District,
-        "group": Group,
-        "old_group": OldGroup,
-    }
-
-    Model = model_map[entity_type]
+def send_targeted_reminders(entity_type, entity_id, methods=['email', 'whatsapp'], created_by=None):
+    Model = REMINDER_LEVELS[entity_type][0]
     entity = Model.query.get(entity_id)
 
     if not entity:
         return []
 
-    admin_users = entity.admins  # Get user objects instead of just emails
-    notification_results = []
-    
-    for user in admin_users:
-        results = notification_service.send_attendance_reminder(
-            user=user,
-            week=get_last_attendance_week(entity_type, user.state_id),
-            methods=methods
-        )
-        
-        notification_results.append({
-            'user': user.email,
-            'results': results
-        })
+    reminders = get_reminder_recipients(entity_type, entity.id)
+    queued = notification_service.queue_attendance_reminders(reminders, methods=methods, created_by=created_by)
+
+    notification_results = [
+        {'user': user.email, 'results': results}
+        for (user, _), results in zip(reminders, queued)
+    ]
 
     return notification_results
 
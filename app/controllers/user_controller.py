@@ -2,8 +2,10 @@ from flask import request, jsonify
 
 from app.models.hierarchy import Group, OldGroup
 from ..extensions import db
+from sqlalchemy.orm import selectinload
 from ..models import User, Role
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.principal import get_current_principal
 
 
 
@@ -97,8 +99,7 @@ def create_user():
         description: Insufficient permissions
     """
     data = request.get_json()
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_principal()
 
     # Required fields
     email = data.get("email")
@@ -503,8 +504,9 @@ def list_users():
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 50, type=int), 100)  # Max 100 per page
     
-    # Optimized query with eager loading
-    users_query = User.query.options(db.joinedload(User.roles))
+    # Optimized query with eager loading - selectinload keeps the page LIMIT
+    # on the users query and fetches every page's roles in one extra query
+    users_query = User.query.options(selectinload(User.roles)).order_by(User.id)
     
     paginated_users = users_query.paginate(
         page=page, 
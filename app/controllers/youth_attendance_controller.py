@@ -1,5 +1,7 @@
 from ..extensions import db
 from ..models import YouthAttendance
+from ..utils.csv_import import IMPORT_BATCH_SIZE, import_csv_rows
+from ..utils.periods import period_start
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,7 +34,12 @@ def create_youth_attendance(data):
 
 #     return query.all()
 
-def get_all_youth_attendance(attendance_type=None, state_id=None, region_id=None, district_id=None, year=None, month=None):
+def build_youth_attendance_query(attendance_type=None, state_id=None, region_id=None, district_id=None,
+                                 year=None, month=None, period_from=None, period_to=None):
+    """
+    Build the filtered youth attendance query without executing it.
+    period_from / period_to are month-start dates bounding period_start (inclusive).
+    """
     query = YouthAttendance.query
 
     print(f"🔍 [CONTROLLER] Building query with filters:")
@@ -61,6 +68,28 @@ def get_all_youth_attendance(attendance_type=None, state_id=None, region_id=None
     if month:
         query = query.filter_by(month=month)
         print(f"   ✅ Applied month filter: {month}")
+    if period_from:
+        query = query.filter(YouthAttendance.period_start >= period_from)
+        print(f"   ✅ Applied period_from filter: {period_from}")
+    if period_to:
+        query = query.filter(YouthAttendance.period_start <= period_to)
+        print(f"   ✅ Applied period_to filter: {period_to}")
+
+    return query
+
+
+def get_all_youth_attendance(attendance_type=None, state_id=None, region_id=None, district_id=None, year=None, month=None,
+                             period_from=None, period_to=None):
+    query = build_youth_attendance_query(
+        attendance_type=attendance_type,
+        state_id=state_id,
+        region_id=region_id,
+        district_id=district_id,
+        year=year,
+        month=month,
+        period_from=period_from,
+        period_to=period_to,
+    )
 
     results = query.all()
     print(f"🔍 [CONTROLLER] Query returned {len(results)} records")
@@ -68,6 +97,25 @@ def get_all_youth_attendance(attendance_type=None, state_id=None, region_id=None
     return results
 
 
+# Columns of a youth attendance export - both weekly and revival fields, plus id
+EXPORT_FIELDS = (
+    "id", "attendance_type", "state_id", "region_id", "district_id", "group_id", "old_group_id",
+    "year", "month", "week", "member_boys", "member_girls", "visitor_boys", "visitor_girls",
+    "period", "male", "female", "testimony", "challenges", "solutions", "remarks",
+)
+
+
+def iter_youth_attendance_rows(batch_size=1000, **filters):
+    """
+    Yield EXPORT_FIELDS tuples for matching records in id order, streamed
+    from a server-side cursor `batch_size` rows at a time (no ORM objects).
+    """
+    columns = [getattr(YouthAttendance, field) for field in EXPORT_FIELDS]
+    query = build_youth_attendance_query(**filters).with_entities(*columns).order_by(YouthAttendance.id)
+    for row in query.yield_per(batch_size):
+        yield tuple(row)
+
+
 def get_youth_attendance_by_id(record_id):
     return YouthAttendance.query.get(record_id)
 
@@ -78,6 +126,7 @@ def update_youth_attendance(record_id, data):
         return None
     for key, value in data.items():
         setattr(obj, key, value)
+    obj.period_start = period_start(obj.year, obj.month)
     db.session.commit()
     return obj
 
@@ -89,3 +138,61 @@ def delete_youth_attendance(record_id):
         db.session.commit()
         return True
     return False
+
+
+# -----------------------------
+# BULK CSV IMPORT
+# -----------------------------
+
+def parse_youth_row(row, attendance_type):
+    """
+    Convert one CSV row (dict of strings) into YouthAttendance column values.
+    Raises KeyError for a missing column and ValueError for a bad value.
+    """
+    base = {
+        "attendance_type": attendance_type,
+        "state_id": int(row["state_id"]),
+        "region_id": int(row["region_id"]),
+        "district_id": int(row["district_id"]),
+        "group_id": int(row["group_id"]) if row.get("group_id") else None,
+        "old_group_id": int(row["old_group_id"]) if row.get("old_group_id") else None,
+        "year": int(row["year"]),
+        "month": row["month"],
+    }
+
+    if attendance_type == "weekly":
+        base.update({
+            "week": int(row.get("week") or 0),
+            "member_boys": int(row.get("member_boys") or 0),
+            "member_girls": int(row.get("member_girls") or 0),
+            "visitor_boys": int(row.get("visitor_boys") or 0),
+            "visitor_girls": int(row.get("visitor_girls") or 0),
+        })
+    else:  # revival
+        base.update({
+            "male": int(row.get("male") or 0),
+            "female": int(row.get("female") or 0),
+            "testimony": row.get("testimony"),
+            "challenges": row.get("challenges"),
+            "solutions": row.get("solutions"),
+            "remarks": row.get("remarks"),
+        })
+    return base
+
+
+def import_youth_rows(rows, attendance_type, partial=False, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Validate and insert youth attendance rows from any iterable of CSV dicts.
+    See `import_csv_rows` for the strict / partial modes and the report format.
+    """
+    def insert_batch(batch):
+        # Core executemany - every row of one upload has the same keys
+        db.session.execute(YouthAttendance.__table__.insert(), batch)
+
+    report = import_csv_rows(
+        rows, lambda row: parse_youth_row(row, attendance_type), insert_batch,
+        partial=partial, batch_size=batch_size, progress=progress,
+        missing_message="Missing column: {}", invalid_message="Invalid value: {}",
+    )
+    logger.info(f"Imported {report['inserted']} youth attendance records ({report['error_count']} rejected)")
+    return report
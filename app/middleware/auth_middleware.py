@@ -1,7 +1,16 @@
 from functools import wraps
 from flask import request, jsonify
-from ..models import User
-from ..extensions import db
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from ..utils.principal import get_principal, get_current_principal
+
+# Endpoints a user with must_reset_password can still reach
+PASSWORD_RESET_ALLOWED_ENDPOINTS = {
+    "auth.login",
+    "auth.refresh",
+    "auth.me",
+    "profile_bp.get_profile",
+    "profile_bp.change_password",
+}
 
 def require_permission(permission_code):
     """Decorator to check if a user has a given permission code."""
@@ -14,20 +23,37 @@ def require_permission(permission_code):
             if not user_id:
                 return jsonify({"error": "Unauthorized"}), 401
 
-            user = db.session.get(User, user_id)
+            user = get_principal(user_id)
             if not user or not user.is_active:
                 return jsonify({"error": "User not found or inactive"}), 403
 
-            # Collect permissions
-            user_permissions = set()
-            for role in user.roles:
-                for perm in role.permissions:
-                    user_permissions.add(perm.code)
-
             # Check if permission is allowed
-            if permission_code not in user_permissions:
+            if not user.has_permission(permission_code):
                 return jsonify({"error": "Forbidden"}), 403
 
             return f(*args, **kwargs)
         return wrapper
     return decorator
+
+
+def register_password_reset_guard(app):
+    """Block every other endpoint for users who must change their default password first."""
+
+    @app.before_request
+    def require_password_reset():
+        if request.method == "OPTIONS" or request.endpoint in PASSWORD_RESET_ALLOWED_ENDPOINTS:
+            return None
+        try:
+            verify_jwt_in_request(optional=True)
+        except Exception:
+            return None  # missing/invalid tokens are reported by the route's own jwt_required
+        if get_jwt_identity() is None:
+            return None
+
+        user = get_current_principal()
+        if user and user.must_reset_password:
+            return jsonify({
+                "error": "You must change your password before continuing",
+                "must_reset_password": True,
+            }), 403
+        return None
@@ -2,7 +2,12 @@
 from .user import User, Role, Permission, user_roles, role_permissions
 # from .state import State
 from .attendance import Attendance
+from .attendance_rollup import AttendanceRollup
 from .hierarchy import State, Region, District, Group, OldGroup
+from .hierarchy_closure import HierarchyClosure
+from .hierarchy_version import HierarchyVersion
+from .import_job import ImportJob
+from .outbound_notification import OutboundNotification
 # youth attendance model
 from .youth_attendance import YouthAttendance
 # from .service import Service
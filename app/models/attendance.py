@@ -1,8 +1,21 @@
 from ..extensions import db
+from ..utils.periods import period_start_default
 from datetime import datetime
 
 class Attendance(db.Model):
     __tablename__ = "attendance"
+    # 🎯 Reads filter one hierarchy level for a (year, month) and take the
+    # latest week, so each hierarchy column leads an index ending in the period
+    __table_args__ = (
+        db.Index("ix_attendance_period", "year", "month", "week"),
+        db.Index("ix_attendance_state_period", "state_id", "year", "month", "week"),
+        db.Index("ix_attendance_region_period", "region_id", "year", "month", "week"),
+        db.Index("ix_attendance_old_group_period", "old_group_id", "year", "month", "week"),
+        db.Index("ix_attendance_group_period", "group_id", "year", "month", "week"),
+        db.Index("ix_attendance_district_period", "district_id", "year", "month", "week"),
+        # 🎯 Date ranges across months ("last 12 weeks", "Q3") and chronological order
+        db.Index("ix_attendance_period_start", "period_start", "week"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     service_type = db.Column(db.String(50), nullable=False)  # e.g. 'Sunday Worship Service'
@@ -17,6 +30,8 @@ class Attendance(db.Model):
     # Attendance data
     month = db.Column(db.String(20), nullable=False)
     week = db.Column(db.Integer, nullable=False)
+    # First day of (year, month), derived on insert so ranges can use an index
+    period_start = db.Column(db.Date, nullable=True, default=period_start_default)
     men = db.Column(db.Integer, default=0)
     women = db.Column(db.Integer, default=0)
     youth_boys = db.Column(db.Integer, default=0)
@@ -46,6 +61,7 @@ class Attendance(db.Model):
             "old_group_id": self.old_group_id,
             "month": self.month,
             "week": self.week,
+            "period_start": self.period_start.isoformat() if self.period_start else None,
             "men": self.men,
             "women": self.women,
             "youth_boys": self.youth_boys,
@@ -55,3 +71,21 @@ class Attendance(db.Model):
             "year": self.year,
             "created_at": self.created_at.isoformat(),
         }
+
+
+# Natural key: one row per reporting entity, service and week. The nullable
+# hierarchy columns are coalesced so that rows without a district/group/old
+# group still collide (plain NULLs are always distinct in a unique index).
+NATURAL_KEY_ELEMENTS = (
+    Attendance.service_type,
+    Attendance.year,
+    Attendance.month,
+    Attendance.week,
+    Attendance.state_id,
+    Attendance.region_id,
+    db.func.coalesce(Attendance.old_group_id, db.literal_column("0")),
+    db.func.coalesce(Attendance.group_id, db.literal_column("0")),
+    db.func.coalesce(Attendance.district_id, db.literal_column("0")),
+)
+
+db.Index("uq_attendance_natural_key", *NATURAL_KEY_ELEMENTS, unique=True)
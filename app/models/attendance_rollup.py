@@ -0,0 +1,58 @@
+from ..extensions import db
+from datetime import datetime
+
+
+class AttendanceRollup(db.Model):
+    """Pre-aggregated attendance totals per hierarchy entity and period.
+
+    One row per (level, entity_id, year, month, week, service_type), where
+    `level` is one of 'state', 'region', 'old_group', 'group', 'district'
+    and `entity_id` is the id of that State/Region/OldGroup/Group/District.
+    Rows are kept in step with the raw `attendance` table by
+    `app.utils.attendance_rollups` inside the same transaction as each write.
+    """
+
+    __tablename__ = "attendance_rollups"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "level", "entity_id", "year", "month", "week", "service_type",
+            name="uq_attendance_rollup_key"
+        ),
+        db.Index("ix_attendance_rollup_level_period", "level", "year", "month"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    level = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.String(20), nullable=False)
+    week = db.Column(db.Integer, nullable=False)
+    service_type = db.Column(db.String(50), nullable=False)
+
+    # Summed attendance data
+    men = db.Column(db.Integer, nullable=False, default=0)
+    women = db.Column(db.Integer, nullable=False, default=0)
+    youth_boys = db.Column(db.Integer, nullable=False, default=0)
+    youth_girls = db.Column(db.Integer, nullable=False, default=0)
+    children_boys = db.Column(db.Integer, nullable=False, default=0)
+    children_girls = db.Column(db.Integer, nullable=False, default=0)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "level": self.level,
+            "entity_id": self.entity_id,
+            "year": self.year,
+            "month": self.month,
+            "week": self.week,
+            "service_type": self.service_type,
+            "men": self.men,
+            "women": self.women,
+            "youth_boys": self.youth_boys,
+            "youth_girls": self.youth_girls,
+            "children_boys": self.children_boys,
+            "children_girls": self.children_girls,
+            "record_count": self.record_count,
+        }
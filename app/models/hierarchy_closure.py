@@ -0,0 +1,32 @@
+from ..extensions import db
+
+
+class HierarchyClosure(db.Model):
+    """Closure table over the State → Region → OldGroup → Group → District tree.
+
+    One row per (ancestor, descendant) pair, including each node paired with
+    itself at depth 0. Levels use the same names as attendance rollups:
+    'state', 'region', 'old_group', 'group', 'district'.
+    Rows are kept in step with the hierarchy tables by
+    `app.utils.hierarchy_closure` whenever hierarchy objects are flushed.
+    """
+
+    __tablename__ = "hierarchy_closure"
+    __table_args__ = (
+        db.Index("ix_hierarchy_closure_descendant", "descendant_level", "descendant_id"),
+    )
+
+    ancestor_level = db.Column(db.String(20), primary_key=True)
+    ancestor_id = db.Column(db.Integer, primary_key=True)
+    descendant_level = db.Column(db.String(20), primary_key=True)
+    descendant_id = db.Column(db.Integer, primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            "ancestor_level": self.ancestor_level,
+            "ancestor_id": self.ancestor_id,
+            "descendant_level": self.descendant_level,
+            "descendant_id": self.descendant_id,
+            "depth": self.depth,
+        }
@@ -0,0 +1,19 @@
+from ..extensions import db
+from datetime import datetime
+
+
+class HierarchyVersion(db.Model):
+    """Single-row change counter for the State → Region → OldGroup → Group → District tree.
+
+    `app.utils.hierarchy_snapshot` bumps `version` in the same transaction as
+    every hierarchy write and compares it on each request, so the in-process
+    snapshots of every worker see a committed change straight away.
+    """
+
+    __tablename__ = "hierarchy_version"
+
+    ROW_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
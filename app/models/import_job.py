@@ -0,0 +1,63 @@
+from ..extensions import db
+from datetime import datetime
+
+
+class ImportJob(db.Model):
+    """A queued background import (hierarchy workbook, states, attendance or youth CSV).
+
+    The table doubles as the job queue: workers in `app.tasks.job_runner`
+    claim 'queued' rows with a conditional UPDATE, so any number of app
+    processes can share it. `processed` / `total` report progress while the
+    job runs and `result` holds the import report once it has finished.
+    """
+
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        db.Index("ix_import_jobs_status_created", "status", "created_at"),
+    )
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    file_path = db.Column(db.String(500), nullable=True)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def to_dict(self):
+        percent = None
+        if self.total:
+            percent = round(min(self.processed, self.total) * 100.0 / self.total, 1)
+        elif self.status == self.SUCCEEDED:
+            percent = 100.0
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "progress": {"processed": self.processed, "total": self.total, "percent": percent},
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_by": self.created_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
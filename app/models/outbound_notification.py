@@ -0,0 +1,64 @@
+from ..extensions import db
+from datetime import datetime
+
+
+class OutboundNotification(db.Model):
+    """One email or WhatsApp message waiting to go out (or already sent).
+
+    The table is the notification outbox: requests only insert rows, and the
+    workers in `app.tasks.notification_outbox` claim due 'pending' rows in
+    batches, deliver them and record the outcome. Failed sends go back to
+    'pending' with an exponentially later `next_attempt_at`; once
+    OUTBOX_MAX_ATTEMPTS is used up the row stays as a 'dead' letter with its
+    last error, until an admin retries it. A send that timed out after the
+    request went out is parked as 'unknown' instead of being retried, since
+    the recipient may already have it; an admin decides whether to resend.
+
+    `payload` holds what the channel needs: {"subject", "template_name",
+    "context"} for email, {"message"} for WhatsApp.
+    """
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        db.Index("ix_notification_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+    UNKNOWN = "unknown"
+
+    EMAIL = "email"
+    WHATSAPP = "whatsapp"
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), nullable=False)
+    recipient = db.Column(db.String(255), nullable=False)  # email address or phone number
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "channel": self.channel,
+            "recipient": self.recipient,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "user_id": self.user_id,
+            "created_by": self.created_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+        }
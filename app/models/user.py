@@ -23,6 +23,8 @@ class User(db.Model):
     phone = db.Column(db.String(20), nullable=True)  # ✅ NEW FIELD
     password_hash = db.Column(db.String(255), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    # 🎯 Set on bulk-created accounts that share the default password; cleared by set_password
+    must_reset_password = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     # Hierarchy links
     state_id = db.Column(db.Integer, db.ForeignKey("states.id"), nullable=True)
@@ -39,6 +41,7 @@ class User(db.Model):
 
     def set_password(self, password: str):
         self.password_hash = generate_password_hash(password)
+        self.must_reset_password = False
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
@@ -73,6 +76,7 @@ class User(db.Model):
             "name": self.name,
             "phone": self.phone,
             "is_active": self.is_active,
+            "must_reset_password": bool(self.must_reset_password),
             "roles": [r.name for r in self.roles],
             "state_id": self.state_id,
             "region_id": self.region_id,
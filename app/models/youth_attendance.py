@@ -1,4 +1,5 @@
 from ..extensions import db
+from ..utils.periods import period_start_default
 from datetime import datetime
 
 
@@ -18,6 +19,14 @@ class YouthAttendance(db.Model):
     """
 
     __tablename__ = "youth_attendance"
+    # 🎯 Listings filter by attendance type or one hierarchy level, then the period
+    __table_args__ = (
+        db.Index("ix_youth_attendance_type_period", "attendance_type", "year", "month"),
+        db.Index("ix_youth_attendance_state_period", "state_id", "year", "month"),
+        db.Index("ix_youth_attendance_region_period", "region_id", "year", "month"),
+        db.Index("ix_youth_attendance_district_period", "district_id", "year", "month"),
+        db.Index("ix_youth_attendance_period_start", "period_start", "week"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     attendance_type = db.Column(db.String(50), nullable=False)  # 'weekly' | 'revival' | other
@@ -33,6 +42,8 @@ class YouthAttendance(db.Model):
     year = db.Column(db.Integer, nullable=True)
     month = db.Column(db.String(20), nullable=True)
     week = db.Column(db.Integer, nullable=True)
+    # First day of (year, month), derived on insert; NULL for records without one
+    period_start = db.Column(db.Date, nullable=True, default=period_start_default)
 
     # Weekly attendance specific
     member_boys = db.Column(db.Integer, default=0)
@@ -71,6 +82,7 @@ class YouthAttendance(db.Model):
             "year": self.year,
             "month": self.month,
             "week": self.week,
+            "period_start": self.period_start.isoformat() if self.period_start else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -8,6 +8,8 @@ from .dashboard_routes import dashboard_bp
 from .admin_routes import admin_bp
 from .attendance_monitor_routes import monitor_bp
 from .profile_routes import profile_bp
+from .job_routes import job_bp
+from .notification_routes import notification_bp
 
 def register_routes(app):
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -20,3 +22,5 @@ def register_routes(app):
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(monitor_bp, url_prefix="/attendance-monitor")
     app.register_blueprint(profile_bp)
+    app.register_blueprint(job_bp, url_prefix="/jobs")
+    app.register_blueprint(notification_bp, url_prefix="/notifications")
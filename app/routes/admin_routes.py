@@ -5,15 +5,26 @@ import importlib
 # from app.utils.excel_importer import import_hierarchy_from_excel
 # Force reload the module
 # importlib.reload(utils.excel_importer)
-from app.utils.excel_importer_new import import_hierarchy_from_excel
+from flask_jwt_extended import jwt_required
+from app.models import ImportJob
 from app.utils.access_control import require_role
+from app.utils.principal import get_current_principal
+from app.tasks.job_runner import submit_job
+from app.routes.job_routes import wants_wait, job_submitted_response
 import os
-import tempfile
 
 admin_bp = Blueprint("admin_bp", __name__)
 
 
+def hierarchy_import_response(job):
+    """Inline (?wait=true) result: the importer's summary with 200, as before imports became jobs."""
+    if job.status != ImportJob.SUCCEEDED:
+        return jsonify({"error": job.error}), 400
+    return jsonify(job.result), 200
+
+
 @admin_bp.post("/import-hierarchy")
+@jwt_required(optional=True)
 def import_hierarchy():
 
     if "file" not in request.files:
@@ -26,40 +37,13 @@ def import_hierarchy():
     if not file.filename.endswith(('.xlsx', '.xls')):
         return jsonify({"error": "Only Excel files (.xlsx, .xls) are allowed"}), 400
 
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        file_path = tmp_file.name
-        file.save(file_path)
-
-    try:
-        print(f"=== Starting hierarchy import for state: {state_name} ===")
-        
-        # 🎯 Use enhanced importer with fixed state and region
-        result = import_hierarchy_from_excel(file_path, state_name)
-        
-        print(f"=== Hierarchy import completed ===")
-        
-        # Clean up
-        try:
-            os.unlink(file_path)
-        except:
-            pass
-            
-        return jsonify(result), 200
-        
-    except Exception as e:
-        print(f"=== Hierarchy import failed ===")
-        print(f"Error: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        
-        # Clean up
-        try:
-            os.unlink(file_path)
-        except:
-            pass
-            
-        return jsonify({"error": str(e)}), 400
+    # 🎯 Hand the workbook to the job workers - the request returns straight away.
+    # Record the submitter (when a token was sent) so they can poll /jobs/<id>
+    principal = get_current_principal()
+    job = submit_job("hierarchy", file=file, params={"state_name": state_name},
+                     created_by=principal.id if principal else None,
+                     suffix=os.path.splitext(file.filename)[1], wait=wants_wait(request))
+    return job_submitted_response(job, hierarchy_import_response)
 
         
     # if "file" not in request.files:
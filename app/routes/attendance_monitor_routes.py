@@ -1,15 +1,23 @@
 from flask import Blueprint, jsonify, request
 from app.controllers.attendance_monitor_controller import get_attendance_monitor_summary
 from app.controllers.reminder_controller import send_manual_reminders, send_targeted_reminders
-from app.models.hierarchy import Group, OldGroup, District, Region, State
 from app.models.user import User    
 from app.utils.access_control import require_role
+from app.utils.principal import get_current_principal
 from flasgger import swag_from
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 monitor_bp = Blueprint("monitor_bp", __name__)
 
 
+def count_queued(notification_results):
+    """Number of outbox messages queued across a reminder run's per-user results."""
+    return sum(
+        bool(entry['results']['email_queued']) + bool(entry['results']['whatsapp_queued'])
+        for entry in notification_results
+    )
+
+
 @monitor_bp.get("/monitor/attendance")
 @jwt_required()
 @swag_from({
@@ -17,6 +25,10 @@ monitor_bp = Blueprint("monitor_bp", __name__)
     "summary": "Get attendance submission summary",
     "description": "Returns a summary of which states, regions, districts, groups, and old groups have submitted or not submitted attendance.",
     "security": [{"BearerAuth": []}],
+    "parameters": [
+        {"name": "year", "in": "query", "type": "integer", "required": False, "description": "Defaults to the current year"},
+        {"name": "month", "in": "query", "type": "string", "required": False, "description": "Month name, defaults to the current month"}
+    ],
     "responses": {
         200: {
             "description": "Attendance summary data",
@@ -41,8 +53,7 @@ monitor_bp = Blueprint("monitor_bp", __name__)
     }
 })
 def attendance_monitor():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -50,163 +61,54 @@ def attendance_monitor():
     print(f"🔍 Attendance Monitor - Current user: {current_user.id}, Roles: {[r.name for r in current_user.roles]}")
     print(f"🔍 User hierarchy - State: {current_user.state_id}, Region: {current_user.region_id}, District: {current_user.district_id}, Group: {current_user.group_id}, OldGroup: {current_user.old_group_id}")
     
-    # Get the full summary first
-    full_summary = get_attendance_monitor_summary()
-    
+    year = request.args.get("year", type=int)
+    month = request.args.get("month")
+
     # Check if user is Super Admin
     user_roles = [role.name for role in current_user.roles]
     is_super_admin = "Super Admin" in user_roles
     
     if is_super_admin:
         print("🎯 Super Admin detected - returning full summary")
-        return jsonify(full_summary), 200
+        # Served from cache until attendance for the period changes
+        return jsonify(get_attendance_monitor_summary(year=year, month=month)), 200
     
-    # For non-Super Admins, filter based on hierarchy
-    print("👤 Regular admin - filtering summary based on hierarchy")
-    
-    filtered_summary = {
-        "states": [],
-        "regions": [],
-        "districts": [],
-        "groups": [],
-        "old_groups": []
-    }
+    # For non-Super Admins, summarise only their own subtree
+    print("👤 Regular admin - scoping summary to hierarchy")
     
     if "State Admin" in user_roles:
         if not current_user.state_id:
             return jsonify({"error": "State Admin must have a state assigned"}), 400
-        
-        print(f"🔐 State Admin - filtering for state_id: {current_user.state_id}")
-        
-        # Filter states - only show user's state
-        filtered_summary["states"] = [
-            state for state in full_summary["states"] 
-            if state["id"] == current_user.state_id
-        ]
-        
-        # Filter regions - only show regions in user's state
-        user_state_regions = Region.query.filter_by(state_id=current_user.state_id).all()
-        region_ids = [region.id for region in user_state_regions]
-        filtered_summary["regions"] = [
-            region for region in full_summary["regions"]
-            if region["id"] in region_ids
-        ]
-        
-        # Filter districts - only show districts in user's state
-        user_state_districts = District.query.filter_by(state_id=current_user.state_id).all()
-        district_ids = [district.id for district in user_state_districts]
-        filtered_summary["districts"] = [
-            district for district in full_summary["districts"]
-            if district["id"] in district_ids
-        ]
-        
-        # Filter groups - only show groups in user's state
-        user_state_groups = Group.query.filter_by(state_id=current_user.state_id).all()
-        group_ids = [group.id for group in user_state_groups]
-        filtered_summary["groups"] = [
-            group for group in full_summary["groups"]
-            if group["id"] in group_ids
-        ]
-        
-        # Filter old_groups - only show old_groups in user's state
-        user_state_old_groups = OldGroup.query.filter_by(state_id=current_user.state_id).all()
-        old_group_ids = [old_group.id for old_group in user_state_old_groups]
-        filtered_summary["old_groups"] = [
-            old_group for old_group in full_summary["old_groups"]
-            if old_group["id"] in old_group_ids
-        ]
+        scope_level, scope_id = "state", current_user.state_id
         
     elif "Region Admin" in user_roles:
         if not current_user.state_id or not current_user.region_id:
             return jsonify({"error": "Region Admin must have state and region assigned"}), 400
-        
-        print(f"🔐 Region Admin - filtering for region_id: {current_user.region_id}")
-        
-        # Filter regions - only show user's region
-        filtered_summary["regions"] = [
-            region for region in full_summary["regions"]
-            if region["id"] == current_user.region_id
-        ]
-        
-        # Filter districts - only show districts in user's region
-        user_region_districts = District.query.filter_by(region_id=current_user.region_id).all()
-        district_ids = [district.id for district in user_region_districts]
-        filtered_summary["districts"] = [
-            district for district in full_summary["districts"]
-            if district["id"] in district_ids
-        ]
-        
-        # Filter groups - only show groups in user's region
-        user_region_groups = Group.query.filter_by(region_id=current_user.region_id).all()
-        group_ids = [group.id for group in user_region_groups]
-        filtered_summary["groups"] = [
-            group for group in full_summary["groups"]
-            if group["id"] in group_ids
-        ]
-        
-        # Filter old_groups - only show old_groups in user's region
-        user_region_old_groups = OldGroup.query.filter_by(region_id=current_user.region_id).all()
-        old_group_ids = [old_group.id for old_group in user_region_old_groups]
-        filtered_summary["old_groups"] = [
-            old_group for old_group in full_summary["old_groups"]
-            if old_group["id"] in old_group_ids
-        ]
+        scope_level, scope_id = "region", current_user.region_id
         
     elif "District Admin" in user_roles:
         if not all([current_user.state_id, current_user.region_id, current_user.district_id]):
             return jsonify({"error": "District Admin must have complete hierarchy assigned"}), 400
-        
-        print(f"🔐 District Admin - filtering for district_id: {current_user.district_id}")
-        
-        # Filter districts - only show user's district
-        filtered_summary["districts"] = [
-            district for district in full_summary["districts"]
-            if district["id"] == current_user.district_id
-        ]
-        
-        # Filter groups - only show groups in user's district
-        user_district_groups = Group.query.filter_by(district_id=current_user.district_id).all()
-        group_ids = [group.id for group in user_district_groups]
-        filtered_summary["groups"] = [
-            group for group in full_summary["groups"]
-            if group["id"] in group_ids
-        ]
+        scope_level, scope_id = "district", current_user.district_id
         
     elif "Group Admin" in user_roles:
         if not all([current_user.state_id, current_user.region_id, current_user.old_group_id, current_user.group_id]):
             return jsonify({"error": "Group Admin must have complete hierarchy assigned (state, region, old_group, group)"}), 400
-        
-        print(f"🔐 Group Admin - filtering for group_id: {current_user.group_id}")
-        
-        # Filter groups - only show user's group
-        filtered_summary["groups"] = [
-            group for group in full_summary["groups"]
-            if group["id"] == current_user.group_id
-        ]
+        scope_level, scope_id = "group", current_user.group_id
         
     elif "Old Group Admin" in user_roles:
         if not all([current_user.state_id, current_user.region_id, current_user.old_group_id]):
             return jsonify({"error": "Old Group Admin must have state, region, and old_group assigned"}), 400
-        
-        print(f"🔐 Old Group Admin - filtering for old_group_id: {current_user.old_group_id}")
-        
-        # Filter old_groups - only show user's old_group
-        filtered_summary["old_groups"] = [
-            old_group for old_group in full_summary["old_groups"]
-            if old_group["id"] == current_user.old_group_id
-        ]
-        
-        # Filter groups - only show groups in user's old_group
-        user_old_group_groups = Group.query.filter_by(old_group_id=current_user.old_group_id).all()
-        group_ids = [group.id for group in user_old_group_groups]
-        filtered_summary["groups"] = [
-            group for group in full_summary["groups"]
-            if group["id"] in group_ids
-        ]
+        scope_level, scope_id = "old_group", current_user.old_group_id
         
     else:
         return jsonify({"error": "Insufficient permissions to view attendance monitor"}), 403
     
+    print(f"🔐 {scope_level} scope - summarising for {scope_level}_id: {scope_id}")
+    filtered_summary = get_attendance_monitor_summary(
+        year=year, month=month, scope_level=scope_level, scope_id=scope_id
+    )
+    
     print(f"🔍 Returning filtered summary with counts - States: {len(filtered_summary['states'])}, Regions: {len(filtered_summary['regions'])}, Districts: {len(filtered_summary['districts'])}, Groups: {len(filtered_summary['groups'])}, Old Groups: {len(filtered_summary['old_groups'])}")
     
     return jsonify(filtered_summary), 200
@@ -219,7 +121,7 @@ def attendance_monitor():
 @swag_from({
     "tags": ["Reminders"],
     "summary": "Send manual attendance reminders",
-    "description": "Triggers manual reminder emails to all admins under the specified entity type (state, region, district, group, old_group).",
+    "description": "Queues reminders to the admins of every entity at the specified level (state, region, district, group, old_group) whose attendance for the current month is not up to date.",
     "security": [{"BearerAuth": []}],
     "parameters": [
         {
@@ -231,9 +133,12 @@ def attendance_monitor():
         }
     ],
     "responses": {
-        200: {
-            "description": "Emails sent successfully",
-            "examples": {"application/json": {"sent_to": ["admin1@gmail.com", "admin2@gmail.com"]}}
+        202: {
+            "description": "Reminders queued on the notification outbox - track delivery at /notifications",
+            "examples": {"application/json": {
+                "sent_via": ["email", "whatsapp"], "queued": 2, "failed_list": [],
+                "detailed_results": [{"user": "admin1@gmail.com", "results": {"email_queued": 41, "whatsapp_queued": 42}}]
+            }}
         },
         400: {"description": "Invalid entity type"},
     }
@@ -247,12 +152,13 @@ def manual_remind(entity_type):
     data = request.get_json() or {}
     methods = data.get('methods', ['email', 'whatsapp'])
     
-    result = send_manual_reminders(entity_type, methods=methods)
+    result = send_manual_reminders(entity_type, methods=methods, created_by=get_current_principal().id)
     return jsonify({
         "sent_via": methods,
+        "queued": count_queued(result['notification_results']),
         "failed_list": result['failed_list'],
         "detailed_results": result['notification_results']
-    }), 200
+    }), 202
 # def manual_remind(entity_type):
 #     valid = ["state", "region", "district", "group", "old_group"]
 #     if entity_type not in valid:
@@ -290,11 +196,12 @@ def manual_remind(entity_type):
         }
     ],
     "responses": {
-        200: {
-            "description": "Reminder emails sent successfully",
+        202: {
+            "description": "Reminders queued on the notification outbox - track delivery at /notifications",
             "examples": {
                 "application/json": {
-                    "sent_to": ["admin1@gmail.com", "admin2@gmail.com"]
+                    "sent_via": ["email"], "queued": 1,
+                    "detailed_results": [{"user": "admin1@gmail.com", "results": {"email_queued": 43, "whatsapp_queued": None}}]
                 }
             }
         },
@@ -310,11 +217,13 @@ def targeted_remind(entity_type, entity_id):
     data = request.get_json() or {}
     methods = data.get('methods', ['email', 'whatsapp'])
     
-    results = send_targeted_reminders(entity_type, entity_id, methods=methods)
+    results = send_targeted_reminders(entity_type, entity_id, methods=methods,
+                                      created_by=get_current_principal().id)
     return jsonify({
         "sent_via": methods,
+        "queued": count_queued(results),
         "detailed_results": results
-    }), 200
+    }), 202
 
 
 
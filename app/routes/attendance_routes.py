@@ -4,13 +4,24 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import User, Attendance
 from ..extensions import db
 import csv
-from io import StringIO
 from ..utils.role_required import role_required
+from ..utils.csv_import import wants_partial_import
+from ..tasks.job_runner import submit_job
+from .job_routes import WAIT_PARAMETER_DOC, wants_wait, job_submitted_response, csv_import_response
+from ..utils.streaming import stream_json_array, stream_ndjson, wants_ndjson
+from ..utils.export import EXPORT_BATCH_SIZE, export_format, export_response
+from ..utils.periods import parse_period_args
+from ..utils.principal import get_current_principal
 from flasgger import swag_from
 
 
 attendance_bp = Blueprint("attendance", __name__)
 
+# Keyset pagination / streaming limits for GET /attendance
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
 # @attendance_bp.route("/attendance", methods=["POST"])
 # @jwt_required()
 # @swag_from({
@@ -179,8 +190,7 @@ attendance_bp = Blueprint("attendance", __name__)
 })
 def create_attendance():
     data = request.get_json() or {}
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_principal()
     
     print(f"🔍 Current user: {current_user.id}, Roles: {[r.name for r in current_user.roles]}")
     print(f"🔍 User hierarchy - State: {current_user.state_id}, Region: {current_user.region_id}, District: {current_user.district_id}, Group: {current_user.group_id}, OldGroup: {current_user.old_group_id}")
@@ -278,14 +288,30 @@ def create_attendance():
             "type": "file",
             "required": True,
             "description": "CSV file containing attendance data"
-        }
+        },
+        {
+            "name": "mode",
+            "in": "query",
+            "type": "string",
+            "enum": ["strict", "partial"],
+            "required": False,
+            "description": "strict (default): reject the whole file on the first bad row. partial: import valid rows and report the rejected ones."
+        },
+        WAIT_PARAMETER_DOC
     ],
     "responses": {
+        "202": {
+            "description": "Upload queued as a background job - poll status_url for progress and the import report",
+            "examples": {"application/json": {"message": "Import queued as job 12", "status_url": "/jobs/12"}}
+        },
         "201": {
-            "description": "Attendance records uploaded successfully",
-            "examples": {"application/json": {"message": "45 attendance records uploaded successfully"}}
+            "description": "Attendance records uploaded successfully (wait=true)",
+            "examples": {"application/json": {"message": "45 attendance records uploaded successfully", "inserted": 40, "updated": 5}}
         },
-        "400": {"description": "Invalid file format or missing CSV column"}
+        "400": {
+            "description": "Invalid file format, or (wait=true) the import was rejected - in partial mode, when no row was imported",
+            "examples": {"application/json": {"error": "Group with ID 99 does not exist", "row": 12}}
+        }
     }
 })
 def upload_attendance_csv():
@@ -293,86 +319,26 @@ def upload_attendance_csv():
     if not file or not file.filename.endswith(".csv"):
         return jsonify({"error": "Invalid file format. Please upload a .csv file."}), 400
 
-    stream = StringIO(file.stream.read().decode("utf-8"))
-    csv_reader = csv.DictReader(stream)
-
-    records = []
-    for row in csv_reader:
-        try:
-            # Validate old_group_id exists if provided
-            if row.get("old_group_id") and row["old_group_id"].strip():
-                from ..models import OldGroup
-                old_group = OldGroup.query.get(int(row["old_group_id"]))
-                if not old_group:
-                    return jsonify({"error": f"Old Group with ID {row['old_group_id']} does not exist"}), 400
-            
-            # Validate group_id exists if provided
-            if row.get("group_id") and row["group_id"].strip():
-                from ..models import Group
-                group = Group.query.get(int(row["group_id"]))
-                if not group:
-                    return jsonify({"error": f"Group with ID {row['group_id']} does not exist"}), 400
-
-            attendance = Attendance(
-                service_type=row["service_type"],
-                state_id=int(row["state_id"]),
-                region_id=int(row["region_id"]),
-                # district_id=int(row["district_id"]),
-                district_id=int(row["district_id"]) if row.get("district_id") and row["district_id"].strip() else None,
-                group_id=int(row["group_id"]) if row.get("group_id") and row["group_id"].strip() else None,
-                old_group_id=int(row["old_group_id"]) if row.get("old_group_id") and row["old_group_id"].strip() else None,
-                month=row["month"],
-                week=int(row["week"]),
-                men=int(row["men"]),
-                women=int(row["women"]),
-                youth_boys=int(row["youth_boys"]),
-                youth_girls=int(row["youth_girls"]),
-                children_boys=int(row["children_boys"]),
-                children_girls=int(row["children_girls"]),
-                year=int(row["year"]),
-            )
-            records.append(attendance)
-        except KeyError as e:
-            return jsonify({"error": f"Missing column in CSV: {e}"}), 400
-        except ValueError as e:
-            return jsonify({"error": f"Invalid data format in row: {e}"}), 400
-
-    db.session.bulk_save_objects(records)
-    db.session.commit()
+    # The file is spooled to disk and imported by the job workers
+    job = submit_job("attendance_csv", file=file, params={"partial": wants_partial_import(request)},
+                     created_by=get_current_principal().id, suffix=".csv", wait=wants_wait(request))
+    return job_submitted_response(job, lambda job: csv_import_response(job, "attendance records", lambda report: {
+        "message": f"{report['inserted'] + report['updated']} attendance records uploaded successfully",
+        "inserted": report["inserted"],
+        "updated": report["updated"],
+    }))
 
-    return jsonify({"message": f"{len(records)} attendance records uploaded successfully"}), 201
-
-
-@attendance_bp.route("/attendance", methods=["GET"])
-@jwt_required()
-@swag_from({
-    "tags": ["Attendance"],
-    "summary": "Retrieve attendance records",
-    "description": "Fetch attendance records based on service type, month, year, and user access level (State Admin, Regional Admin, District Admin).",
-    "parameters": [
-        {"name": "service_type", "in": "query", "type": "string", "required": False, "description": "Filter by service type"},
-        {"name": "year", "in": "query", "type": "integer", "required": False, "description": "Filter by year"},
-        {"name": "month", "in": "query", "type": "string", "required": False, "description": "Filter by month"}
-    ],
-    "responses": {
-        "200": {
-            "description": "List of attendance records",
-            "examples": {
-                "application/json": [
-                    {"id": 1, "service_type": "Sunday Service", "men": 45, "women": 60, "year": 2025}
-                ]
-            }
-        },
-        "401": {"description": "Unauthorized access"}
-    }
-})
-def get_attendance():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
 
+def attendance_scope_filters(user):
+    """
+    Query filters for the attendance the user may see: the request's own
+    filters narrowed to the user's place in the hierarchy. None if the user
+    has no attendance access at all. Raises ValueError for a malformed from/to.
+    """
     service_type = request.args.get("service_type")
     year = request.args.get("year")
     month = request.args.get("month")
+    period_from, period_to = parse_period_args(request.args)
     group_id = request.args.get("group_id")
     old_group_id = request.args.get("old_group_id")
 
@@ -407,11 +373,11 @@ def get_attendance():
         district_id = user.district_id
         print(f"🔍 District Admin - filtering by district: {district_id}")
     else:
-        # Basic user - return empty or apply other logic
+        # Basic user - no access to attendance records
         print("🔍 Basic user - no access to attendance records")
-        return jsonify([]), 200
+        return None
 
-    records = attendance_controller.get_all_attendance(
+    return dict(
         service_type=service_type,
         state_id=state_id,      # None for Super Admin = no filter ✅
         region_id=region_id,    # None for Super Admin = no filter ✅
@@ -419,12 +385,107 @@ def get_attendance():
         group_id=group_id,
         old_group_id=old_group_id,
         year=year,
-        month=month
+        month=month,
+        period_from=period_from,
+        period_to=period_to
     )
 
-    print(f"✅ Found {len(records)} attendance records")
-    return jsonify([a.to_dict() for a in records]), 200
 
+@attendance_bp.route("/attendance", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Attendance"],
+    "summary": "Retrieve attendance records",
+    "description": "Fetch attendance records based on service type, month, year, and user access level (State Admin, Regional Admin, District Admin).",
+    "parameters": [
+        {"name": "service_type", "in": "query", "type": "string", "required": False, "description": "Filter by service type"},
+        {"name": "year", "in": "query", "type": "integer", "required": False, "description": "Filter by year"},
+        {"name": "month", "in": "query", "type": "string", "required": False, "description": "Filter by month"},
+        {"name": "from", "in": "query", "type": "string", "required": False, "description": "First month to include, YYYY-MM"},
+        {"name": "to", "in": "query", "type": "string", "required": False, "description": "Last month to include, YYYY-MM"},
+        {"name": "cursor", "in": "query", "type": "integer", "required": False, "description": "Return records with id greater than this cursor (keyset pagination)"},
+        {"name": "limit", "in": "query", "type": "integer", "required": False, "description": "Page size (max 1000). Providing cursor or limit returns {data, next_cursor}"},
+        {"name": "format", "in": "query", "type": "string", "required": False, "description": "Set to 'ndjson' to stream one JSON object per line"}
+    ],
+    "responses": {
+        "200": {
+            "description": "List of attendance records (streamed), or a page with next_cursor when cursor/limit is given",
+            "examples": {
+                "application/json": [
+                    {"id": 1, "service_type": "Sunday Service", "men": 45, "women": 60, "year": 2025}
+                ]
+            }
+        },
+        "400": {"description": "Invalid from/to period"},
+        "401": {"description": "Unauthorized access"}
+    }
+})
+def get_attendance():
+    try:
+        filters = attendance_scope_filters(get_current_principal())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if filters is None:
+        return jsonify([]), 200
+
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", type=int)
+
+    # 🎯 Paginated mode: one keyset page plus the cursor for the next one
+    if cursor is not None or limit is not None:
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        records, next_cursor = attendance_controller.get_attendance_page(
+            after_id=cursor, limit=limit, **filters
+        )
+        print(f"✅ Returning page of {len(records)} attendance records, next_cursor: {next_cursor}")
+        return jsonify({
+            "data": [a.to_dict() for a in records],
+            "next_cursor": next_cursor
+        }), 200
+
+    # 🎯 Streaming mode: walk the table in keyset batches so memory stays flat
+    records = attendance_controller.iter_attendance(batch_size=STREAM_BATCH_SIZE, **filters)
+    if wants_ndjson(request):
+        return stream_ndjson(records, lambda a: a.to_dict())
+    return stream_json_array(records, lambda a: a.to_dict())
+
+
+@attendance_bp.route("/attendance/export", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Attendance"],
+    "summary": "Export attendance records as CSV or XLSX",
+    "description": "Streams every attendance record the user may see (same scope rules and filters as GET /attendance) as a file download. The CSV columns match the bulk upload format, plus id.",
+    "produces": ["text/csv", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"],
+    "parameters": [
+        {"name": "format", "in": "query", "type": "string", "enum": ["csv", "xlsx"], "required": False, "description": "File format (default csv)"},
+        {"name": "service_type", "in": "query", "type": "string", "required": False, "description": "Filter by service type"},
+        {"name": "year", "in": "query", "type": "integer", "required": False, "description": "Filter by year"},
+        {"name": "month", "in": "query", "type": "string", "required": False, "description": "Filter by month"},
+        {"name": "from", "in": "query", "type": "string", "required": False, "description": "First month to include, YYYY-MM"},
+        {"name": "to", "in": "query", "type": "string", "required": False, "description": "Last month to include, YYYY-MM"}
+    ],
+    "responses": {
+        "200": {"description": "File download (streamed)"},
+        "400": {"description": "Unsupported format or invalid from/to period"},
+        "403": {"description": "No access to attendance records"}
+    }
+})
+def export_attendance():
+    fmt = export_format(request)
+    if not fmt:
+        return jsonify({"error": "format must be 'csv' or 'xlsx'"}), 400
+
+    try:
+        filters = attendance_scope_filters(get_current_principal())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if filters is None:
+        return jsonify({"error": "You do not have access to attendance records"}), 403
+
+    # 🎯 Rows come off a server-side cursor and go straight into the file
+    rows = attendance_controller.iter_attendance_rows(batch_size=EXPORT_BATCH_SIZE, **filters)
+    return export_response(fmt, rows, attendance_controller.EXPORT_FIELDS, "attendance", sheet_title="Attendance")
 
 
 # def get_attendance():
@@ -504,12 +565,25 @@ def get_one(attendance_id):
     ],
     "responses": {
         "200": {"description": "Attendance record updated successfully"},
-        "404": {"description": "Attendance record not found"}
+        "400": {
+            "description": "A field was set to an invalid value (e.g. a required hierarchy id to null)",
+            "examples": {"application/json": {"error": "Invalid attendance data: NOT NULL constraint failed: attendance.state_id"}}
+        },
+        "404": {"description": "Attendance record not found"},
+        "409": {
+            "description": "Another record already exists for the updated entity, service type and week",
+            "examples": {"application/json": {"error": "An attendance record for this entity, service type and week already exists"}}
+        }
     }
 })
 def update_attendance(attendance_id):
     data = request.get_json() or {}
-    attendance = attendance_controller.update_attendance(attendance_id, data)
+    try:
+        attendance = attendance_controller.update_attendance(attendance_id, data)
+    except attendance_controller.DuplicateAttendanceError as e:
+        return jsonify({"error": str(e)}), 409
+    except attendance_controller.InvalidAttendanceError as e:
+        return jsonify({"error": str(e)}), 400
     if not attendance:
         return jsonify({"error": "not found"}), 404
     return jsonify(attendance.to_dict()), 200
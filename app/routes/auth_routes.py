@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify
 from app.controllers.user_controller import can_create_role
 from ..extensions import db
 from ..models.user import User, Role, Permission
+from app.utils.principal import get_current_principal
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from flasgger import swag_from
 
@@ -85,8 +86,7 @@ def setup_admin():
 })
 def get_available_roles():
     """Get roles that the current user can assign to new users."""
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_principal()
     
     all_roles = Role.query.all()
     available_roles = []
@@ -143,8 +143,7 @@ def create_admin():
         description: Insufficient permissions (not a Super Admin)
     """
     # Check if current user is Super Admin
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_principal()
     
     current_user_roles = [r.name for r in current_user.roles]
     if "Super Admin" not in current_user_roles:
@@ -356,7 +355,7 @@ def delete_user(user_id):
       403:
         description: Insufficient permissions
     """
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
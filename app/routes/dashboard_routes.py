@@ -2,6 +2,11 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import User, Attendance, State, Region, District, Group, OldGroup
 from ..extensions import db
+from sqlalchemy.orm import selectinload
+from ..utils.attendance_rollups import ROLLUP_LEVELS, COUNT_FIELDS, get_rollup_totals
+from ..utils.principal import get_current_principal
+from ..utils.hierarchy_closure import descendant_counts
+from ..utils.hierarchy_snapshot import get_hierarchy_snapshot
 from flasgger import swag_from
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -61,8 +66,7 @@ def get_user_access_scope(user):
     }
 })
 def get_dashboard_summary():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_principal()
     access_scope = get_user_access_scope(user)
     
     # Build queries based on access scope
@@ -95,15 +99,17 @@ def get_dashboard_summary():
             "groups_count": Group.query.count()
         })
     elif access_scope["scope"] == "state":
+        counts = descendant_counts("state", user.state_id)
         summary.update({
-            "regions_count": Region.query.filter_by(state_id=user.state_id).count(),
-            "districts_count": District.query.filter_by(state_id=user.state_id).count(),
-            "groups_count": Group.query.filter_by(state_id=user.state_id).count()
+            "regions_count": counts.get("region", 0),
+            "districts_count": counts.get("district", 0),
+            "groups_count": counts.get("group", 0)
         })
     elif access_scope["scope"] == "region":
+        counts = descendant_counts("region", user.region_id)
         summary.update({
-            "districts_count": District.query.filter_by(region_id=user.region_id).count(),
-            "groups_count": Group.query.filter_by(region_id=user.region_id).count()
+            "districts_count": counts.get("district", 0),
+            "groups_count": counts.get("group", 0)
         })
     
     return jsonify(summary), 200
@@ -126,11 +132,11 @@ def get_dashboard_summary():
     }
 })
 def get_users_in_scope():
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     access_scope = get_user_access_scope(current_user)
     
-    query = User.query
+    # Roles are serialized by to_dict() - load them for all users in one query
+    query = User.query.options(selectinload(User.roles))
     
     # Apply filters based on user's access level
     if access_scope["scope"] == "state":
@@ -172,8 +178,7 @@ def get_users_in_scope():
     }
 })
 def get_attendance_in_scope():
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     access_scope = get_user_access_scope(current_user)
     
     year = request.args.get("year")
@@ -202,6 +207,82 @@ def get_attendance_in_scope():
     attendance_records = query.limit(100).all()  # Limit for performance
     return jsonify([a.to_dict() for a in attendance_records]), 200
 
+LEVEL_MODELS = {
+    "state": State,
+    "region": Region,
+    "old_group": OldGroup,
+    "group": Group,
+    "district": District,
+}
+
+@dashboard_bp.route("/dashboard/attendance/totals", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Dashboard"],
+    "summary": "Get attendance totals per hierarchy entity",
+    "description": "Returns summed attendance per state/region/old_group/group/district for a period, read from the pre-aggregated rollup table",
+    "parameters": [
+        {"name": "level", "in": "query", "type": "string", "required": True, "enum": list(ROLLUP_LEVELS)},
+        {"name": "year", "in": "query", "type": "integer", "required": True},
+        {"name": "month", "in": "query", "type": "string", "required": False},
+        {"name": "week", "in": "query", "type": "integer", "required": False},
+        {"name": "service_type", "in": "query", "type": "string", "required": False}
+    ],
+    "responses": {
+        "200": {
+            "description": "Totals per entity",
+            "examples": {
+                "application/json": [
+                    {"id": 1, "name": "Region North", "men": 450, "women": 600, "record_count": 12}
+                ]
+            }
+        },
+        "400": {"description": "Invalid level or missing year"}
+    }
+})
+def get_attendance_totals():
+    current_user = get_current_principal()
+    access_scope = get_user_access_scope(current_user)
+
+    level = request.args.get("level")
+    year = request.args.get("year", type=int)
+    if level not in LEVEL_MODELS or not year:
+        return jsonify({"error": f"level must be one of {list(LEVEL_MODELS)} and year is required"}), 400
+
+    model = LEVEL_MODELS[level]
+    entities_query = model.query.with_entities(model.id, model.name)
+
+    # Restrict entities to the user's scope
+    if access_scope["scope"] != "global":
+        filters = access_scope.get("filters")
+        if not filters:
+            return jsonify([]), 200
+        for column, value in filters.items():
+            if column == f"{level}_id":
+                entities_query = entities_query.filter(model.id == value)
+            elif hasattr(model, column):
+                entities_query = entities_query.filter(getattr(model, column) == value)
+            else:
+                # Requested level sits above the user's scope
+                return jsonify([]), 200
+
+    entities = entities_query.all()
+    totals = get_rollup_totals(
+        level,
+        year,
+        month=request.args.get("month"),
+        week=request.args.get("week", type=int),
+        service_type=request.args.get("service_type"),
+        entity_ids=None if access_scope["scope"] == "global" else [e.id for e in entities]
+    )
+
+    empty = {**{field: 0 for field in COUNT_FIELDS}, "record_count": 0}
+    return jsonify([{
+        "id": entity.id,
+        "name": entity.name,
+        **totals.get(entity.id, empty)
+    } for entity in entities]), 200
+
 @dashboard_bp.route("/dashboard/hierarchy", methods=["GET"])
 @jwt_required()
 @swag_from({
@@ -222,30 +303,34 @@ def get_attendance_in_scope():
     }
 })
 def get_hierarchy_in_scope():
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     access_scope = get_user_access_scope(current_user)
     
     hierarchy_data = {}
+    snapshot = get_hierarchy_snapshot()
+    
+    def as_dict(level, entity_id):
+        node = snapshot.get(level, entity_id)
+        return node._asdict() if node else None
     
     if access_scope["scope"] == "global":
-        hierarchy_data["states"] = [s.to_dict() for s in State.query.all()]
-        hierarchy_data["regions"] = [r.to_dict() for r in Region.query.all()]
-        hierarchy_data["districts"] = [d.to_dict() for d in District.query.all()]
+        hierarchy_data["states"] = [s._asdict() for s in snapshot.all("state")]
+        hierarchy_data["regions"] = [r._asdict() for r in snapshot.all("region")]
+        hierarchy_data["districts"] = [d._asdict() for d in snapshot.all("district")]
     
     elif access_scope["scope"] == "state":
-        hierarchy_data["state"] = State.query.get(current_user.state_id).to_dict()
-        hierarchy_data["regions"] = [r.to_dict() for r in Region.query.filter_by(state_id=current_user.state_id).all()]
-        hierarchy_data["districts"] = [d.to_dict() for d in District.query.filter_by(state_id=current_user.state_id).all()]
+        hierarchy_data["state"] = as_dict("state", current_user.state_id)
+        hierarchy_data["regions"] = [r._asdict() for r in snapshot.children_of("region", "state_id", current_user.state_id)]
+        hierarchy_data["districts"] = [d._asdict() for d in snapshot.children_of("district", "state_id", current_user.state_id)]
     
     elif access_scope["scope"] == "region":
-        hierarchy_data["state"] = State.query.get(current_user.state_id).to_dict()
-        hierarchy_data["region"] = Region.query.get(current_user.region_id).to_dict()
-        hierarchy_data["districts"] = [d.to_dict() for d in District.query.filter_by(region_id=current_user.region_id).all()]
+        hierarchy_data["state"] = as_dict("state", current_user.state_id)
+        hierarchy_data["region"] = as_dict("region", current_user.region_id)
+        hierarchy_data["districts"] = [d._asdict() for d in snapshot.children_of("district", "region_id", current_user.region_id)]
     
     elif access_scope["scope"] == "district":
-        hierarchy_data["state"] = State.query.get(current_user.state_id).to_dict()
-        hierarchy_data["region"] = Region.query.get(current_user.region_id).to_dict()
-        hierarchy_data["district"] = District.query.get(current_user.district_id).to_dict()
+        hierarchy_data["state"] = as_dict("state", current_user.state_id)
+        hierarchy_data["region"] = as_dict("region", current_user.region_id)
+        hierarchy_data["district"] = as_dict("district", current_user.district_id)
     
     return jsonify(hierarchy_data), 200
\ No newline at end of file
@@ -9,7 +9,12 @@ from io import BytesIO
 from flasgger import swag_from
 from app.models.user import User
 from app.models.youth_attendance import YouthAttendance
+from app.models.import_job import ImportJob
 from app.utils.access_control import require_role ##,restrict_by_access
+from app.utils.principal import get_current_principal
+from app.tasks.job_runner import submit_job
+from app.routes.job_routes import wants_wait, job_submitted_response
+from app.utils.hierarchy_snapshot import SNAPSHOT_MODELS, get_hierarchy_snapshot
 
 # def restrict_by_access(query, user):
 #     """
@@ -100,81 +105,118 @@ from app.utils.access_control import require_role ##,restrict_by_access
 #     print(f"🚫 No valid access - User has roles: {role_names} but missing hierarchy data")
 #     return query.filter_by(id=None)
 
-def restrict_by_access(query, user):
+# 🎯 SCOPE REGISTRY
+# Roles in precedence order with the user field that anchors their scope.
+# The first role the user holds (with that field set) decides the scope.
+SCOPE_ROLES = [
+    ("state admin", "state_id"),
+    ("region admin", "region_id"),
+    ("district admin", "district_id"),
+    ("group admin", "group_id"),
+    ("old group admin", "old_group_id"),
+]
+
+# (model, role) -> the model column that must equal the role's anchor id.
+# A model missing for a role means that role sees none of its rows.
+SCOPE_REGISTRY = {
+    (State, "state admin"): "id",
+    (Region, "state admin"): "state_id",
+    (OldGroup, "state admin"): "state_id",
+    (Group, "state admin"): "state_id",
+    (District, "state admin"): "state_id",
+
+    (Region, "region admin"): "id",
+    (OldGroup, "region admin"): "region_id",
+    (Group, "region admin"): "region_id",
+    (District, "region admin"): "region_id",
+
+    (Group, "district admin"): "id",
+    (District, "district admin"): "id",
+
+    (Group, "group admin"): "id",
+    (District, "group admin"): "group_id",
+
+    (OldGroup, "old group admin"): "id",
+    (Group, "old group admin"): "old_group_id",
+    (District, "old group admin"): "old_group_id",
+}
+
+# (model, role) -> (model, column) the anchor id is first resolved through.
+# Groups have no district_id - a district admin sees the group their district belongs to.
+SCOPE_ANCHORS = {
+    (Group, "district admin"): (District, "group_id"),
+}
+
+SNAPSHOT_LEVELS = {model: level for level, model in SNAPSHOT_MODELS.items()}
+
+
+def resolve_scope(model, user):
     """
-    ENHANCED ACCESS CONTROL - Better model detection and role handling
+    Work out how `user` is scoped on `model` using SCOPE_REGISTRY.
+    Returns "all" (super admin), None (no access) or (role, column, anchor_id, via).
     """
-    print(f"🎯 ACCESS CONTROL for user {user.id}")
-    
     if not user or not user.roles:
-        return query.filter_by(id=None)
-    
-    role_names = [r.name.lower() for r in user.roles]
-    print(f"🎯 User roles: {role_names}")
-    print(f"🎯 User hierarchy - state: {user.state_id}, region: {user.region_id}, district: {user.district_id}, group: {user.group_id}, old_group: {user.old_group_id}")
-    
-    # Try to detect model more reliably
-    query_str = str(query).lower()
-    
+        return None
+
+    role_names = {r.name.lower() for r in user.roles}
+
     # 🎯 SUPER ADMIN - NO RESTRICTIONS
     if "super admin" in role_names:
-        print("🔓 SUPER ADMIN - Full access to all data")
+        return "all"
+
+    for role, field in SCOPE_ROLES:
+        anchor_id = getattr(user, field)
+        if role in role_names and anchor_id:
+            column = SCOPE_REGISTRY.get((model, role))
+            if column is None:
+                return None
+            return role, column, anchor_id, SCOPE_ANCHORS.get((model, role))
+
+    return None
+
+
+def restrict_by_access(query, user):
+    """
+    Scope a hierarchy query to what the user may see, using SCOPE_REGISTRY.
+    The model is read from the query's primary entity - no SQL is compiled.
+    """
+    model = query.column_descriptions[0]["entity"]
+    scope = resolve_scope(model, user)
+
+    if scope == "all":
         return query
-    
-    # 🎯 STATE ADMIN
-    if "state admin" in role_names and user.state_id:
-        print(f"🔐 STATE ADMIN - Access to state_id: {user.state_id}")
-        if "from groups" in query_str:
-            return query.filter(Group.state_id == user.state_id)
-        elif "from districts" in query_str:
-            return query.filter(District.state_id == user.state_id)
-        elif "from regions" in query_str:
-            return query.filter(Region.state_id == user.state_id)
-        elif "from old_groups" in query_str:
-            return query.filter(OldGroup.state_id == user.state_id)
-        elif "from states" in query_str:
-            return query.filter(State.id == user.state_id)
-    
-    # 🎯 REGION ADMIN
-    elif "region admin" in role_names and user.region_id:
-        print(f"🔐 REGION ADMIN - Access to region_id: {user.region_id}")
-        if "from groups" in query_str:
-            return query.filter(Group.region_id == user.region_id)
-        elif "from districts" in query_str:
-            return query.filter(District.region_id == user.region_id)
-        elif "from old_groups" in query_str:
-            return query.filter(OldGroup.region_id == user.region_id)
-        elif "from regions" in query_str:
-            return query.filter(Region.id == user.region_id)
-    
-    # 🎯 DISTRICT ADMIN
-    elif "district admin" in role_names and user.district_id:
-        print(f"🔐 DISTRICT ADMIN - Access to district_id: {user.district_id}")
-        if "from groups" in query_str:
-            return query.filter(Group.district_id == user.district_id)
-        elif "from districts" in query_str:
-            return query.filter(District.id == user.district_id)
-    
-    # 🎯 GROUP ADMIN (WORKING)
-    elif "group admin" in role_names and user.group_id:
-        print(f"🔐 GROUP ADMIN - Access to group_id: {user.group_id}")
-        if "from groups" in query_str:
-            return query.filter(Group.id == user.group_id)
-        elif "from districts" in query_str:
-            return query.filter(District.group_id == user.group_id)
-    
-    # 🎯 OLD GROUP ADMIN
-    elif "old group admin" in role_names and user.old_group_id:
-        print(f"🔐 OLD GROUP ADMIN - Access to old_group_id: {user.old_group_id}")
-        if "from groups" in query_str:
-            return query.filter(Group.old_group_id == user.old_group_id)
-        elif "from districts" in query_str:
-            return query.filter(District.old_group_id == user.old_group_id)
-        elif "from old_groups" in query_str:
-            return query.filter(OldGroup.id == user.old_group_id)
-    
-    print(f"🚫 No access granted for user {user.id}")
-    return query.filter_by(id=None)
+    if scope is None:
+        print(f"🚫 No access granted for user {user.id if user else None} on {model.__name__}")
+        return query.filter_by(id=None)
+
+    role, column, anchor_id, via = scope
+    print(f"🔐 {role.upper()} - {model.__name__}.{column} scoped to {anchor_id}")
+    if via:
+        via_model, via_column = via
+        anchor = db.session.query(getattr(via_model, via_column)).filter(via_model.id == anchor_id)
+        return query.filter(getattr(model, column).in_(anchor))
+    return query.filter(getattr(model, column) == anchor_id)
+
+
+def scoped_nodes(snapshot, model, user):
+    """In-memory equivalent of restrict_by_access over the hierarchy snapshot."""
+    level = SNAPSHOT_LEVELS[model]
+    scope = resolve_scope(model, user)
+
+    if scope == "all":
+        return snapshot.all(level)
+    if scope is None:
+        return ()
+
+    _role, column, anchor_id, via = scope
+    if via:
+        via_model, via_column = via
+        via_node = snapshot.get(SNAPSHOT_LEVELS[via_model], anchor_id)
+        anchor_id = getattr(via_node, via_column) if via_node else None
+    if column == "id":
+        node = snapshot.get(level, anchor_id)
+        return (node,) if node else ()
+    return snapshot.children_of(level, column, anchor_id)
 
 
 hierarchy_bp = Blueprint('hierarchy_bp', __name__)
@@ -184,8 +226,7 @@ hierarchy_bp = Blueprint('hierarchy_bp', __name__)
 @jwt_required()
 def test_all_roles():
     """Test access control for current user across all models"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -229,8 +270,7 @@ def test_all_roles():
 @jwt_required()
 def test_simple_access():
     """Test the simple access control"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -287,11 +327,10 @@ def get_states():
                 type: string
     """
 
-    user_id = get_jwt_identity()  # ADD THIS
-    current_user = User.query.get(user_id)  # ADD THIS
+    current_user = get_current_principal()
     # current_user = User.query.get(get_jwt_identity())
     # states = State.query.all()
-    states = restrict_by_access(State.query, current_user).all()
+    states = scoped_nodes(get_hierarchy_snapshot(), State, current_user)
     # return jsonify([s.to_dict() for s in states])
 
     return jsonify([{
@@ -366,19 +405,31 @@ def upload_states():
         type: file
         required: true
         description: CSV or Excel file containing 'name', 'code', and optional 'leader' columns.
+      - in: query
+        name: wait
+        type: boolean
+        required: false
+        description: Run the import inside this request and return the finished job instead of queueing it.
     responses:
+      202:
+        description: Upload queued - poll the returned status_url for progress
       201:
-        description: States uploaded successfully
+        description: States uploaded successfully (wait=true)
       400:
         description: File upload failed or invalid format
     """
     file = request.files['file']
-    df = pd.read_excel(BytesIO(file.read())) if file.filename.endswith('.xlsx') else pd.read_csv(file)
-    for _, row in df.iterrows():
-        state = State(name=row['name'], code=row['code'], leader=row.get('leader'))
-        db.session.add(state)
-    db.session.commit()
-    return jsonify({"message": "States uploaded successfully"}), 201
+    is_excel = file.filename.endswith('.xlsx')
+    job = submit_job("states", file=file, params={"format": "excel" if is_excel else "csv"},
+                     created_by=get_current_principal().id,
+                     suffix=".xlsx" if is_excel else ".csv", wait=wants_wait(request))
+    return job_submitted_response(job, states_upload_response)
+
+def states_upload_response(job):
+    """Inline (?wait=true) result of a states upload job."""
+    if job.status != ImportJob.SUCCEEDED:
+        return jsonify({"error": job.error}), 400
+    return jsonify(job.result), 201
 
 @hierarchy_bp.route("/state/<int:id>", methods=["PUT"])
 @jwt_required()
@@ -493,7 +544,7 @@ def create_region():
     """
 
     data = request.get_json()
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
 
     # Validate required fields
     required_fields = ["name", "code", "state_id"]
@@ -556,9 +607,9 @@ def get_regions():
     """
 
     # current_user = User.query.get(get_jwt_identity())
-    user_id = get_jwt_identity()  # ADD THIS
-    current_user = User.query.get(user_id)  # ADD THIS
-    regions = restrict_by_access(Region.query, current_user).all()
+    current_user = get_current_principal()
+    snapshot = get_hierarchy_snapshot()
+    regions = scoped_nodes(snapshot, Region, current_user)
 
     # return jsonify([r.to_dict() for r in regions])
     
@@ -568,7 +619,7 @@ def get_regions():
         "name": r.name,
         "code": r.code,
         "leader": r.leader,
-        "state": r.state.name
+        "state": snapshot.name("state", r.state_id)
     } for r in regions])
 
 
@@ -605,7 +656,7 @@ def update_region(id):
         description: Region updated successfully
     """
     data = request.get_json() or {}
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     region = Region.query.get_or_404(id)
 
     # 🎯 ADD ACCESS CONTROL
@@ -654,7 +705,7 @@ def delete_region(id):
       200:
         description: Region deleted successfully
     """
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     region = Region.query.get_or_404(id)
 
     # 🎯 ADD ACCESS CONTROL
@@ -718,7 +769,7 @@ def create_district():
     """
 
     data = request.get_json()
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
 
     # 🎯 FIX: Only restrict non-Super Admin users
     # Check if user is NOT Super Admin before applying restrictions
@@ -800,9 +851,9 @@ def get_districts():
     """
 
     # current_user = User.query.get(get_jwt_identity())
-    user_id = get_jwt_identity()  # ADD THIS
-    current_user = User.query.get(user_id)  # ADD THIS
-    districts = restrict_by_access(District.query, current_user).all()
+    current_user = get_current_principal()
+    snapshot = get_hierarchy_snapshot()
+    districts = scoped_nodes(snapshot, District, current_user)
 
     # return jsonify([d.to_dict() for d in districts])
     # districts = District.query.all()
@@ -811,10 +862,10 @@ def get_districts():
         "name": d.name,
         "code": d.code,
         "leader": d.leader,
-        "region": d.region.name if d.region else None,
-        "state": d.state.name if d.state else None,
-        "old_group": d.old_group.name if d.old_group else None,
-        "group": d.group.name if d.group else None,
+        "region": snapshot.name("region", d.region_id),
+        "state": snapshot.name("state", d.state_id),
+        "old_group": snapshot.name("old_group", d.old_group_id),
+        "group": snapshot.name("group", d.group_id),
         # Optional: Include IDs for reference
         "region_id": d.region_id,
         "state_id": d.state_id,
@@ -837,8 +888,7 @@ def get_districts():
 @jwt_required()
 def debug_group_admin():
     """Debug route to check Group Admin access"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -897,8 +947,7 @@ def debug_group_admin():
 @jwt_required()
 def test_group_access():
     """Simple test to verify Group Admin access"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -931,8 +980,7 @@ def test_group_access():
 @jwt_required()
 def test_direct_groups():
     """Test groups without access control"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -957,8 +1005,7 @@ def test_direct_groups():
 @jwt_required()
 def test_restrict_function():
     """Test the restrict_by_access function directly"""
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -1006,8 +1053,7 @@ def debug_access():
       200:
         description: response with detailed access data of logged in user
     """
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_principal()
     
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -1075,7 +1121,7 @@ def update_district(id):
       200:
         description: District updated successfully
     """
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     data = request.get_json() or {}
     district = District.query.get_or_404(id)
 
@@ -1152,7 +1198,7 @@ def delete_district(id):
       200:
         description: District deleted successfully
     """
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     district = District.query.get_or_404(id)
 
     print(f"🔍 User: {current_user.id}, Roles: {[r.name for r in current_user.roles]}")
@@ -1254,7 +1300,7 @@ def delete_district(id):
 })
 def create_group():
     data = request.get_json() or {}
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
 
     print(f"🔍 User: {current_user.id}, Roles: {[r.name for r in current_user.roles]}")
     print(f"🔍 Received data: {data}")
@@ -1370,10 +1416,10 @@ def create_group():
 def get_groups():
 
     # current_user = User.query.get(get_jwt_identity())
-    user_id = get_jwt_identity()  # ADD THIS
-    current_user = User.query.get(user_id)  # ADD THIS
+    current_user = get_current_principal()
+    snapshot = get_hierarchy_snapshot()
 
-    groups = restrict_by_access(Group.query, current_user).all()
+    groups = scoped_nodes(snapshot, Group, current_user)
 
     # return jsonify([g.to_dict() for g in groups])
     # groups = Group.query.all()
@@ -1383,9 +1429,9 @@ def get_groups():
         "code": g.code,
         "leader": g.leader,
         # "district": g.district.name if g.district else None,
-        "region": g.region.name if g.region else None,
-        "state": g.state.name if g.state else None,
-        "old_group": g.old_group.name if g.old_group else None
+        "region": snapshot.name("region", g.region_id),
+        "state": snapshot.name("state", g.state_id),
+        "old_group": snapshot.name("old_group", g.old_group_id)
     } for g in groups])
 
 
@@ -1407,7 +1453,7 @@ def get_groups():
     },
 })
 def delete_group(group_id):
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     group = Group.query.get_or_404(group_id)
 
     # 🎯 ADD ACCESS CONTROL
@@ -1482,7 +1528,7 @@ def delete_group(group_id):
 })
 def create_oldgroup():
     data = request.get_json() or {}
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
 
     print(f"🔍 User: {current_user.id}, Roles: {[r.name for r in current_user.roles]}")
 
@@ -1624,7 +1670,7 @@ def create_oldgroup():
     }
 })
 def update_oldgroup(id):
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     data = request.get_json() or {}
     
     old_group = OldGroup.query.get(id)
@@ -1751,7 +1797,7 @@ def update_oldgroup(id):
     }
 })
 def delete_oldgroup(id):
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     
     old_group = OldGroup.query.get(id)
     if not old_group:
@@ -1820,7 +1866,8 @@ def delete_oldgroup(id):
     }
 })
 def get_oldgroup(id):
-    old_group = OldGroup.query.get(id)
+    snapshot = get_hierarchy_snapshot()
+    old_group = snapshot.get("old_group", id)
     if not old_group:
         return jsonify({"error": "Old Group not found"}), 404
 
@@ -1829,8 +1876,8 @@ def get_oldgroup(id):
         "name": old_group.name,
         "code": old_group.code,
         "leader": old_group.leader,
-        "state": old_group.state.name if old_group.state else None,
-        "region": old_group.region.name if old_group.region else None
+        "state": snapshot.name("state", old_group.state_id),
+        "region": snapshot.name("region", old_group.region_id)
         # REMOVED: group, district references
     }), 200
 @hierarchy_bp.route('/oldgroups', methods=['GET'])
@@ -1859,18 +1906,18 @@ def get_oldgroup(id):
 })
 def get_oldgroups():
 
-    user_id = get_jwt_identity()  # ADD THIS
-    current_user = User.query.get(user_id)  # ADD THIS
+    current_user = get_current_principal()
+    snapshot = get_hierarchy_snapshot()
 
-    oldgroups = restrict_by_access(OldGroup.query, current_user).all()
+    oldgroups = scoped_nodes(snapshot, OldGroup, current_user)
     # oldgroups = OldGroup.query.all()
     return jsonify([{
         "id": o.id,
         "name": o.name,
         "code": o.code,
         "leader": o.leader,
-        "state": o.state.name if o.state else None,
-        "region": o.region.name if o.region else None
+        "state": snapshot.name("state", o.state_id),
+        "region": snapshot.name("region", o.region_id)
         # REMOVED: group, district references
     } for o in oldgroups])
 
@@ -1896,8 +1943,8 @@ def get_oldgroups():
     },
 })
 def oldgroups_by_region(region_id):
-    old_groups = OldGroup.query.filter_by(region_id=region_id).all()
-    return jsonify([og.to_dict() for og in old_groups])
+    old_groups = get_hierarchy_snapshot().children_of("old_group", "region_id", region_id)
+    return jsonify([og._asdict() for og in old_groups])
 
 @hierarchy_bp.route("/groups/by_oldgroup/<int:old_group_id>", methods=['GET'])
 @swag_from({
@@ -1920,8 +1967,8 @@ def oldgroups_by_region(region_id):
     },
 })
 def groups_by_oldgroup(old_group_id):
-    groups = Group.query.filter_by(old_group_id=old_group_id).all()
-    return jsonify([g.to_dict() for g in groups])
+    groups = get_hierarchy_snapshot().children_of("group", "old_group_id", old_group_id)
+    return jsonify([g._asdict() for g in groups])
 
 @hierarchy_bp.route("/districts/by_group/<int:group_id>", methods=['GET'])
 @swag_from({
@@ -1944,8 +1991,8 @@ def groups_by_oldgroup(old_group_id):
     },
 })
 def districts_by_group(group_id):
-    districts = District.query.filter_by(group_id=group_id).all()
-    return jsonify([d.to_dict() for d in districts])
+    districts = get_hierarchy_snapshot().children_of("district", "group_id", group_id)
+    return jsonify([d._asdict() for d in districts])
 
 
 @hierarchy_bp.route("/regions/by_state/<int:state_id>", methods=["GET"])
@@ -1970,8 +2017,8 @@ def districts_by_group(group_id):
     },
 })
 def regions_by_state(state_id):
-    regions = Region.query.filter_by(state_id=state_id).all()
-    return jsonify([r.to_dict() for r in regions])
+    regions = get_hierarchy_snapshot().children_of("region", "state_id", state_id)
+    return jsonify([r._asdict() for r in regions])
 
 @hierarchy_bp.route("/districts/by_region/<int:region_id>", methods=["GET"])
 @swag_from({
@@ -1994,8 +2041,8 @@ def regions_by_state(state_id):
     },
 })
 def districts_by_region(region_id):
-    districts = District.query.filter_by(region_id=region_id).all()
-    return jsonify([d.to_dict() for d in districts])
+    districts = get_hierarchy_snapshot().children_of("district", "region_id", region_id)
+    return jsonify([d._asdict() for d in districts])
 
 @hierarchy_bp.route("/groups/by_district/<int:district_id>", methods=["GET"])
 @swag_from({
@@ -2018,8 +2065,11 @@ def districts_by_region(region_id):
     },
 })
 def groups_by_district(district_id):
-    groups = Group.query.filter_by(district_id=district_id).all()
-    return jsonify([g.to_dict() for g in groups])
+    # Groups sit above districts - return the group this district belongs to
+    snapshot = get_hierarchy_snapshot()
+    district = snapshot.get("district", district_id)
+    group = snapshot.get("group", district.group_id) if district else None
+    return jsonify([group._asdict()] if group else [])
 
 @hierarchy_bp.route("/oldgroups/by_group/<int:group_id>", methods=["GET"])
 @swag_from({
@@ -2042,8 +2092,11 @@ def groups_by_district(district_id):
     },
 })
 def oldgroups_by_group(group_id):
-    old_groups = OldGroup.query.filter_by(group_id=group_id).all()
-    return jsonify([og.to_dict() for og in old_groups])
+    # Old groups sit above groups - return the old group this group belongs to
+    snapshot = get_hierarchy_snapshot()
+    group = snapshot.get("group", group_id)
+    old_group = snapshot.get("old_group", group.old_group_id) if group else None
+    return jsonify([old_group._asdict()] if old_group else [])
 
 
 @hierarchy_bp.route("/group/<int:id>", methods=["PUT"])
@@ -2077,7 +2130,7 @@ def oldgroups_by_group(group_id):
 @jwt_required()
 def update_group(id):
 
-    current_user = User.query.get(get_jwt_identity())
+    current_user = get_current_principal()
     group = Group.query.get_or_404(id)
     data = request.get_json() or {}
     
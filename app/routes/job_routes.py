@@ -0,0 +1,109 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from flasgger import swag_from
+from app.models import ImportJob
+from app.utils.principal import get_current_principal
+from app.utils.csv_import import partial_import_response
+
+job_bp = Blueprint("job_bp", __name__)
+
+WAIT_PARAMETER_DOC = {
+    "name": "wait",
+    "in": "query",
+    "type": "boolean",
+    "required": False,
+    "description": "Run the import inside this request and return the finished job instead of queueing it."
+}
+
+
+def wants_wait(request):
+    """True if the upload asked to run inline (?wait=true) rather than in the background."""
+    return request.args.get("wait", "").lower() in ("1", "true", "yes")
+
+
+def job_submitted_response(job, finished_response=None):
+    """
+    202 with the job and its status URL for queued jobs. Jobs run inline
+    (?wait=true) answer with `finished_response(job)` - the body the endpoint
+    returned before uploads became jobs - or, without one, 201 once
+    succeeded / 400 if the import was rejected, with the job.
+    """
+    body = {"job": job.to_dict(), "status_url": f"/jobs/{job.id}"}
+    if not job.is_finished:
+        body["message"] = f"Import queued as job {job.id}"
+        return jsonify(body), 202
+    if finished_response is not None:
+        return finished_response(job)
+    return jsonify(body), 201 if job.status == ImportJob.SUCCEEDED else 400
+
+
+def csv_import_response(job, noun, strict_body):
+    """
+    Inline (?wait=true) response for a finished CSV upload job: the partial-mode
+    report (400 if nothing was imported), 400 with the offending row for a
+    rejected strict upload, else 201 with `strict_body(report)`.
+    """
+    report = job.result or {}
+    if job.params.get("partial") and "errors" in report:
+        return partial_import_response(report, noun)
+    if job.status != ImportJob.SUCCEEDED:
+        return jsonify({"error": job.error, "row": report.get("row")}), 400
+    return jsonify(strict_body(report)), 201
+
+
+def _can_view(principal, job):
+    return principal.is_super_admin or job.created_by == principal.id
+
+
+@job_bp.route("/<int:job_id>", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Jobs"],
+    "summary": "Get the status and progress of an import job",
+    "parameters": [
+        {"name": "job_id", "in": "path", "type": "integer", "required": True}
+    ],
+    "responses": {
+        "200": {
+            "description": "Job status",
+            "examples": {"application/json": {
+                "id": 12, "kind": "attendance_csv", "status": "running",
+                "progress": {"processed": 15000, "total": 60000, "percent": 25.0},
+                "result": None, "error": None
+            }}
+        },
+        "404": {"description": "Job not found"}
+    }
+})
+def get_job(job_id):
+    principal = get_current_principal()
+    job = ImportJob.query.get(job_id)
+    if not job or not _can_view(principal, job):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@job_bp.route("", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Jobs"],
+    "summary": "List recent import jobs",
+    "description": "The caller's own jobs, newest first. Super Admins see every job.",
+    "parameters": [
+        {"name": "status", "in": "query", "type": "string", "required": False,
+         "enum": ["queued", "running", "succeeded", "failed"]},
+        {"name": "limit", "in": "query", "type": "integer", "required": False, "default": 50}
+    ],
+    "responses": {"200": {"description": "List of jobs"}}
+})
+def list_jobs():
+    principal = get_current_principal()
+    query = ImportJob.query
+    if not principal.is_super_admin:
+        query = query.filter(ImportJob.created_by == principal.id)
+    if request.args.get("status"):
+        query = query.filter(ImportJob.status == request.args["status"])
+
+    limit = min(request.args.get("limit", 50, type=int), 200)
+    jobs = query.order_by(ImportJob.id.desc()).limit(limit).all()
+    return jsonify([job.to_dict() for job in jobs]), 200
@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from flasgger import swag_from
+from app.models import OutboundNotification
+from app.tasks.notification_outbox import retry_dead_notification
+from app.utils.principal import get_current_principal
+
+notification_bp = Blueprint("notification_bp", __name__)
+
+
+@notification_bp.route("", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Notifications"],
+    "summary": "List queued, sent and dead-letter notifications",
+    "description": "Outbox messages, newest first. Super Admin only; filter by status=dead to see dead letters, status=unknown for sends that timed out and may have been delivered.",
+    "parameters": [
+        {"name": "status", "in": "query", "type": "string", "required": False,
+         "enum": ["pending", "sending", "sent", "dead", "unknown"]},
+        {"name": "channel", "in": "query", "type": "string", "required": False, "enum": ["email", "whatsapp"]},
+        {"name": "limit", "in": "query", "type": "integer", "required": False, "default": 50}
+    ],
+    "responses": {
+        "200": {
+            "description": "List of notifications",
+            "examples": {"application/json": [{
+                "id": 41, "channel": "email", "recipient": "admin1@gmail.com", "status": "dead",
+                "attempts": 6, "last_error": "(550, b'Mailbox unavailable')"
+            }]}
+        },
+        "403": {"description": "Only Super Admins can view notifications"}
+    }
+})
+def list_notifications():
+    if not get_current_principal().is_super_admin:
+        return jsonify({"error": "Only Super Admins can view notifications"}), 403
+
+    query = OutboundNotification.query
+    if request.args.get("status"):
+        query = query.filter(OutboundNotification.status == request.args["status"])
+    if request.args.get("channel"):
+        query = query.filter(OutboundNotification.channel == request.args["channel"])
+
+    limit = min(request.args.get("limit", 50, type=int), 200)
+    notifications = query.order_by(OutboundNotification.id.desc()).limit(limit).all()
+    return jsonify([notification.to_dict() for notification in notifications]), 200
+
+
+@notification_bp.route("/<int:notification_id>/retry", methods=["POST"])
+@jwt_required()
+@swag_from({
+    "tags": ["Notifications"],
+    "summary": "Requeue a dead-letter notification",
+    "description": "Gives a dead or unknown message a fresh set of delivery attempts. Super Admin only.",
+    "parameters": [
+        {"name": "notification_id", "in": "path", "type": "integer", "required": True}
+    ],
+    "responses": {
+        "202": {"description": "Notification requeued"},
+        "403": {"description": "Only Super Admins can retry notifications"},
+        "404": {"description": "Notification not found"},
+        "409": {"description": "Notification is not dead or unknown"}
+    }
+})
+def retry_notification(notification_id):
+    if not get_current_principal().is_super_admin:
+        return jsonify({"error": "Only Super Admins can retry notifications"}), 403
+
+    if not OutboundNotification.query.get(notification_id):
+        return jsonify({"error": "Notification not found"}), 404
+    if not retry_dead_notification(notification_id):
+        return jsonify({"error": "Only dead or unknown notifications can be retried"}), 409
+
+    return jsonify({
+        "message": f"Notification {notification_id} requeued",
+        "notification": OutboundNotification.query.get(notification_id).to_dict()
+    }), 202
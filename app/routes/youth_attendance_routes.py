@@ -4,8 +4,13 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import User, YouthAttendance
 from ..extensions import db
 import csv
-from io import StringIO
 from flasgger import swag_from
+from ..utils.principal import get_current_principal
+from ..utils.csv_import import wants_partial_import
+from ..utils.export import EXPORT_BATCH_SIZE, export_format, export_response
+from ..utils.periods import parse_period_args
+from ..tasks.job_runner import submit_job
+from .job_routes import WAIT_PARAMETER_DOC, wants_wait, job_submitted_response, csv_import_response
 
 
 ya_bp = Blueprint("youth_attendance", __name__)
@@ -77,9 +82,13 @@ def create_youth_attendance():
     "consumes": ["multipart/form-data"],
     "parameters": [
         {"name": "attendance_type", "in": "query", "type": "string", "required": True, "description": "weekly or revival"},
-        {"name": "file", "in": "formData", "type": "file", "required": True}
+        {"name": "file", "in": "formData", "type": "file", "required": True},
+        {"name": "mode", "in": "query", "type": "string", "enum": ["strict", "partial"], "required": False,
+         "description": "strict (default) rejects the file on the first bad row; partial imports valid rows and reports the rest"},
+        WAIT_PARAMETER_DOC
     ],
-    "responses": {"201": {"description": "Uploaded"}, "400": {"description": "Bad Request"}}
+    "responses": {"202": {"description": "Queued - poll status_url"}, "201": {"description": "Uploaded (wait=true)"},
+                  "400": {"description": "Bad Request, or (wait=true) the import was rejected"}}
 })
 def upload_youth_csv():
     attendance_type = request.args.get("attendance_type")
@@ -90,51 +99,72 @@ def upload_youth_csv():
     if not file or not file.filename.endswith(".csv"):
         return jsonify({"error": "Invalid file"}), 400
 
-    stream = StringIO(file.stream.read().decode("utf-8"))
-    reader = csv.DictReader(stream)
-
-    records = []
-    for row in reader:
-        try:
-            # convert/clean fields
-            base = {
-                "attendance_type": attendance_type,
-                "state_id": int(row["state_id"]),
-                "region_id": int(row["region_id"]),
-                "district_id": int(row["district_id"]),
-                "group_id": int(row["group_id"]) if row.get("group_id") else None,
-                "old_group_id": int(row["old_group_id"]) if row.get("old_group_id") else None,
-                "year": int(row["year"]),
-                "month": row["month"],
-            }
+    # The file is spooled to disk and imported by the job workers
+    params = {"attendance_type": attendance_type, "partial": wants_partial_import(request)}
+    job = submit_job("youth_csv", file=file, params=params,
+                     created_by=get_current_principal().id, suffix=".csv", wait=wants_wait(request))
+    return job_submitted_response(job, lambda job: csv_import_response(
+        job, "records", lambda report: {"message": f"{report['inserted']} records uploaded"}
+    ))
+
+
+def youth_scope_filters(user):
+    """
+    Query filters for the youth attendance the user may see, narrowed to the
+    user's place in the hierarchy. Returns (filters, error): filters is None
+    when the user has no access, error is a response for misconfigured accounts
+    or a malformed from/to period.
+    """
+    attendance_type = request.args.get("attendance_type")
+    year = request.args.get("year", type=int)
+    month = request.args.get("month")
+    try:
+        period_from, period_to = parse_period_args(request.args)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+    print(f"🔍 User: {user.id}, Roles: {[r.name for r in user.roles]}")
+
+    state_id = region_id = district_id = None
 
-            if attendance_type == "weekly":
-                base.update({
-                    "week": int(row.get("week") or 0),
-                    "member_boys": int(row.get("member_boys") or 0),
-                    "member_girls": int(row.get("member_girls") or 0),
-                    "visitor_boys": int(row.get("visitor_boys") or 0),
-                    "visitor_girls": int(row.get("visitor_girls") or 0),
-                })
-            else:  # revival
-                base.update({
-                    "male": int(row.get("male") or 0),
-                    "female": int(row.get("female") or 0),
-                    "testimony": row.get("testimony"),
-                    "challenges": row.get("challenges"),
-                    "solutions": row.get("solutions"),
-                    "remarks": row.get("remarks"),
-                })
-
-            records.append(YouthAttendance(**base))
-        except KeyError as e:
-            return jsonify({"error": f"Missing column: {e}"}), 400
-        except ValueError as e:
-            return jsonify({"error": f"Invalid value: {e}"}), 400
-
-    db.session.bulk_save_objects(records)
-    db.session.commit()
-    return jsonify({"message": f"{len(records)} records uploaded"}), 201
+    # 🎯 SUPER ADMIN BYPASS - No hierarchy constraints
+    if user.has_role("Super Admin"):
+        print("🎯 Super Admin - viewing ALL records without hierarchy filters")
+
+    elif user.has_role("State Admin"):
+        if not user.state_id:
+            return None, (jsonify({"error": "State Admin account missing state assignment"}), 400)
+        state_id = user.state_id
+        print(f"🔍 State Admin - filtering by state: {state_id}")
+
+    elif user.has_role("Region Admin"):
+        if not user.state_id or not user.region_id:
+            return None, (jsonify({"error": "Region Admin account missing state/region assignment"}), 400)
+        state_id = user.state_id
+        region_id = user.region_id
+        print(f"🔍 Region Admin - filtering by state: {state_id}, region: {region_id}")
+
+    elif user.has_role("District Admin"):
+        if not all([user.state_id, user.region_id, user.district_id]):
+            return None, (jsonify({"error": "District Admin account missing hierarchy assignment"}), 400)
+        state_id = user.state_id
+        region_id = user.region_id
+        district_id = user.district_id
+        print(f"🔍 District Admin - filtering by state: {state_id}, region: {region_id}, district: {district_id}")
+
+    else:
+        return None, None
+
+    return dict(
+        attendance_type=attendance_type,
+        state_id=state_id,        # None = no filter
+        region_id=region_id,
+        district_id=district_id,
+        year=year,
+        month=month,
+        period_from=period_from,
+        period_to=period_to,
+    ), None
 
 
 @ya_bp.route("/youth-attendance", methods=["GET"])
@@ -146,77 +176,70 @@ def upload_youth_csv():
     "parameters": [
         {"name": "attendance_type", "in": "query", "type": "string"},
         {"name": "year", "in": "query", "type": "integer"},
-        {"name": "month", "in": "query", "type": "string"}
+        {"name": "month", "in": "query", "type": "string"},
+        {"name": "from", "in": "query", "type": "string", "required": False, "description": "First month to include, YYYY-MM"},
+        {"name": "to", "in": "query", "type": "string", "required": False, "description": "Last month to include, YYYY-MM"}
     ],
-    "responses": {"200": {"description": "List returned"}, "401": {"description": "Unauthorized"}}
+    "responses": {"200": {"description": "List returned"}, "400": {"description": "Invalid from/to period"},
+                  "401": {"description": "Unauthorized"}}
 })
 def list_youth():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_principal()
 
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    attendance_type = request.args.get("attendance_type")
-    year = request.args.get("year", type=int)
-    month = request.args.get("month")
-
-    print(f"🔍 User: {user.id}, Roles: {[r.name for r in user.roles]}")
+    filters, error = youth_scope_filters(user)
+    if error:
+        return error
+    if filters is None:
+        return jsonify([]), 200
 
-    # 🎯 SUPER ADMIN BYPASS - No hierarchy constraints
-    if user.has_role("Super Admin"):
-        print("🎯 Super Admin - viewing ALL records without hierarchy filters")
-        # Simply pass the query parameters, no hierarchy filters
-        records = youth_attendance_controller.get_all_youth_attendance(
-            attendance_type=attendance_type,
-            state_id=None,        # Explicitly None = no filter
-            region_id=None,       # Explicitly None = no filter
-            district_id=None,     # Explicitly None = no filter
-            year=year,
-            month=month,
-        )
-        
-    else:
-        # For all other roles, apply hierarchy constraints
-        state_id = region_id = district_id = None
-        
-        if user.has_role("State Admin"):
-            if not user.state_id:
-                return jsonify({"error": "State Admin account missing state assignment"}), 400
-            state_id = user.state_id
-            print(f"🔍 State Admin - filtering by state: {state_id}")
-            
-        elif user.has_role("Region Admin"):
-            if not user.state_id or not user.region_id:
-                return jsonify({"error": "Region Admin account missing state/region assignment"}), 400
-            state_id = user.state_id
-            region_id = user.region_id
-            print(f"🔍 Region Admin - filtering by state: {state_id}, region: {region_id}")
-            
-        elif user.has_role("District Admin"):
-            if not all([user.state_id, user.region_id, user.district_id]):
-                return jsonify({"error": "District Admin account missing hierarchy assignment"}), 400
-            state_id = user.state_id
-            region_id = user.region_id
-            district_id = user.district_id
-            print(f"🔍 District Admin - filtering by state: {state_id}, region: {region_id}, district: {district_id}")
-            
-        else:
-            return jsonify([]), 200
-
-        records = youth_attendance_controller.get_all_youth_attendance(
-            attendance_type=attendance_type,
-            state_id=state_id,
-            region_id=region_id,
-            district_id=district_id,
-            year=year,
-            month=month,
-        )
+    records = youth_attendance_controller.get_all_youth_attendance(**filters)
 
     print(f"✅ Found {len(records)} records")
     return jsonify([r.to_dict() for r in records]), 200
 
 
+@ya_bp.route("/youth-attendance/export", methods=["GET"])
+@jwt_required()
+@swag_from({
+    "tags": ["Youth Attendance"],
+    "summary": "Export youth attendance records as CSV or XLSX",
+    "description": "Streams every youth attendance record the user may see (same scope rules and filters as GET /youth-attendance) as a file download.",
+    "produces": ["text/csv", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"],
+    "parameters": [
+        {"name": "format", "in": "query", "type": "string", "enum": ["csv", "xlsx"], "required": False, "description": "File format (default csv)"},
+        {"name": "attendance_type", "in": "query", "type": "string"},
+        {"name": "year", "in": "query", "type": "integer"},
+        {"name": "month", "in": "query", "type": "string"},
+        {"name": "from", "in": "query", "type": "string", "required": False, "description": "First month to include, YYYY-MM"},
+        {"name": "to", "in": "query", "type": "string", "required": False, "description": "Last month to include, YYYY-MM"}
+    ],
+    "responses": {"200": {"description": "File download (streamed)"}, "400": {"description": "Bad Request"},
+                  "403": {"description": "No access to youth attendance records"}}
+})
+def export_youth():
+    fmt = export_format(request)
+    if not fmt:
+        return jsonify({"error": "format must be 'csv' or 'xlsx'"}), 400
+
+    user = get_current_principal()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    filters, error = youth_scope_filters(user)
+    if error:
+        return error
+    if filters is None:
+        return jsonify({"error": "You do not have access to youth attendance records"}), 403
+
+    # 🎯 Rows come off a server-side cursor and go straight into the file
+    rows = youth_attendance_controller.iter_youth_attendance_rows(batch_size=EXPORT_BATCH_SIZE, **filters)
+    return export_response(fmt, rows, youth_attendance_controller.EXPORT_FIELDS, "youth_attendance",
+                           sheet_title="Youth Attendance")
+
+
     
 # def list_youth_attendance():
 #     user_id = get_jwt_identity()
@@ -0,0 +1,57 @@
+import csv
+import pandas as pd
+from app.extensions import db
+from app.models import State
+from app.controllers import attendance_controller, youth_attendance_controller
+from app.utils.excel_importer_new import import_hierarchy_from_excel
+from app.tasks.job_runner import job_handler
+
+
+def _count_csv_rows(path):
+    """Data rows in a CSV (line count minus the header) - the progress total."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def _csv_progress(path, progress):
+    total = _count_csv_rows(path)
+    return lambda rows_read: progress(rows_read, total)
+
+
+@job_handler("hierarchy")
+def run_hierarchy_import(job, progress):
+    state_name = job.params.get("state_name", "Rivers Central")
+    return import_hierarchy_from_excel(job.file_path, state_name, progress=progress)
+
+
+@job_handler("states")
+def run_states_import(job, progress):
+    if job.params.get("format") == "excel":
+        df = pd.read_excel(job.file_path)
+    else:
+        df = pd.read_csv(job.file_path)
+
+    for index, row in df.iterrows():
+        state = State(name=row['name'], code=row['code'], leader=row.get('leader'))
+        db.session.add(state)
+        progress(index + 1, len(df))
+    db.session.commit()
+    return {"message": "States uploaded successfully", "inserted": len(df)}
+
+
+@job_handler("attendance_csv")
+def run_attendance_import(job, progress):
+    with open(job.file_path, encoding="utf-8-sig", newline="") as f:
+        return attendance_controller.import_attendance_rows(
+            csv.DictReader(f), partial=job.params.get("partial", False),
+            progress=_csv_progress(job.file_path, progress),
+        )
+
+
+@job_handler("youth_csv")
+def run_youth_import(job, progress):
+    with open(job.file_path, encoding="utf-8-sig", newline="") as f:
+        return youth_attendance_controller.import_youth_rows(
+            csv.DictReader(f), job.params["attendance_type"], partial=job.params.get("partial", False),
+            progress=_csv_progress(job.file_path, progress),
+        )
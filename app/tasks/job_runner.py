@@ -0,0 +1,257 @@
+import os
+import tempfile
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from app.extensions import db
+from app.models import ImportJob
+from app.utils.csv_import import CsvImportError
+
+# kind -> handler(job, progress) returning a JSON-serialisable result
+JOB_HANDLERS = {}
+
+jobs = ImportJob.__table__
+
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+
+
+def job_handler(kind):
+    """Register the function that runs jobs of `kind`."""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def _upload_dir(app_config):
+    path = app_config.get("JOB_UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "import_jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_upload(file, app_config, suffix=""):
+    """Copy an uploaded file to disk so it outlives the request that brought it in."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=_upload_dir(app_config))
+    with os.fdopen(fd, "wb") as out:
+        file.save(out)
+    return path
+
+
+def submit_job(kind, file=None, params=None, created_by=None, suffix="", wait=False):
+    """
+    Record an import job and hand it to the worker pool.
+
+    With wait=True the job is claimed and run in the calling thread instead,
+    so small uploads can still get their result in one request.
+    """
+    from flask import current_app
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = ImportJob(
+        kind=kind,
+        status=ImportJob.RUNNING if wait else ImportJob.QUEUED,
+        file_path=spool_upload(file, current_app.config, suffix) if file else None,
+        params=params or {},
+        created_by=created_by,
+        attempts=1 if wait else 0,
+        started_at=datetime.utcnow() if wait else None,
+    )
+    db.session.add(job)
+    db.session.commit()
+    print(f"📦 Queued {kind} job {job.id}" if not wait else f"📦 Running {kind} job {job.id} inline")
+
+    if wait:
+        run_job(job.id)
+    else:
+        _wake.set()
+    return db.session.get(ImportJob, job.id)
+
+
+# -----------------------------
+# PROGRESS
+# -----------------------------
+
+class JobProgress:
+    """
+    progress(processed, total=None) callback handed to job handlers.
+
+    Writes go through their own short transaction so the status endpoint
+    sees them while the import's transaction is still open, and are
+    throttled to one every JOB_PROGRESS_INTERVAL seconds.
+    """
+
+    def __init__(self, job_id, interval):
+        self.job_id = job_id
+        self.interval = interval
+        self.last_write = time.monotonic()
+        self.processed = 0
+        self.total = None
+
+    def __call__(self, processed, total=None):
+        self.processed = processed
+        if total is not None:
+            self.total = total
+
+        now = time.monotonic()
+        if now - self.last_write < self.interval:
+            return
+        self.last_write = now
+
+        values = {"processed": processed, "updated_at": datetime.utcnow()}
+        if total is not None:
+            values["total"] = total
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(update(jobs).where(jobs.c.id == self.job_id).values(**values))
+        except Exception as e:
+            # Progress is best-effort - never fail the import over it
+            print(f"⚠️ Could not record progress for job {self.job_id}: {e}")
+
+
+# -----------------------------
+# RUNNING JOBS
+# -----------------------------
+
+def _finish(job_id, status, progress, result=None, error=None):
+    db.session.execute(
+        update(jobs).where(jobs.c.id == job_id).values(
+            status=status, result=result, error=error,
+            processed=progress.processed, total=progress.total,
+            finished_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+        )
+    )
+    db.session.commit()
+
+
+def run_job(job_id):
+    """Run one claimed job to completion and record its outcome."""
+    from flask import current_app
+
+    job = db.session.get(ImportJob, job_id)
+    kind, file_path = job.kind, job.file_path
+    handler = JOB_HANDLERS.get(kind)
+    progress = JobProgress(job_id, current_app.config.get("JOB_PROGRESS_INTERVAL", 2))
+    started = time.perf_counter()
+
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result = handler(job, progress)
+        _finish(job_id, ImportJob.SUCCEEDED, progress, result=result)
+        print(f"✅ {kind} job {job_id} finished in {time.perf_counter() - started:.1f}s")
+    except CsvImportError as e:
+        db.session.rollback()
+        result = e.report if e.report is not None else {"row": e.row}
+        _finish(job_id, ImportJob.FAILED, progress, result=result, error=str(e))
+        print(f"❌ {kind} job {job_id} rejected: {e}")
+    except Exception as e:
+        db.session.rollback()
+        _finish(job_id, ImportJob.FAILED, progress, error=str(e))
+        print(f"❌ {kind} job {job_id} failed: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+    finally:
+        if file_path:
+            try:
+                os.unlink(file_path)
+            except OSError:
+                pass
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running' and return its id.
+    The conditional UPDATE means two workers can never claim the same job.
+    """
+    candidates = db.session.execute(
+        select(jobs.c.id).where(jobs.c.status == ImportJob.QUEUED)
+        .order_by(jobs.c.created_at, jobs.c.id).limit(5)
+    ).scalars().all()
+
+    for job_id in candidates:
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(jobs).where(jobs.c.id == job_id, jobs.c.status == ImportJob.QUEUED).values(
+                status=ImportJob.RUNNING, started_at=now, updated_at=now, attempts=jobs.c.attempts + 1,
+            )
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def requeue_stale_jobs(app_config):
+    """
+    Jobs left 'running' by a worker that died (no progress for JOB_STALE_AFTER
+    seconds) go back on the queue, or fail once JOB_MAX_ATTEMPTS is reached.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=app_config.get("JOB_STALE_AFTER", 1800))
+    max_attempts = app_config.get("JOB_MAX_ATTEMPTS", 3)
+    stale = (jobs.c.status == ImportJob.RUNNING) & (jobs.c.updated_at < cutoff)
+
+    requeued = db.session.execute(
+        update(jobs).where(stale, jobs.c.attempts < max_attempts)
+        .values(status=ImportJob.QUEUED, updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.execute(
+        update(jobs).where(stale, jobs.c.attempts >= max_attempts).values(
+            status=ImportJob.FAILED, error="Worker stopped before the job finished",
+            finished_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+        )
+    )
+    db.session.commit()
+    if requeued:
+        print(f"🔁 Requeued {requeued} stale import jobs")
+
+
+# -----------------------------
+# WORKER POOL
+# -----------------------------
+
+def work_jobs(app):
+    """Worker loop: run queued jobs until stopped, sleeping between polls."""
+    poll_interval = app.config.get("JOB_POLL_INTERVAL", 5)
+    while not _stop.is_set():
+        job_id = None
+        with app.app_context():
+            try:
+                job_id = claim_next_job()
+                if job_id:
+                    run_job(job_id)
+                else:
+                    requeue_stale_jobs(app.config)
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Job worker error: {e}")
+            finally:
+                db.session.remove()
+
+        if job_id is None:
+            _wake.wait(poll_interval)
+            _wake.clear()
+
+
+def start_job_workers(app):
+    """Start JOB_WORKERS background threads for this process (0 disables them)."""
+    # Registers the import handlers
+    from app.tasks import import_jobs  # noqa: F401
+
+    count = app.config.get("JOB_WORKERS", 2)
+    if count <= 0 or _workers:
+        return
+    for n in range(count):
+        worker = threading.Thread(target=work_jobs, args=(app,), name=f"import-job-worker-{n}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+    print(f"🧵 Started {count} import job workers")
+
+
+def stop_job_workers():
+    _stop.set()
+    _wake.set()
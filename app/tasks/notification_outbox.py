@@ -0,0 +1,287 @@
+import threading
+import uuid
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, select, update
+from app.extensions import db
+from app.models import OutboundNotification
+
+outbox = OutboundNotification.__table__
+
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+
+
+def enqueue_notifications(messages, created_by=None):
+    """
+    Insert outbox rows for dicts of {channel, recipient, payload, user_id}
+    and commit. Returns the new row ids in order; the workers send them.
+    """
+    rows = [
+        OutboundNotification(
+            channel=message["channel"],
+            recipient=message["recipient"],
+            payload=message["payload"],
+            user_id=message.get("user_id"),
+            created_by=created_by,
+        )
+        for message in messages
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    if rows:
+        print(f"📬 Queued {len(rows)} notifications")
+        _wake.set()
+    return [row.id for row in rows]
+
+
+# -----------------------------
+# DELIVERY
+# -----------------------------
+
+def retry_delay(attempts, app_config):
+    """Exponential backoff: OUTBOX_RETRY_BASE seconds, doubling per attempt, capped at OUTBOX_RETRY_MAX."""
+    base = app_config.get("OUTBOX_RETRY_BASE", 30)
+    cap = app_config.get("OUTBOX_RETRY_MAX", 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def _submit(row, services):
+    """Hand one claimed row to its channel's sender pool; the future raises if delivery fails."""
+    email_service, whatsapp = services
+    payload = row.payload or {}
+    if row.channel == OutboundNotification.EMAIL:
+        return email_service.deliver_async(
+            to_email=row.recipient,
+            subject=payload.get("subject"),
+            template_name=payload.get("template_name"),
+            context=payload.get("context") or {},
+        )
+    if row.channel == OutboundNotification.WHATSAPP:
+        return whatsapp.deliver_message_async(row.recipient, payload.get("message", ""))
+    raise ValueError(f"Unknown notification channel: {row.channel}")
+
+
+def claim_batch(limit):
+    """
+    Move up to `limit` due 'pending' rows to 'sending' and return them.
+    Rows are tagged with a fresh claim token in one conditional UPDATE, so
+    concurrent workers never pick up the same message.
+    """
+    now = datetime.utcnow()
+    due = (outbox.c.status == OutboundNotification.PENDING) & (outbox.c.next_attempt_at <= now)
+    candidates = select(outbox.c.id).where(due).order_by(outbox.c.next_attempt_at, outbox.c.id).limit(limit)
+
+    token = str(uuid.uuid4())
+    db.session.execute(
+        update(outbox).where(outbox.c.id.in_(candidates.scalar_subquery()), due).values(
+            status=OutboundNotification.SENDING, claim_token=token,
+            attempts=outbox.c.attempts + 1, updated_at=now,
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return OutboundNotification.query.filter_by(claim_token=token, status=OutboundNotification.SENDING).all()
+
+
+def _wait_with_heartbeat(futures, tokens, interval):
+    """
+    Block until every send has finished, touching `updated_at` of the claimed
+    rows every `interval` seconds so a slow batch isn't mistaken for one whose
+    worker died (and requeued by requeue_stale_notifications while still sending).
+    """
+    pending = {future for future in futures if not isinstance(future, Exception)}
+    while pending:
+        _, pending = wait(pending, timeout=interval)
+        if not pending:
+            break
+        try:
+            # Own short transaction, like JobProgress - visible to other workers right away
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(outbox).where(
+                        outbox.c.claim_token.in_(tokens), outbox.c.status == OutboundNotification.SENDING,
+                    ).values(updated_at=datetime.utcnow())
+                )
+        except Exception as e:
+            print(f"⚠️ Could not refresh claimed notifications: {e}")
+
+
+def deliver_batch(rows, app_config, services=None):
+    """
+    Send claimed rows concurrently through the channel services and record
+    each outcome: 'sent', back to 'pending' with backoff, 'dead' once
+    OUTBOX_MAX_ATTEMPTS is reached, or 'unknown' when the send may have gone
+    through (an ambiguous WhatsAppDeliveryError or EmailDeliveryError) and must not be repeated.
+    Returns {"sent": n, "retrying": n, "dead": n, "unknown": n}.
+    Outcomes are only written to rows this batch still owns (same claim token).
+    """
+    if services is None:
+        from app.utils.notification_service import notification_service
+        services = (notification_service.email_service, notification_service.whatsapp)
+
+    max_attempts = app_config.get("OUTBOX_MAX_ATTEMPTS", 6)
+    futures = []
+    for row in rows:
+        try:
+            futures.append(_submit(row, services))
+        except Exception as e:
+            futures.append(e)
+
+    _wait_with_heartbeat(futures, {row.claim_token for row in rows},
+                         app_config.get("OUTBOX_HEARTBEAT_INTERVAL", 60))
+    now = datetime.utcnow()
+    outcomes = []
+    counts = {"sent": 0, "retrying": 0, "dead": 0, "unknown": 0}
+    for row, future in zip(rows, futures):
+        try:
+            if isinstance(future, Exception):
+                raise future
+            future.result()
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if getattr(e, "ambiguous", False):
+                # 🎯 The provider may have delivered it - resending could duplicate the message
+                counts["unknown"] += 1
+                outcomes.append({
+                    "_id": row.id, "_token": row.claim_token, "status": OutboundNotification.UNKNOWN,
+                    "last_error": error, "sent_at": None, "next_attempt_at": now,
+                })
+                print(f"❓ {row.channel} notification {row.id} to {row.recipient} may or may not "
+                      f"have been delivered, not retrying: {error}")
+                continue
+            dead = row.attempts >= max_attempts
+            counts["dead" if dead else "retrying"] += 1
+            outcomes.append({
+                "_id": row.id, "_token": row.claim_token, "status": OutboundNotification.DEAD if dead else OutboundNotification.PENDING,
+                "last_error": error, "sent_at": None,
+                "next_attempt_at": now if dead else now + retry_delay(row.attempts, app_config),
+            })
+            if dead:
+                print(f"☠️ {row.channel} notification {row.id} to {row.recipient} dead after "
+                      f"{row.attempts} attempts: {error}")
+        else:
+            counts["sent"] += 1
+            outcomes.append({
+                "_id": row.id, "_token": row.claim_token, "status": OutboundNotification.SENT, "last_error": None,
+                "sent_at": now, "next_attempt_at": now,
+            })
+
+    if outcomes:
+        db.session.execute(
+            update(outbox).where(
+                outbox.c.id == bindparam("_id"), outbox.c.claim_token == bindparam("_token"),
+            ).values(
+                status=bindparam("status"), last_error=bindparam("last_error"), sent_at=bindparam("sent_at"),
+                next_attempt_at=bindparam("next_attempt_at"), claim_token=None, updated_at=now,
+            ).execution_options(synchronize_session=False),
+            outcomes,
+        )
+        db.session.commit()
+    return counts
+
+
+def requeue_stale_notifications(app_config):
+    """
+    Rows left 'sending' by a worker that died (for OUTBOX_STALE_AFTER seconds)
+    go back to 'pending', or become dead letters once OUTBOX_MAX_ATTEMPTS is reached.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=app_config.get("OUTBOX_STALE_AFTER", 600))
+    max_attempts = app_config.get("OUTBOX_MAX_ATTEMPTS", 6)
+    stale = (outbox.c.status == OutboundNotification.SENDING) & (outbox.c.updated_at < cutoff)
+
+    requeued = db.session.execute(
+        update(outbox).where(stale, outbox.c.attempts < max_attempts).values(
+            status=OutboundNotification.PENDING, claim_token=None, updated_at=datetime.utcnow(),
+        )
+    ).rowcount
+    db.session.execute(
+        update(outbox).where(stale, outbox.c.attempts >= max_attempts).values(
+            status=OutboundNotification.DEAD, claim_token=None,
+            last_error="Worker stopped before the message was sent", updated_at=datetime.utcnow(),
+        )
+    )
+    db.session.commit()
+    if requeued:
+        print(f"🔁 Requeued {requeued} stale notifications")
+
+
+def purge_sent_notifications(app_config):
+    """Delete sent rows older than OUTBOX_KEEP_SENT_DAYS; dead and unknown letters are kept until retried."""
+    cutoff = datetime.utcnow() - timedelta(days=app_config.get("OUTBOX_KEEP_SENT_DAYS", 30))
+    db.session.execute(
+        outbox.delete().where(outbox.c.status == OutboundNotification.SENT, outbox.c.sent_at < cutoff)
+    )
+    db.session.commit()
+
+
+def drain_outbox(app_config, services=None):
+    """Deliver every message that is due now, one batch at a time. Returns the summed counts."""
+    batch_size = app_config.get("OUTBOX_BATCH_SIZE", 200)
+    totals = {"sent": 0, "retrying": 0, "dead": 0, "unknown": 0}
+    while True:
+        rows = claim_batch(batch_size)
+        if not rows:
+            return totals
+        for key, count in deliver_batch(rows, app_config, services).items():
+            totals[key] += count
+
+
+def retry_dead_notification(notification_id):
+    """Give a dead (or unknown) letter a fresh set of attempts. Returns False if it is neither."""
+    revived = db.session.execute(
+        update(outbox).where(
+            outbox.c.id == notification_id,
+            outbox.c.status.in_((OutboundNotification.DEAD, OutboundNotification.UNKNOWN)),
+        ).values(
+            status=OutboundNotification.PENDING, attempts=0, next_attempt_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+    ).rowcount
+    db.session.commit()
+    if revived:
+        _wake.set()
+    return bool(revived)
+
+
+# -----------------------------
+# WORKER POOL
+# -----------------------------
+
+def work_outbox(app):
+    """Worker loop: drain due notifications until stopped, sleeping between polls."""
+    poll_interval = app.config.get("OUTBOX_POLL_INTERVAL", 5)
+    while not _stop.is_set():
+        with app.app_context():
+            try:
+                totals = drain_outbox(app.config)
+                if any(totals.values()):
+                    print(f"📨 Outbox: {totals['sent']} sent, {totals['retrying']} to retry, {totals['dead']} dead, "
+                          f"{totals['unknown']} unknown")
+                requeue_stale_notifications(app.config)
+                purge_sent_notifications(app.config)
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Outbox worker error: {e}")
+            finally:
+                db.session.remove()
+
+        _wake.wait(poll_interval)
+        _wake.clear()
+
+
+def start_outbox_workers(app):
+    """Start OUTBOX_WORKERS background threads for this process (0 disables them)."""
+    count = app.config.get("OUTBOX_WORKERS", 1)
+    if count <= 0 or _workers:
+        return
+    for n in range(count):
+        worker = threading.Thread(target=work_outbox, args=(app,), name=f"outbox-worker-{n}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+    print(f"🧵 Started {count} notification outbox workers")
+
+
+def stop_outbox_workers():
+    _stop.set()
+    _wake.set()
@@ -12,6 +12,8 @@ from flask_jwt_extended import get_jwt_identity
 from app.models import User
 from app.models.hierarchy import OldGroup
 from ..extensions import db
+from .principal import get_current_principal
+from .hierarchy_closure import ancestor_ids, is_within
 
 
 
@@ -22,8 +24,7 @@ def require_role(allowed_roles):
     def wrapper(fn):
         @wraps(fn)
         def decorated(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            user = get_current_principal()
 
             if not user:
                 return jsonify({"error": "Invalid user"}), 401
@@ -270,9 +271,8 @@ def restrict_by_access(query, user):
     
 
 def get_current_user():
-    """Get current user with eager loading of roles for performance"""
-    user_id = get_jwt_identity()
-    return User.query.options(db.joinedload(User.roles)).get(user_id)
+    """Get the current user's cached principal (roles and permissions preloaded)"""
+    return get_current_principal()
 
 def apply_scope_filters(model, user):
     """
@@ -318,30 +318,23 @@ def apply_scope_filters(model, user):
     # For models with old_group_id but user has group_id
     elif user.group_id and hasattr(model, "old_group_id"):
         print(f"🔐 Filtering by old_group_id through user's group")
-        user_group = Group.query.get(user.group_id)
-        if user_group and user_group.old_group_id:
-            return query.filter(model.old_group_id == user_group.old_group_id)
-    
-    # For models with district_id but user has group_id
-    elif user.group_id and hasattr(model, "district_id"):
-        print(f"🔐 Filtering by district_id through user's group")
-        user_group = Group.query.get(user.group_id)
-        if user_group and user_group.district_id:
-            return query.filter(model.district_id == user_group.district_id)
+        old_group_id = ancestor_ids("group", user.group_id).get("old_group")
+        if old_group_id:
+            return query.filter(model.old_group_id == old_group_id)
     
     # For models with region_id but user has district_id
     elif user.district_id and hasattr(model, "region_id"):
         print(f"🔐 Filtering by region_id through user's district")
-        user_district = District.query.get(user.district_id)
-        if user_district and user_district.region_id:
-            return query.filter(model.region_id == user_district.region_id)
+        region_id = ancestor_ids("district", user.district_id).get("region")
+        if region_id:
+            return query.filter(model.region_id == region_id)
     
     # For models with state_id but user has region_id
     elif user.region_id and hasattr(model, "state_id"):
         print(f"🔐 Filtering by state_id through user's region")
-        user_region = Region.query.get(user.region_id)
-        if user_region and user_region.state_id:
-            return query.filter(model.state_id == user_region.state_id)
+        state_id = ancestor_ids("region", user.region_id).get("state")
+        if state_id:
+            return query.filter(model.state_id == state_id)
 
     print("🚫 No applicable scope filters - user may not have access")
     return query.filter_by(id=None)  # No access by default
@@ -404,7 +397,9 @@ def validate_hierarchy_access(user, target_entity):
         # User can access if it's their group OR if they're District Admin for that district, etc.
         if user.group_id == target_entity.id:
             return True
-        if user.district_id == target_entity.district_id and any(r.name.lower() == "district admin" for r in user.roles):
+        # Groups sit above districts - a district admin may see the group containing their district
+        if user.district_id and any(r.name.lower() == "district admin" for r in user.roles) \
+                and is_within("district", user.district_id, "group", target_entity.id):
             return True
         if user.region_id == target_entity.region_id and any(r.name.lower() == "region admin" for r in user.roles):
             return True
@@ -416,8 +411,7 @@ def validate_hierarchy_access(user, target_entity):
         if user.old_group_id == target_entity.id:
             return True
         # Check through group relationships
-        user_group = Group.query.get(user.group_id) if user.group_id else None
-        if user_group and user_group.old_group_id == target_entity.id:
+        if user.group_id and is_within("group", user.group_id, "old_group", target_entity.id):
             return True
     
     return False
@@ -0,0 +1,208 @@
+from datetime import datetime
+from sqlalchemy import and_, bindparam, func, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models import Attendance, AttendanceRollup
+
+# Hierarchy level -> Attendance column holding that level's entity id
+ROLLUP_LEVELS = {
+    "state": "state_id",
+    "region": "region_id",
+    "old_group": "old_group_id",
+    "group": "group_id",
+    "district": "district_id",
+}
+
+COUNT_FIELDS = ("men", "women", "youth_boys", "youth_girls", "children_boys", "children_girls")
+
+# Columns of uq_attendance_rollup_key, in the order _rollup_keys yields them
+ROLLUP_KEY_FIELDS = ("level", "entity_id", "year", "month", "week", "service_type")
+SUM_FIELDS = (*COUNT_FIELDS, "record_count")
+
+
+def _rollup_keys(get):
+    """Yield one rollup key per hierarchy level the record belongs to."""
+    for level, column in ROLLUP_LEVELS.items():
+        entity_id = get(column)
+        if entity_id is not None:
+            yield (level, entity_id, get("year"), get("month"), get("week"), get("service_type"))
+
+
+def snapshot(record):
+    """
+    Capture the rollup-relevant values of a record (used before an update).
+    `record` may be an Attendance instance or a plain dict of column values.
+    """
+    get = record.get if isinstance(record, dict) else lambda field: getattr(record, field)
+    return {
+        "keys": list(_rollup_keys(get)),
+        "values": [get(field) or 0 for field in COUNT_FIELDS],
+        "year": get("year"),
+        "month": get("month"),
+    }
+
+
+def apply_snapshots(snapshots, sign=1):
+    """
+    Add (sign=1) or subtract (sign=-1) record snapshots from the rollup table.
+    Does not commit - callers commit together with the attendance write.
+
+    Deltas are applied in the database (`men = men + delta`) rather than read,
+    changed and written back, so concurrent writes to the same state or region
+    row can't lose each other's updates.
+    """
+    deltas = {}
+    for snap in snapshots:
+        for key in snap["keys"]:
+            delta = deltas.setdefault(key, [0] * (len(COUNT_FIELDS) + 1))
+            for i, value in enumerate(snap["values"]):
+                delta[i] += sign * value
+            delta[-1] += sign
+
+    if not deltas:
+        return
+
+    table = AttendanceRollup.__table__
+    now = datetime.utcnow()
+    # Sorted so concurrent batches lock shared rows in the same order
+    rows = [
+        {**dict(zip(ROLLUP_KEY_FIELDS, key)), **dict(zip(COUNT_FIELDS, delta)),
+         "record_count": delta[-1], "updated_at": now}
+        for key, delta in sorted(deltas.items())
+    ]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY_FIELDS),
+            set_={
+                **{field: table.c[field] + stmt.excluded[field] for field in SUM_FIELDS},
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.session.execute(stmt, rows)
+    else:
+        # No native upsert - add to the rows that exist in one UPDATE, insert the rest
+        existing = _existing_rollup_keys(table, deltas)
+        updates = [row for row in rows if _key(row) in existing]
+        inserts = [row for row in rows if _key(row) not in existing]
+        if updates:
+            db.session.execute(
+                table.update().where(
+                    *[table.c[field] == bindparam(f"_key_{field}") for field in ROLLUP_KEY_FIELDS]
+                ).values(
+                    {**{field: table.c[field] + bindparam(f"_delta_{field}") for field in SUM_FIELDS},
+                     "updated_at": now}
+                ),
+                [{**{f"_key_{field}": row[field] for field in ROLLUP_KEY_FIELDS},
+                  **{f"_delta_{field}": row[field] for field in SUM_FIELDS}}
+                 for row in updates],
+            )
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+
+    # Drop rows once the last contributing record is gone
+    if sign < 0:
+        db.session.execute(
+            table.delete().where(
+                table.c.record_count <= 0,
+                _keys_clause(table, deltas),
+            )
+        )
+
+
+def _key(row):
+    return tuple(row[field] for field in ROLLUP_KEY_FIELDS)
+
+
+def _keys_clause(table, keys):
+    """Match the given rollup keys, grouped by (level, year, month) so the level/period index is used."""
+    wanted = {}
+    for level, entity_id, year, month, _week, _service_type in keys:
+        wanted.setdefault((level, year, month), set()).add(entity_id)
+    return or_(*[
+        and_(table.c.level == level, table.c.year == year, table.c.month == month,
+             table.c.entity_id.in_(sorted(entity_ids)))
+        for (level, year, month), entity_ids in wanted.items()
+    ])
+
+
+def _existing_rollup_keys(table, keys):
+    rows = db.session.execute(
+        select(*[table.c[field] for field in ROLLUP_KEY_FIELDS]).where(_keys_clause(table, keys))
+    )
+    return {tuple(row) for row in rows}
+
+
+def add_records(records):
+    apply_snapshots([snapshot(r) for r in records], sign=1)
+
+
+def remove_records(records):
+    apply_snapshots([snapshot(r) for r in records], sign=-1)
+
+
+def rebuild_attendance_rollups():
+    """Recompute the whole rollup table from raw attendance rows."""
+    AttendanceRollup.query.delete()
+
+    for level, column in ROLLUP_LEVELS.items():
+        entity_col = getattr(Attendance, column)
+        select = db.session.query(
+            literal(level),
+            entity_col,
+            Attendance.year,
+            Attendance.month,
+            Attendance.week,
+            Attendance.service_type,
+            *[func.coalesce(func.sum(getattr(Attendance, f)), 0) for f in COUNT_FIELDS],
+            func.count(Attendance.id)
+        ).filter(
+            entity_col.isnot(None)
+        ).group_by(
+            entity_col, Attendance.year, Attendance.month, Attendance.week, Attendance.service_type
+        )
+
+        db.session.execute(
+            AttendanceRollup.__table__.insert().from_select(
+                ["level", "entity_id", "year", "month", "week", "service_type",
+                 *COUNT_FIELDS, "record_count"],
+                select
+            )
+        )
+
+    db.session.commit()
+
+
+def get_rollup_totals(level, year, month=None, week=None, service_type=None, entity_ids=None):
+    """
+    Summed attendance per entity at `level` for the given period.
+    Returns {entity_id: {field: total, ..., "record_count": n}}.
+    """
+    query = db.session.query(
+        AttendanceRollup.entity_id,
+        *[func.sum(getattr(AttendanceRollup, f)).label(f) for f in COUNT_FIELDS],
+        func.sum(AttendanceRollup.record_count).label("record_count")
+    ).filter(
+        AttendanceRollup.level == level,
+        AttendanceRollup.year == year
+    )
+
+    if month:
+        query = query.filter(AttendanceRollup.month == month)
+    if week is not None:
+        query = query.filter(AttendanceRollup.week == week)
+    if service_type:
+        query = query.filter(AttendanceRollup.service_type == service_type)
+    if entity_ids is not None:
+        query = query.filter(AttendanceRollup.entity_id.in_(entity_ids))
+
+    totals = {}
+    for row in query.group_by(AttendanceRollup.entity_id).all():
+        totals[row.entity_id] = {
+            **{f: int(getattr(row, f) or 0) for f in COUNT_FIELDS},
+            "record_count": int(row.record_count or 0),
+        }
+    return totals
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+
+
+class LocalCache:
+    """
+    Process-local TTL cache with the same small surface as RedisCache
+    (get / set / incr / delete), so either can back the app cache.
+    Values are shared between callers - treat them as read-only.
+    Counters made by incr() (cache version numbers) live in their own dict
+    and are never evicted: losing one would reset a version to 0 and bring
+    back entries cached under that older version.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (value, expires_at)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones if still full. Caller holds the lock."""
+        now = time.monotonic()
+        for key in [k for k, (_, exp) in self._data.items() if exp is not None and exp < now]:
+            del self._data[key]
+        while len(self._data) >= self.max_entries:
+            del self._data[next(iter(self._data))]
+
+
+class RedisCache:
+    """Redis-backed cache for multi-worker deployments. Values must be JSON serializable."""
+
+    def __init__(self, url, prefix="church_attendance:"):
+        import redis  # optional dependency, only needed when CACHE_REDIS_URL is set
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+_cache = LocalCache()
+
+
+def get_cache():
+    return _cache
+
+
+def set_cache_backend(backend):
+    global _cache
+    _cache = backend
+
+
+def init_cache(app):
+    """Use Redis when CACHE_REDIS_URL is configured, otherwise the process-local cache."""
+    redis_url = app.config.get("CACHE_REDIS_URL")
+    if redis_url:
+        set_cache_backend(RedisCache(redis_url))
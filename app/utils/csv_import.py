@@ -1,44 +1,131 @@
-import csv
-from io import TextIOWrapper
-from ..models.state import State
-from ..extensions import db
+from flask import jsonify
+from sqlalchemy import select
+from app.extensions import db
+from app.models import State, Region, OldGroup, Group, District
 
-def import_states_from_file(file_storage):
+IMPORT_BATCH_SIZE = 5000
+
+# Cap on the per-row error list returned to the client (error_count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+# Hierarchy column -> (model, label used in error messages)
+HIERARCHY_FIELDS = {
+    "state_id": (State, "State"),
+    "region_id": (Region, "Region"),
+    "old_group_id": (OldGroup, "Old Group"),
+    "group_id": (Group, "Group"),
+    "district_id": (District, "District"),
+}
+
+
+class CsvImportError(ValueError):
+    """A CSV row could not be imported; the message is safe to return to the client."""
+
+    def __init__(self, message, row=None, report=None):
+        super().__init__(message)
+        self.row = row
+        self.report = report  # the partial-mode report when no row at all was imported
+
+
+def load_hierarchy_ids(fields=HIERARCHY_FIELDS):
+    """One id set per hierarchy level, used to validate foreign keys without per-row queries."""
+    return {
+        field: set(db.session.execute(select(HIERARCHY_FIELDS[field][0].id)).scalars())
+        for field in fields
+    }
+
+
+def _row_error(row, parse_row, known_ids, missing_message, invalid_message):
+    """Parse and validate one row. Returns (values, None) or (None, error message)."""
+    try:
+        values = parse_row(row)
+    except KeyError as e:
+        return None, missing_message.format(e)
+    except ValueError as e:
+        return None, invalid_message.format(e)
+
+    for field, ids in known_ids.items():
+        entity_id = values.get(field)
+        if entity_id is not None and entity_id not in ids:
+            return None, f"{HIERARCHY_FIELDS[field][1]} with ID {entity_id} does not exist"
+    return values, None
+
+
+def import_csv_rows(rows, parse_row, insert_batch, partial=False, batch_size=IMPORT_BATCH_SIZE,
+                    missing_message="Missing column in CSV: {}",
+                    invalid_message="Invalid data format in row: {}", progress=None):
     """
-    Accepts a Werkzeug FileStorage from request.files.
-    Expects CSV with headers: name,code,leader  (case-insensitive)
-    Returns a summary dict.
+    Validate and insert rows from any iterable of CSV dicts in one pass.
+
+    `parse_row(row)` turns a CSV dict into column values (raising KeyError /
+    ValueError), and `insert_batch(values_list)` writes a batch without
+    committing. It may return (inserted, updated) when it doesn't simply
+    insert every row, e.g. an upsert that collapses duplicate keys. Every
+    hierarchy *_id in the values is checked against preloaded id sets.
+
+    strict (default): the first bad row raises CsvImportError and nothing is
+    committed. partial: bad rows are skipped and reported, and each valid
+    batch is committed as soon as it is written; if no row was imported at
+    all, CsvImportError is raised with the report attached.
+
+    Returns {"inserted": n, "updated": n, "error_count": n, "errors": [{"row": line, "error": msg}]},
+    where `row` is the CSV line number (the header is line 1).
+
+    `progress(rows_read)`, if given, is called after every batch - background
+    jobs use it to report how far the import has got.
     """
-    # make sure file is treated as text
-    wrapper = TextIOWrapper(file_storage.stream, encoding="utf-8")
-    reader = csv.DictReader(wrapper)
-    created = 0
-    updated = 0
-    errors = []
-    for i, row in enumerate(reader, start=1):
-        try:
-            name = (row.get("name") or row.get("Name") or "").strip()
-            code = (row.get("code") or row.get("Code") or "").strip()
-            leader = (row.get("leader") or row.get("Leader") or "").strip()
-            if not name:
-                errors.append({"row": i, "error": "name missing"})
-                continue
+    known_ids = load_hierarchy_ids()
+    report = {"inserted": 0, "updated": 0, "error_count": 0, "errors": []}
+    batch = []
+    line = 1
+
+    def flush():
+        inserted, updated = insert_batch(batch) or (len(batch), 0)
+        report["inserted"] += inserted
+        report["updated"] += updated
+        if partial:
+            db.session.commit()
+        if progress:
+            progress(line - 1)
 
-            existing = State.query.filter_by(name=name).first()
-            if existing:
-                existing.code = code or existing.code
-                existing.leader = leader or existing.leader
-                updated += 1
-            else:
-                s = State(name=name, code=code, leader=leader)
-                db.session.add(s)
-                created += 1
-        except Exception as e:
-            errors.append({"row": i, "error": str(e)})
     try:
+        for line, row in enumerate(rows, start=2):
+            values, error = _row_error(row, parse_row, known_ids, missing_message, invalid_message)
+            if error:
+                if not partial:
+                    raise CsvImportError(error, row=line)
+                report["error_count"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"row": line, "error": error})
+                continue
+
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+
+        if batch:
+            flush()
         db.session.commit()
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return {"created": 0, "updated": 0, "errors": [{"commit": str(e)}]}
+        raise
+
+    if partial and not report["inserted"] and not report["updated"]:
+        raise CsvImportError(f"No rows were imported, {report['error_count']} rows rejected", report=report)
+    return report
+
+
+def wants_partial_import(request):
+    """True if the upload asked for ?mode=partial (commit valid rows, report bad ones)."""
+    return request.args.get("mode") == "partial"
+
 
-    return {"created": created, "updated": updated, "errors": errors}
+def partial_import_response(report, noun):
+    """JSON response for a partial-mode upload: 201 if anything was imported, else 400."""
+    body = {
+        "message": f"{report['inserted'] + report['updated']} {noun} uploaded successfully, "
+                   f"{report['error_count']} rows rejected",
+        **report,
+    }
+    return jsonify(body), 201 if report["inserted"] or report["updated"] else 400
@@ -1,4 +1,8 @@
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
@@ -13,70 +17,265 @@ file_handler = logging.FileHandler("logs/email_errors.log")
 file_handler.setLevel(logging.ERROR)
 logger.addHandler(file_handler)
 
+# Defaults for the pooled transport
+DEFAULT_POOL_SIZE = 4       # open connections, and sender threads for send_many
+DEFAULT_MAX_IDLE = 60       # seconds an idle connection is kept before reconnecting
+DEFAULT_TIMEOUT = 30        # socket timeout for connect and every SMTP command
+
+# Errors that reject one message but leave the connection usable (smtplib sends RSET)
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)
+
+
+class EmailDeliveryError(Exception):
+    """
+    Sending failed after the message data went out, so the server may have
+    accepted it (`ambiguous`). Like WhatsAppDeliveryError, the outbox must not
+    send it again automatically.
+    """
+
+    def __init__(self, message, ambiguous=False):
+        super().__init__(message)
+        self.ambiguous = ambiguous
+
+
+class PooledSMTP(smtplib.SMTP):
+    """
+    smtplib.SMTP that records how far the message in flight got, so the pool
+    can tell a failure that sent nothing from one after the DATA command.
+    """
+
+    attempts = 0        # messages this connection has been asked to send
+    reused = False      # the message in flight isn't the connection's first
+    in_data = False     # the message in flight reached DATA
+
+    def sendmail(self, *args, **kwargs):
+        self.reused = self.attempts > 0
+        self.attempts += 1
+        self.in_data = False
+        return super().sendmail(*args, **kwargs)
+
+    def data(self, msg):
+        self.in_data = True
+        return super().data(msg)
+
+
+def _quit(connection):
+    try:
+        connection.quit()
+    except Exception:
+        connection.close()
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections reused across messages, so a reminder run
+    pays one connect / STARTTLS / login per connection instead of per email.
+
+    At most `size` connections are open at once; callers beyond that wait for
+    a free one. Idle connections older than `max_idle` seconds are replaced,
+    since servers drop them. A send is retried once on a fresh connection only
+    when nothing can have been delivered yet (see _safe_to_retry).
+    """
+
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE, max_idle=DEFAULT_MAX_IDLE):
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []  # [(connection, last used)], most recently used last
+        self._lock = threading.Lock()
+        self.size = size
+        self.max_idle = max_idle
+        self.connections_opened = 0
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                connection, last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.max_idle:
+                    return connection
+                _quit(connection)
+            self.connections_opened += 1
+        return self._connect()
+
+    def _checkin(self, connection):
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection; it goes back to the pool unless it broke."""
+        with self._slots:
+            connection = self._checkout()
+            try:
+                yield connection
+            except MESSAGE_ERRORS:
+                self._checkin(connection)
+                raise
+            except Exception:
+                connection.close()
+                raise
+            self._checkin(connection)
+
+    @staticmethod
+    def _safe_to_retry(connection, error):
+        """
+        True if a failed send cannot have delivered anything: connecting failed,
+        or a reused idle connection turned out to be closed before DATA.
+        """
+        if connection is None:
+            return True
+        return (isinstance(error, smtplib.SMTPServerDisconnected)
+                and getattr(connection, "reused", False) and not getattr(connection, "in_data", True))
+
+    def sendmail(self, from_addr, to_addrs, message):
+        for attempt in (1, 2):
+            connection = None
+            try:
+                with self.connection() as connection:
+                    return connection.sendmail(from_addr, to_addrs, message)
+            except MESSAGE_ERRORS:
+                raise
+            except (smtplib.SMTPException, OSError) as e:
+                if getattr(connection, "in_data", False):
+                    # 🎯 The server may already have the message - a resend could duplicate it
+                    raise EmailDeliveryError(f"{e} (message may have been delivered)", ambiguous=True) from e
+                if attempt == 2 or not self._safe_to_retry(connection, e):
+                    raise
+                logger.info(f"SMTP connection failed before sending ({e}), retrying on a new connection")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            _quit(connection)
+
 
 class EmailService:
-    def __init__(self, smtp_server, smtp_port, smtp_user, smtp_password, use_tls=True):
+    def __init__(self, smtp_server, smtp_port, smtp_user, smtp_password, use_tls=True,
+                 pool_size=DEFAULT_POOL_SIZE, max_idle=DEFAULT_MAX_IDLE, timeout=DEFAULT_TIMEOUT):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.smtp_user = smtp_user
         self.smtp_password = smtp_password
         self.use_tls = use_tls
+        self.timeout = timeout
+        self.pool = SMTPConnectionPool(self._open_connection, size=pool_size, max_idle=max_idle)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._templates = {}
 
-    def send_email(self, to_email, subject, template_name, context={}):
+    def _open_connection(self):
+        server = PooledSMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
         try:
-            html_content = self._load_template(template_name, context)
+            if self.use_tls:
+                server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
 
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = self.smtp_user
-            msg["To"] = to_email
+    def _build_message(self, to_email, subject, template_name, context):
+        html_content = self._load_template(template_name, context)
 
-            part2 = MIMEText(html_content, "html")
-            msg.attach(part2)
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.smtp_user
+        msg["To"] = to_email
 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                if self.use_tls:
-                    server.starttls()
+        part2 = MIMEText(html_content, "html")
+        msg.attach(part2)
+        return msg.as_string()
 
-                server.login(self.smtp_user, self.smtp_password)
-                server.sendmail(self.smtp_user, to_email, msg.as_string())
+    def deliver(self, to_email, subject, template_name, context={}):
+        """Send one email, raising on failure (send_email is the logging, True/False version)."""
+        message = self._build_message(to_email, subject, template_name, context)
+        self.pool.sendmail(self.smtp_user, to_email, message)
 
+    def send_email(self, to_email, subject, template_name, context={}):
+        try:
+            self.deliver(to_email, subject, template_name, context)
             return True
 
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
 
+    def _sender_pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp-sender")
+            return self._executor
+
+    def send_email_async(self, to_email, subject, template_name, context={}):
+        """Queue one email on the bounded sender pool; the future resolves to send_email's result."""
+        return self._sender_pool().submit(self.send_email, to_email, subject, template_name, context)
+
+    def deliver_async(self, to_email, subject, template_name, context={}):
+        """Queue one email on the sender pool; the future raises if delivery failed."""
+        return self._sender_pool().submit(self.deliver, to_email, subject, template_name, context)
+
+    def send_many(self, emails):
+        """
+        Send dicts of send_email keyword arguments through the sender pool,
+        one thread per pooled connection. Returns the True/False results in order.
+        """
+        futures = [self.send_email_async(**email) for email in emails]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+        self.pool.close()
 
     def _load_template(self, template_name, context):
         """
         Load HTML template & replace {{variables}} with actual values
         """
-        template_path = Path(f"app/email_templates/{template_name}.html")
+        content = self._templates.get(template_name)
+        if content is None:
+            template_path = Path(f"app/email_templates/{template_name}.html")
 
-        if not template_path.exists():
-            raise FileNotFoundError(f"Email template '{template_name}' not found.")
+            if not template_path.exists():
+                raise FileNotFoundError(f"Email template '{template_name}' not found.")
 
-        content = template_path.read_text()
+            content = self._templates[template_name] = template_path.read_text()
 
         for key, value in context.items():
             content = content.replace(f"{{{{{key}}}}}", str(value))
 
         return content
 
+
+# One pooled service per SMTP account, shared by every send_email() call
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_email_service(smtp_server, smtp_port, smtp_user, smtp_password, use_tls=True, **options):
+    key = (smtp_server, smtp_port, smtp_user, smtp_password, use_tls)
+    with _services_lock:
+        if key not in _services:
+            _services[key] = EmailService(smtp_server, smtp_port, smtp_user, smtp_password, use_tls, **options)
+        return _services[key]
+
+
 # Add this at the bottom of your email_service.py file
 def send_email(to_email, subject, template_name, context={}):
     """
     Standalone function for easy importing
     """
     from flask import current_app
-    
-    email_service = EmailService(
+
+    email_service = get_email_service(
         smtp_server=current_app.config.get('SMTP_SERVER'),
         smtp_port=current_app.config.get('SMTP_PORT', 587),
         smtp_user=current_app.config.get('EMAIL_USER'),
         smtp_password=current_app.config.get('EMAIL_PASSWORD'),
-        use_tls=True
+        use_tls=True,
+        pool_size=current_app.config.get('SMTP_POOL_SIZE', DEFAULT_POOL_SIZE),
+        max_idle=current_app.config.get('SMTP_MAX_IDLE', DEFAULT_MAX_IDLE),
     )
-    
-    return email_service.send_email(to_email, subject, template_name, context)
\ No newline at end of file
+
+    return email_service.send_email(to_email, subject, template_name, context)
@@ -1,291 +1,359 @@
 # app/utils/excel_importer_enhanced.py
+import time
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
+from sqlalchemy.orm import selectinload
+from werkzeug.security import generate_password_hash
 from app.extensions import db
 from app.models import State, Region, OldGroup, Group, District, User, Role
 
+# Objects added per flush while writing the plan (one INSERT batch each)
+FLUSH_BATCH_SIZE = 500
+
+# Words that mark a cell as a group name even when it is a single word
+GROUP_WORDS = ['GROUP', 'DISTRICT', 'UNIPORT', 'CORPER', 'FELLOWSHIP']
+
+# How far below a group cell its districts may be listed
+DISTRICT_SCAN_ROWS = 30
+
+DEFAULT_USER_PASSWORD = "12345678"
+
+
 def safe_strip(value):
     """Safely strip any value - converts to string first"""
     if value is None or pd.isna(value):
         return ""
     return str(value).strip()
 
-def create_group_user(group_name, group, district=None):
+
+def group_user_email(group_name):
     """
-    Create a user for a group with COMPLETE hierarchy links
-    Username/email format: groupname.group (lowercase, no spaces, with .group suffix)
+    Username/email for a group's admin user: groupname.group (lowercase, no spaces).
     Handles cases where 'group' is already in the name
     """
     # Clean group name for email
     clean_name = group_name.lower().replace(' ', '_').replace("'", "").replace("-", "_")
-    
+
     # 🎯 REMOVE "group" suffix if already present to avoid duplication
     if clean_name.endswith('_group'):
         clean_name = clean_name[:-6]  # Remove "_group"
     elif clean_name.endswith('group'):
         clean_name = clean_name[:-5]  # Remove "group"
-    
+
     # 🎯 ADD .group suffix (no domain)
-    email = f"{clean_name}.group"
-    
-    print(f"🔄 Creating user with email: '{email}' for group '{group_name}'")
-    
-    # Check if user already exists
-    existing_user = User.query.filter_by(email=email).first()
-    if existing_user:
-        print(f"📧 User already exists, updating: {email}")
-        user = existing_user
+    return f"{clean_name}.group"
+
+
+@contextmanager
+def _phase(timings, name):
+    started = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - started, 3)
+
+
+# -----------------------------
+# PHASE 1: PARSE THE SHEET INTO A PLAN
+# -----------------------------
+
+def sheet_cells(df):
+    """The sheet as stripped strings, with empty / NaN cells as "" - safe_strip over the whole frame."""
+    raw = df.where(df.notna(), "").astype(str).to_numpy(dtype=object)
+    labels, values = pd.factorize(raw.ravel())
+    stripped = np.array([value.strip() for value in values], dtype=object)
+    return pd.DataFrame(stripped[labels].reshape(raw.shape))
+
+
+def _next_index(mask):
+    """
+    For every (row, col), the first row at or below it where `mask` is True
+    (len(mask) if there is none) - a reverse running minimum down each column.
+    """
+    rows = np.arange(mask.shape[0])[:, None]
+    candidates = np.where(mask, rows, mask.shape[0])
+    return np.minimum.accumulate(candidates[::-1], axis=0)[::-1]
+
+
+def parse_hierarchy_sheet(cells, progress=None):
+    """
+    Detect the sheet layout with vectorized masks and return the import plan:
+    [{"name", "code", "groups": [{"name", "code", "districts": [(name, code)]}]}]
+
+    Layout rules: any cell containing "OLD GROUP" opens a new old group; from
+    then on every multi-word (or GROUP_WORDS) cell is a group under it, with
+    its districts listed in the same column in the rows below.
+    """
+    grid = cells.to_numpy(dtype=object)
+    n_rows = grid.shape[0]
+    if n_rows == 0:
+        return []
+
+    # Sheets repeat a few values (mostly "") many times, so each string test
+    # runs once per distinct value and is broadcast back over the grid.
+    labels, values = pd.factorize(grid.ravel())
+
+    def mask(test):
+        flags = np.fromiter((test(value) for value in values), dtype=bool, count=len(values))
+        return flags[labels].reshape(grid.shape)
+
+    empty = mask(lambda v: v == "")
+    digit = mask(str.isdigit)
+    has_old = mask(lambda v: "OLD GROUP" in v.upper())
+    has_group = mask(lambda v: "GROUP" in v.upper())
+    group_word = mask(lambda v: any(word in v.upper() for word in GROUP_WORDS))
+    multi_word = mask(lambda v: len(v.split()) >= 2)
+
+    # 🎯 OLD GROUPS - the first "OLD GROUP" cell of a row opens a new old group
+    header_rows = np.flatnonzero(has_old.any(axis=1))
+    header_cols = has_old[header_rows].argmax(axis=1)
+    plan = [
+        {"name": name, "code": name.replace("OLD GROUP", "").strip()[:4].upper(), "groups": []}
+        for name in grid[header_rows, header_cols]
+    ]
+    # Which old group each row belongs to (-1 before the first header)
+    owner = np.cumsum(has_old.any(axis=1)) - 1
+
+    # 🎯 GROUPS - candidate cells in rows owned by an old group, first occurrence per old group
+    is_group = ~empty & ~digit & ~has_old & (multi_word | group_word) & (owner >= 0)[:, None]
+    group_rows, group_cols = np.nonzero(is_group)  # row-major, the order the sheet is read in
+    groups = pd.DataFrame({
+        "row": group_rows, "col": group_cols,
+        "owner": owner[group_rows], "name": grid[group_rows, group_cols],
+    }).drop_duplicates(["owner", "name"])
+
+    # 🎯 DISTRICTS - the first run of district cells within DISTRICT_SCAN_ROWS below each group
+    is_district = ~empty & ~digit & ~has_group
+    next_district = np.vstack([_next_index(is_district), np.full((1, grid.shape[1]), n_rows)])
+    next_gap = np.vstack([_next_index(~is_district), np.full((1, grid.shape[1]), n_rows)])
+
+    rows, cols = groups["row"].to_numpy(), groups["col"].to_numpy()
+    last_rows = np.minimum(rows + DISTRICT_SCAN_ROWS, n_rows - 1)
+    starts = next_district[rows + 1, cols]
+    ends = np.minimum(next_gap[np.minimum(starts, n_rows), cols] - 1, last_rows)
+    ends = np.where(starts <= last_rows, ends, starts - 1)  # empty run
+
+    # District code: column 0 of the same row, else the first four letters of the name
+    fallback_codes = np.array([v[:4].upper() for v in values], dtype=object)[labels].reshape(grid.shape)
+    has_row_code = ~(empty[:, 0] | digit[:, 0])
+    district_codes = np.where(has_row_code[:, None], grid[:, [0]], fallback_codes)
+
+    for name, group_owner, col, start, end in zip(groups["name"], groups["owner"], cols, starts, ends):
+        plan[group_owner]["groups"].append({
+            "name": name,
+            "code": name[:4].upper(),
+            "districts": list(zip(grid[start:end + 1, col], district_codes[start:end + 1, col])),
+        })
+
+    if progress:
+        progress(n_rows, n_rows)
+    return plan
+
+
+# -----------------------------
+# PHASE 2: WRITE THE PLAN
+# -----------------------------
+
+def _flush_in_batches(objects):
+    for start in range(0, len(objects), FLUSH_BATCH_SIZE):
+        db.session.add_all(objects[start:start + FLUSH_BATCH_SIZE])
+        db.session.flush()
+
+
+def _get_or_create_state_region(state_name, state_code, region_name):
+    state = State.query.filter_by(name=state_name).first()
+    if not state:
+        state = State(name=state_name, code=state_code, leader="State Leader")
+        db.session.add(state)
+        db.session.flush()
+        print(f"✅ Created state: {state_name} (ID: {state.id})")
     else:
-        print(f"👤 CREATING NEW User: {email} for group '{group_name}'")
-        user = User(
-            email=email,
-            name=f"{group_name} Admin",
-            phone=None
+        print(f"📁 Using existing state: {state_name} (ID: {state.id})")
+
+    region = Region.query.filter_by(name=region_name, state_id=state.id).first()
+    if not region:
+        region = Region(
+            name=region_name,
+            code="PH-RGN",  # Port Harcourt Region code
+            leader="Region Leader",
+            state_id=state.id
         )
-        user.set_password("12345678")  # Default password
-    
-    # 🎯 SET COMPLETE HIERARCHY LINKS - CRITICAL FOR ACCESS CONTROL
-    user.state_id = group.state_id
-    user.region_id = group.region_id
-    user.old_group_id = group.old_group_id  # 🎯 Link to old group
-    user.group_id = group.id  # 🎯 Link to the group
-    
-    # For group admin, district_id should be NULL to access ALL districts in the group
-    user.district_id = None  # 🎯 This gives access to all districts in the group
-    
-    print(f"🔗 Setting hierarchy for {email}: State={group.state_id}, Region={group.region_id}, OldGroup={group.old_group_id}, Group={group.id}")
-    
-    # Assign Group Admin role
-    group_admin_role = Role.query.filter_by(name="Group Admin").first()
-    if group_admin_role:
-        if group_admin_role not in user.roles:
-            user.roles.append(group_admin_role)
-            print(f"✅ Assigned Group Admin role to {email}")
+        db.session.add(region)
+        db.session.flush()
+        print(f"✅ Created region: {region_name} (ID: {region.id})")
     else:
-        print(f"⚠️  Warning: Group Admin role not found!")
-        # Create the role if it doesn't exist
-        group_admin_role = Role(name="Group Admin", description="Administrator for a specific group")
-        db.session.add(group_admin_role)
-        db.session.commit()
-        user.roles.append(group_admin_role)
-        print(f"✅ Created and assigned Group Admin role to {email}")
-    
-    if not existing_user:
-        db.session.add(user)
-    
-    # Commit immediately to ensure user is saved with proper hierarchy
-    db.session.commit()
-    
-    print(f"🔗 FINAL User {email} linked to - State: {user.state_id}, Region: {user.region_id}, " 
-          f"District: {user.district_id}, Group: {user.group_id}, OldGroup: {user.old_group_id}")
-    return user
-
-def import_hierarchy_from_excel(file_path, state_name="Rivers Central", state_code="RIV-CEN", region_name="Port Harcourt"):
+        print(f"📁 Using existing region: {region_name} (ID: {region.id})")
+    return state, region
+
+
+def import_hierarchy_from_excel(file_path, state_name="Rivers Central", state_code="RIV-CEN", region_name="Port Harcourt",
+                                progress=None):
     """
-    Enhanced version that properly links users to COMPLETE hierarchy
-    All data will be under Rivers Central state and Port Harcourt region
+    Import a hierarchy workbook under one state and region in a single transaction.
+
+    The sheet is parsed once into a plan, existing old groups / groups /
+    districts / users under the region are preloaded so a re-import reuses
+    them instead of duplicating, and new rows are flushed level by level in
+    batches. Every group gets a Group Admin user linked to its COMPLETE
+    hierarchy. `progress(rows_done, total_rows)` is called once the sheet
+    is parsed (used by background jobs).
     """
     print("=== Starting ENHANCED hierarchy import ===")
     print(f"🎯 Importing under State: {state_name}, Region: {region_name}")
-    
+    timings = {}
+
     try:
-        # Read Excel file
-        df = pd.read_excel(file_path, sheet_name=0, header=None)
-        print(f"Loaded Excel with {len(df)} rows, {len(df.columns)} columns")
-        
-        # 🎯 CREATE OR GET STATE - Rivers Central
-        state = State.query.filter_by(name=state_name).first()
-        if not state:
-            state = State(name=state_name, code=state_code, leader="State Leader")
-            db.session.add(state)
-            db.session.commit()
-            print(f"✅ Created state: {state_name} (ID: {state.id})")
-        else:
-            print(f"📁 Using existing state: {state_name} (ID: {state.id})")
-        
-        # 🎯 CREATE OR GET REGION - Port Harcourt Region
-        region = Region.query.filter_by(name=region_name, state_id=state.id).first()
-        if not region:
-            region = Region(
-                name=region_name,
-                code="PH-RGN",  # Port Harcourt Region code
-                leader="Region Leader",
-                state_id=state.id
-            )
-            db.session.add(region)
-            db.session.commit()
-            print(f"✅ Created region: {region_name} (ID: {region.id})")
-        else:
-            print(f"📁 Using existing region: {region_name} (ID: {region.id})")
-        
-        current_old_group = None
-        old_groups_created = 0
-        groups_created = 0
-        districts_created = 0
-        users_created = 0
-        
-        # Track groups we process to avoid duplicates
-        processed_groups = set()
-        
-        for index, row in df.iterrows():
-            # Convert all cells to strings for safe processing
-            row_str = [safe_strip(cell) for cell in row]
-            
-            # Skip completely empty rows
-            if all(cell == '' for cell in row_str):
-                continue
-            
-            # DETECT OLD GROUP - Check ALL columns for "OLD GROUP"
-            for col_idx, cell_value in enumerate(row_str):
-                if cell_value and "OLD GROUP" in cell_value.upper():
-                    old_group_name = cell_value
-                    print(f"\n🎯 FOUND OLD GROUP: '{old_group_name}'")
-                    
-                    # Create the Old Group under Rivers Central state and Port Harcourt region
-                    current_old_group = OldGroup(
-                        name=old_group_name,
-                        code=old_group_name.replace("OLD GROUP", "").strip()[:4].upper(),
+        with _phase(timings, "read"):
+            df = pd.read_excel(file_path, sheet_name=0, header=None)
+            print(f"Loaded Excel with {len(df)} rows, {len(df.columns)} columns")
+
+        with _phase(timings, "parse"):
+            plan = parse_hierarchy_sheet(sheet_cells(df), progress)
+
+        with _phase(timings, "preload"):
+            state, region = _get_or_create_state_region(state_name, state_code, region_name)
+
+            # Existing nodes under this region, keyed the way the plan identifies them
+            old_groups_by_name = {
+                og.name: og for og in OldGroup.query.filter_by(region_id=region.id)
+            }
+            groups_by_key = {
+                (g.old_group_id, g.name): g for g in Group.query.filter_by(region_id=region.id)
+            }
+            district_keys = {
+                (group_id, name) for group_id, name in
+                db.session.query(District.group_id, District.name).filter(District.region_id == region.id)
+            }
+
+            emails = {group_user_email(g["name"]) for og in plan for g in og["groups"]}
+            users_by_email = {
+                u.email: u for u in
+                User.query.options(selectinload(User.roles)).filter(User.email.in_(emails))
+            } if emails else {}
+
+            group_admin_role = Role.query.filter_by(name="Group Admin").first()
+            if not group_admin_role:
+                print(f"⚠️  Warning: Group Admin role not found - creating it")
+                group_admin_role = Role(name="Group Admin", description="Administrator for a specific group")
+                db.session.add(group_admin_role)
+
+        with _phase(timings, "old_groups"):
+            new_old_groups = []
+            for og in plan:
+                if og["name"] not in old_groups_by_name:
+                    old_group = OldGroup(
+                        name=og["name"],
+                        code=og["code"],
                         state_id=state.id,      # 🎯 Rivers Central
                         region_id=region.id     # 🎯 Port Harcourt Region
                     )
-                    db.session.add(current_old_group)
-                    db.session.commit()
-                    old_groups_created += 1
-                    print(f"✅ CREATED OldGroup: {old_group_name} (ID: {current_old_group.id}) under {state_name}/{region_name}")
-                    break
-            
-            # Process groups and districts if we have a current Old Group
-            if current_old_group:
-                for col_idx in range(len(row_str)):
-                    group_name = row_str[col_idx]
-                    
-                    # Skip empty cells, numbers, and Old Group indicators
-                    if (not group_name or
-                        group_name.isdigit() or
-                        "OLD GROUP" in group_name.upper()):
-                        continue
-                    
-                    # Check if this looks like a group name
-                    if (len(group_name.split()) >= 2 or
-                        any(word in group_name.upper() for word in ['GROUP', 'DISTRICT', 'UNIPORT', 'CORPER', 'FELLOWSHIP'])):
-                        
-                        group_key = f"{group_name}_{current_old_group.id}"
-                        if group_key in processed_groups:
-                            continue
-                        processed_groups.add(group_key)
-                        
-                        print(f"\n🎯 PROCESSING GROUP: '{group_name}' under '{current_old_group.name}'")
-                        
-                        # Create the Group with COMPLETE hierarchy links
+                    old_groups_by_name[og["name"]] = old_group
+                    new_old_groups.append(old_group)
+            _flush_in_batches(new_old_groups)
+
+        with _phase(timings, "groups"):
+            new_groups = []
+            for og in plan:
+                old_group = old_groups_by_name[og["name"]]
+                for g in og["groups"]:
+                    key = (old_group.id, g["name"])
+                    if key not in groups_by_key:
                         group = Group(
-                            name=group_name,
-                            code=group_name[:4].upper(),
-                            state_id=state.id,          # 🎯 Rivers Central
-                            region_id=region.id,        # 🎯 Port Harcourt Region
-                            old_group_id=current_old_group.id,  # 🎯 Link to old group
-                            leader=f"{group_name} Leader"
+                            name=g["name"],
+                            code=g["code"],
+                            state_id=state.id,
+                            region_id=region.id,
+                            old_group_id=old_group.id,  # 🎯 Link to old group
+                            leader=f"{g['name']} Leader"
                         )
-                        db.session.add(group)
-                        db.session.commit()
-                        groups_created += 1
-                        print(f"✅ CREATED Group: {group_name} (ID: {group.id}) under {state_name}/{region_name}")
-                        print(f"📋 Group hierarchy: State={state.id}, Region={region.id}, OldGroup={current_old_group.id}")
-                        
-                        # 🎯 CREATE USER FOR THIS GROUP with COMPLETE hierarchy links
-                        group_user = create_group_user(group_name, group)
-                        if group_user:
-                            users_created += 1
-                            print(f"✅ Created user {group_user.email} with Group ID: {group_user.group_id}, OldGroup ID: {group_user.old_group_id}")
-                        
-                        # Process districts under this group
-                        district_start_row = index + 1
-                        district_count = 0
-        
-                        for dist_row_idx in range(district_start_row, min(district_start_row + 30, len(df))):
-                            district_name = safe_strip(df.iloc[dist_row_idx, col_idx])
-                            
-                            # Stop when we hit another group, Old Group, or empty row
-                            if (not district_name or
-                                district_name.isdigit() or
-                                any(word in district_name.upper() for word in ['GROUP', 'OLD GROUP']) or
-                                dist_row_idx >= len(df)):
-                                if district_count > 0:  # Only break if we found at least one district
-                                    break
-                                else:
-                                    continue
-                            
-                            # Get district code from column 0 of the same row
-                            district_code = safe_strip(df.iloc[dist_row_idx, 0])
-                            if not district_code or district_code.isdigit():
-                                district_code = district_name[:4].upper()
-                            
-                            # Only create district if it's a valid name
-                            if (district_name and
-                                not district_name.isdigit() and
-                                "GROUP" not in district_name.upper()):
-                                
-                                print(f"  🎯 FOUND DISTRICT: {district_name}")
-                                
-                                district = District(
-                                    name=district_name,
-                                    code=district_code,
-                                    state_id=state.id,          # 🎯 Rivers Central
-                                    region_id=region.id,        # 🎯 Port Harcourt Region
-                                    old_group_id=current_old_group.id,  # 🎯 Link to old group
-                                    group_id=group.id,          # 🎯 Link to parent group
-                                    leader=f"{district_name} Leader"
-                                )
-                                db.session.add(district)
-                                db.session.commit()
-                                districts_created += 1
-                                district_count += 1
-                                print(f"  ✅ CREATED District: {district_name} (ID: {district.id}) under {group.name}")
-        
-        db.session.commit()
-        
+                        groups_by_key[key] = group
+                        new_groups.append(group)
+            _flush_in_batches(new_groups)
+
+        with _phase(timings, "districts"):
+            new_districts = []
+            for og in plan:
+                old_group = old_groups_by_name[og["name"]]
+                for g in og["groups"]:
+                    group = groups_by_key[(old_group.id, g["name"])]
+                    for district_name, district_code in g["districts"]:
+                        if (group.id, district_name) in district_keys:
+                            continue
+                        district_keys.add((group.id, district_name))
+                        new_districts.append(District(
+                            name=district_name,
+                            code=district_code,
+                            state_id=state.id,
+                            region_id=region.id,
+                            old_group_id=old_group.id,
+                            group_id=group.id,          # 🎯 Link to parent group
+                            leader=f"{district_name} Leader"
+                        ))
+            _flush_in_batches(new_districts)
+
+        with _phase(timings, "users"):
+            new_users = []
+            updated_emails = set()
+            # One deliberately slow hash per run, shared by every new account;
+            # must_reset_password makes each user pick their own on first login
+            default_hash = None
+            for og in plan:
+                old_group = old_groups_by_name[og["name"]]
+                for g in og["groups"]:
+                    group = groups_by_key[(old_group.id, g["name"])]
+                    email = group_user_email(g["name"])
+                    user = users_by_email.get(email)
+                    if user is None:
+                        if default_hash is None:
+                            default_hash = generate_password_hash(DEFAULT_USER_PASSWORD)
+                        user = User(email=email, name=f"{g['name']} Admin", phone=None,
+                                    password_hash=default_hash, must_reset_password=True)
+                        users_by_email[email] = user
+                        new_users.append(user)
+                    elif user.id is not None:
+                        updated_emails.add(email)
+
+                    # 🎯 SET COMPLETE HIERARCHY LINKS - CRITICAL FOR ACCESS CONTROL
+                    # A group admin has district_id NULL so it can access ALL districts in the group
+                    user.state_id = group.state_id
+                    user.region_id = group.region_id
+                    user.old_group_id = group.old_group_id
+                    user.group_id = group.id
+                    user.district_id = None
+                    if group_admin_role not in user.roles:
+                        user.roles.append(group_admin_role)
+            _flush_in_batches(new_users)
+
+        with _phase(timings, "commit"):
+            db.session.commit()
+
+        summary = {
+            "state": state_name,
+            "region": region_name,
+            "old_groups": len(new_old_groups),
+            "groups": len(new_groups),
+            "districts": len(new_districts),
+            "users": len(new_users),
+            "users_updated": len(updated_emails),
+        }
         print(f"\n=== IMPORT SUMMARY ===")
-        print(f"✅ State: {state_name} (ID: {state.id})")
-        print(f"✅ Region: {region_name} (ID: {region.id})") 
-        print(f"✅ Old Groups: {old_groups_created}")
-        print(f"✅ Groups: {groups_created}")
-        print(f"✅ Districts: {districts_created}")
-        print(f"✅ Users: {users_created}")
+        for key, value in summary.items():
+            print(f"✅ {key}: {value}")
+        print("⏱️ Phase timings (s): " + ", ".join(f"{name}={seconds}" for name, seconds in timings.items()))
         print("🎉 Enhanced import completed successfully!")
-        
-        # 🎯 VERIFY HIERARCHY LINKS - Check ALL users
-        print(f"\n=== HIERARCHY VERIFICATION ===")
-        all_users = User.query.all()
-        for user in all_users:
-            print(f"🔍 User {user.email}: State={user.state_id}, Region={user.region_id}, "
-                  f"District={user.district_id}, Group={user.group_id}, OldGroup={user.old_group_id}")
-        
-        # Count users with proper group links
-        users_with_groups = User.query.filter(User.group_id.isnot(None)).count()
-        users_with_old_groups = User.query.filter(User.old_group_id.isnot(None)).count()
-        
-        print(f"\n📊 USER HIERARCHY SUMMARY:")
-        print(f"Users with Group ID: {users_with_groups}/{len(all_users)}")
-        print(f"Users with OldGroup ID: {users_with_old_groups}/{len(all_users)}")
-        
+
         return {
             "message": f"Enhanced hierarchy imported successfully under {state_name}/{region_name}!",
-            "summary": {
-                "state": state_name,
-                "region": region_name,
-                "old_groups": old_groups_created,
-                "groups": groups_created,
-                "districts": districts_created,
-                "users": users_created
-            },
+            "summary": summary,
             "hierarchy_ids": {
                 "state_id": state.id,
                 "region_id": region.id
-            }
+            },
+            "timings": timings,
         }
-        
+
     except Exception as e:
         db.session.rollback()
         print(f"❌ IMPORT FAILED: {str(e)}")
         import traceback
         print(f"Traceback: {traceback.format_exc()}")
         raise e
-
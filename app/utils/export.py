@@ -0,0 +1,81 @@
+import csv
+import io
+import os
+import tempfile
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 2000
+
+# CSV rows buffered before each chunk is sent
+CSV_CHUNK_ROWS = 500
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FORMATS = ("csv", "xlsx")
+
+
+def _attachment(filename):
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def stream_csv(rows, header, filename):
+    """Stream rows (tuples in `header` order) as a CSV download, a few hundred rows per chunk."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % CSV_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype="text/csv", headers=_attachment(filename))
+
+
+def _xlsx_value(value):
+    # openpyxl rejects control characters that can turn up in free-text fields
+    return ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value
+
+
+def stream_xlsx(rows, header, filename, sheet_title="Export"):
+    """
+    Stream rows as an XLSX download. openpyxl's write-only mode spools each
+    row to a temp file as it is appended, so memory stays flat however many
+    rows there are; the finished file is then sent in chunks and deleted.
+    """
+    def generate():
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_title)
+        sheet.append(header)
+        for row in rows:
+            sheet.append([_xlsx_value(value) for value in row])
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook.save(path)
+            with open(path, "rb") as f:
+                while chunk := f.read(64 * 1024):
+                    yield chunk
+        finally:
+            os.unlink(path)
+
+    return Response(stream_with_context(generate()), mimetype=XLSX_MIMETYPE, headers=_attachment(filename))
+
+
+def export_format(request):
+    """The requested export format (?format=csv|xlsx, default csv), or None if unsupported."""
+    fmt = (request.args.get("format") or "csv").lower()
+    return fmt if fmt in EXPORT_FORMATS else None
+
+
+def export_response(fmt, rows, header, basename, sheet_title="Export"):
+    """Streamed CSV or XLSX download named `<basename>.<fmt>`."""
+    if fmt == "xlsx":
+        return stream_xlsx(rows, header, f"{basename}.xlsx", sheet_title)
+    return stream_csv(rows, header, f"{basename}.csv")
@@ -0,0 +1,176 @@
+from sqlalchemy import event, func, inspect, literal, select, and_, or_
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import State, Region, OldGroup, Group, District, HierarchyClosure
+
+# Levels from the root down; depth between two levels is their index difference
+LEVEL_ORDER = ["state", "region", "old_group", "group", "district"]
+
+LEVEL_MODELS = {
+    "state": State,
+    "region": Region,
+    "old_group": OldGroup,
+    "group": Group,
+    "district": District,
+}
+
+# Each node stores its ancestors as foreign keys: level -> [(ancestor level, column)]
+PARENT_FIELDS = {
+    "state": [],
+    "region": [("state", "state_id")],
+    "old_group": [("state", "state_id"), ("region", "region_id")],
+    "group": [("state", "state_id"), ("region", "region_id"), ("old_group", "old_group_id")],
+    "district": [("state", "state_id"), ("region", "region_id"),
+                 ("old_group", "old_group_id"), ("group", "group_id")],
+}
+
+MODEL_LEVELS = {model: level for level, model in LEVEL_MODELS.items()}
+
+closure = HierarchyClosure.__table__
+
+
+def _depth(ancestor_level, descendant_level):
+    return LEVEL_ORDER.index(descendant_level) - LEVEL_ORDER.index(ancestor_level)
+
+
+def closure_rows(level, node):
+    """Closure rows for one node: itself at depth 0 plus one row per ancestor."""
+    rows = [{
+        "ancestor_level": level, "ancestor_id": node.id,
+        "descendant_level": level, "descendant_id": node.id, "depth": 0,
+    }]
+    for ancestor_level, field in PARENT_FIELDS[level]:
+        ancestor_id = getattr(node, field)
+        if ancestor_id is not None:
+            rows.append({
+                "ancestor_level": ancestor_level, "ancestor_id": ancestor_id,
+                "descendant_level": level, "descendant_id": node.id,
+                "depth": _depth(ancestor_level, level),
+            })
+    return rows
+
+
+def rebuild_hierarchy_closure():
+    """Recompute the whole closure table from the hierarchy tables."""
+    db.session.execute(closure.delete())
+
+    columns = ["ancestor_level", "ancestor_id", "descendant_level", "descendant_id", "depth"]
+    for level, model in LEVEL_MODELS.items():
+        pairs = [(level, model.id)] + [
+            (ancestor_level, getattr(model, field)) for ancestor_level, field in PARENT_FIELDS[level]
+        ]
+        for ancestor_level, ancestor_col in pairs:
+            rows = select(
+                literal(ancestor_level), ancestor_col,
+                literal(level), model.id,
+                literal(_depth(ancestor_level, level))
+            ).where(ancestor_col.isnot(None))
+            db.session.execute(closure.insert().from_select(columns, rows))
+
+    db.session.commit()
+
+
+# -----------------------------
+# LOOKUPS
+# -----------------------------
+
+def descendants(level, entity_id, descendant_level=None, include_self=False):
+    """SELECT of descendant ids under (level, entity_id), for use in `.in_()` filters."""
+    query = select(closure.c.descendant_id).where(
+        closure.c.ancestor_level == level,
+        closure.c.ancestor_id == entity_id,
+    )
+    if descendant_level:
+        query = query.where(closure.c.descendant_level == descendant_level)
+    if not include_self:
+        query = query.where(closure.c.depth > 0)
+    return query
+
+
+def descendant_ids(level, entity_id, descendant_level=None, include_self=False):
+    """Ids of everything under (level, entity_id) - one indexed query."""
+    return db.session.execute(
+        descendants(level, entity_id, descendant_level, include_self)
+    ).scalars().all()
+
+
+def descendant_counts(level, entity_id):
+    """{descendant level: count} for the whole subtree under one node - one indexed query."""
+    rows = db.session.execute(
+        select(closure.c.descendant_level, func.count()).where(
+            closure.c.ancestor_level == level,
+            closure.c.ancestor_id == entity_id,
+            closure.c.depth > 0,
+        ).group_by(closure.c.descendant_level)
+    ).all()
+    return {descendant_level: count for descendant_level, count in rows}
+
+
+def ancestor_ids(level, entity_id):
+    """{ancestor level: id} for one node - one indexed query."""
+    rows = db.session.execute(
+        select(closure.c.ancestor_level, closure.c.ancestor_id).where(
+            closure.c.descendant_level == level,
+            closure.c.descendant_id == entity_id,
+            closure.c.depth > 0,
+        )
+    ).all()
+    return {row.ancestor_level: row.ancestor_id for row in rows}
+
+
+def is_within(level, entity_id, ancestor_level, ancestor_id):
+    """True if (level, entity_id) is (ancestor_level, ancestor_id) or lies under it."""
+    return db.session.execute(
+        select(literal(True)).where(
+            closure.c.ancestor_level == ancestor_level,
+            closure.c.ancestor_id == ancestor_id,
+            closure.c.descendant_level == level,
+            closure.c.descendant_id == entity_id,
+        ).limit(1)
+    ).first() is not None
+
+
+def subtree_filter(model, ancestor_level, ancestor_id):
+    """Filter predicate restricting a hierarchy model's rows to one subtree."""
+    level = MODEL_LEVELS[model]
+    return model.id.in_(descendants(ancestor_level, ancestor_id, level, include_self=True))
+
+
+# -----------------------------
+# AUTOMATIC MAINTENANCE
+# -----------------------------
+# Hierarchy nodes flushed through the ORM get their closure rows rewritten in
+# the same transaction. Bulk Core/Query deletes bypass this - run
+# `flask rebuild-hierarchy-closure` after those.
+
+def _parents_changed(node, level):
+    state = inspect(node)
+    return any(state.attrs[field].history.has_changes() for _, field in PARENT_FIELDS[level])
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_hierarchy_closure(session, flush_context):
+    stale, fresh = [], []
+    for node in session.new:
+        level = MODEL_LEVELS.get(type(node))
+        if level:
+            fresh.extend(closure_rows(level, node))
+    for node in session.dirty:
+        level = MODEL_LEVELS.get(type(node))
+        if level and _parents_changed(node, level):
+            stale.append(and_(closure.c.descendant_level == level, closure.c.descendant_id == node.id))
+            fresh.extend(closure_rows(level, node))
+    for node in session.deleted:
+        level = MODEL_LEVELS.get(type(node))
+        if level:
+            stale.append(and_(closure.c.descendant_level == level, closure.c.descendant_id == node.id))
+            stale.append(and_(closure.c.ancestor_level == level, closure.c.ancestor_id == node.id))
+
+    if not stale and not fresh:
+        return
+
+    connection = session.connection()
+    if stale:
+        connection.execute(closure.delete().where(or_(*stale)))
+    if fresh:
+        connection.execute(closure.insert(), fresh)
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import State, Region, OldGroup, Group, District, HierarchyVersion
+
+versions = HierarchyVersion.__table__
+
+# Columns kept per level - the same fields each model's to_dict() returns
+SNAPSHOT_FIELDS = {
+    "state": ("id", "name", "code", "leader"),
+    "region": ("id", "name", "code", "leader", "state_id"),
+    "old_group": ("id", "name", "code", "leader", "state_id", "region_id"),
+    "group": ("id", "name", "code", "leader", "state_id", "region_id", "old_group_id"),
+    "district": ("id", "name", "code", "leader", "state_id", "region_id", "old_group_id", "group_id"),
+}
+
+SNAPSHOT_MODELS = {
+    "state": State,
+    "region": Region,
+    "old_group": OldGroup,
+    "group": Group,
+    "district": District,
+}
+
+NODE_TYPES = {
+    level: namedtuple(f"{model.__name__}Node", SNAPSHOT_FIELDS[level])
+    for level, model in SNAPSHOT_MODELS.items()
+}
+
+
+class HierarchySnapshot:
+    """
+    Immutable in-process copy of the whole State → Region → OldGroup → Group →
+    District tree, with id and parent indexes. Nodes are namedtuples carrying
+    the to_dict() fields of their model; use `node._asdict()` to serialize.
+    """
+
+    def __init__(self, version, nodes):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.nodes = nodes
+        self.by_id = {level: {n.id: n for n in level_nodes} for level, level_nodes in nodes.items()}
+
+        # level -> parent field -> parent id -> child nodes
+        children = {}
+        for level, level_nodes in nodes.items():
+            for field in SNAPSHOT_FIELDS[level][4:]:
+                index = children.setdefault(level, {}).setdefault(field, {})
+                for node in level_nodes:
+                    index.setdefault(getattr(node, field), []).append(node)
+        self.children = {
+            level: {field: {pid: tuple(ns) for pid, ns in index.items()} for field, index in fields.items()}
+            for level, fields in children.items()
+        }
+
+    @classmethod
+    def load(cls, version):
+        nodes = {}
+        for level, model in SNAPSHOT_MODELS.items():
+            node_type = NODE_TYPES[level]
+            columns = [getattr(model, field) for field in SNAPSHOT_FIELDS[level]]
+            rows = model.query.with_entities(*columns).order_by(model.id).all()
+            nodes[level] = tuple(node_type(*row) for row in rows)
+        return cls(version, nodes)
+
+    def all(self, level):
+        return self.nodes[level]
+
+    def get(self, level, entity_id):
+        return self.by_id[level].get(entity_id)
+
+    def name(self, level, entity_id):
+        node = self.by_id[level].get(entity_id)
+        return node.name if node else None
+
+    def children_of(self, level, field, parent_id):
+        """Nodes at `level` whose `field` equals parent_id, e.g. ("district", "region_id", 3)."""
+        return self.children.get(level, {}).get(field, {}).get(parent_id, ())
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    """The committed hierarchy version - one primary-key read, shared by every worker process."""
+    return db.session.execute(
+        select(versions.c.version).where(versions.c.id == HierarchyVersion.ROW_ID)
+    ).scalar() or 0
+
+
+def _is_fresh(snapshot, version):
+    # The version catches every write made through the app; the max age only
+    # bounds how long changes made outside it (raw SQL, other tools) go unseen.
+    max_age = current_app.config.get("HIERARCHY_SNAPSHOT_MAX_AGE", 300)
+    return (
+        snapshot is not None
+        and snapshot.version == version
+        and time.monotonic() - snapshot.loaded_at < max_age
+    )
+
+
+def get_hierarchy_snapshot():
+    """The current snapshot, rebuilt only when the hierarchy version has moved."""
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if _is_fresh(snapshot, version):
+        return snapshot
+
+    with _lock:
+        if not _is_fresh(_snapshot, version):
+            print(f"🌳 Rebuilding hierarchy snapshot (version {version})")
+            _snapshot = HierarchySnapshot.load(version)
+        return _snapshot
+
+
+def bump_hierarchy_version(connection):
+    """Increment the version row on `connection`; it becomes visible when that transaction commits."""
+    bumped = connection.execute(
+        update(versions).where(versions.c.id == HierarchyVersion.ROW_ID).values(
+            version=versions.c.version + 1, updated_at=datetime.utcnow()
+        )
+    ).rowcount
+    if not bumped:
+        connection.execute(versions.insert().values(
+            id=HierarchyVersion.ROW_ID, version=1, updated_at=datetime.utcnow()
+        ))
+
+
+def invalidate_hierarchy_snapshot():
+    """Force every process to rebuild its snapshot (e.g. after editing the tables by hand)."""
+    with db.engine.begin() as connection:
+        bump_hierarchy_version(connection)
+
+
+# -----------------------------
+# AUTOMATIC INVALIDATION
+# -----------------------------
+# Any hierarchy row written through the session - ORM flush, bulk query
+# update/delete, or a Core insert/update/delete run with session.execute -
+# bumps the version once per transaction, inside that transaction, so the
+# new version and the new rows are committed (or rolled back) together.
+
+HIERARCHY_TYPES = tuple(SNAPSHOT_MODELS.values())
+HIERARCHY_TABLES = frozenset(model.__tablename__ for model in HIERARCHY_TYPES)
+
+
+def _mark_hierarchy_changed(session):
+    if not session.info.get("hierarchy_bumped"):
+        session.info["hierarchy_bumped"] = True
+        bump_hierarchy_version(session.connection())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_hierarchy_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, HIERARCHY_TYPES):
+            _mark_hierarchy_changed(session)
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_hierarchy_changes(orm_execute_state):
+    statement = orm_execute_state.statement
+    if not getattr(statement, "is_dml", False):
+        return
+    table = getattr(statement, "table", None)
+    if getattr(table, "name", None) in HIERARCHY_TABLES:
+        _mark_hierarchy_changed(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _reset_hierarchy_changes(session):
+    session.info.pop("hierarchy_bumped", None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_hierarchy_changes(session):
+    session.info.pop("hierarchy_bumped", None)
@@ -1,66 +1,139 @@
 from app.utils.email_service import send_email, EmailService
 from app.utils.whatsapp_service import whatsapp_service
+from app.models import OutboundNotification
+from app.tasks.notification_outbox import enqueue_notifications
 import os
 
+# 🎯 Per-channel limits. Email runs one sender per pooled SMTP connection
+# (SMTP_POOL_SIZE); WhatsApp has its own sender pool and rate limit
+# (WHATSAPP_CONCURRENCY / WHATSAPP_RATE_LIMIT in whatsapp_service).
+SMTP_TIMEOUT = int(os.getenv('SMTP_TIMEOUT', 30))            # seconds per SMTP command
+
+
 class NotificationService:
-    def __init__(self):
-        # Get email configuration from environment variables or config
-        smtp_server = os.getenv('EMAIL_SERVER')
-        smtp_port = int(os.getenv('EMAIL_PORT', 587))
-        smtp_user = os.getenv('EMAIL_USERNAME')
-        smtp_password = os.getenv('EMAIL_PASSWORD')
-        
-        # Initialize EmailService with required parameters
-        self.email_service = EmailService(
-            smtp_server=smtp_server,
-            smtp_port=smtp_port,
-            smtp_user=smtp_user,
-            smtp_password=smtp_password
-        )
-    
-    def send_attendance_reminder(self, user, week, methods=['email', 'whatsapp']):
-        """
-        Send attendance reminder via multiple channels
-        """
+    def __init__(self, email_service=None, whatsapp=None):
+        if email_service is None:
+            # Get email configuration from environment variables or config
+            smtp_server = os.getenv('EMAIL_SERVER')
+            smtp_port = int(os.getenv('EMAIL_PORT', 587))
+            smtp_user = os.getenv('EMAIL_USERNAME')
+            smtp_password = os.getenv('EMAIL_PASSWORD')
+
+            # Initialize EmailService with required parameters
+            email_service = EmailService(
+                smtp_server=smtp_server,
+                smtp_port=smtp_port,
+                smtp_user=smtp_user,
+                smtp_password=smtp_password,
+                pool_size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+                max_idle=int(os.getenv('SMTP_MAX_IDLE', 60)),
+                timeout=SMTP_TIMEOUT
+            )
+        self.email_service = email_service
+        self.whatsapp = whatsapp or whatsapp_service
+
+    def _dispatch(self, user, week, methods):
+        """Queue one user's reminder on each requested channel; returns {channel: future}."""
+        # Read everything off the ORM object here - sender threads have no session
+        name = user.name or user.email
+        futures = {}
+
+        if 'email' in methods and user.email:
+            futures['email'] = self.email_service.send_email_async(
+                to_email=user.email,
+                subject="Attendance Reminder",
+                template_name="attendance_reminder",
+                context={"name": name, "week": week}
+            )
+
+        if 'whatsapp' in methods and user.phone:
+            futures['whatsapp'] = self.whatsapp.send_attendance_reminder_async(
+                to_phone=user.phone,
+                name=name,
+                week=week
+            )
+
+        return futures
+
+    @staticmethod
+    def _collect(futures):
         results = {
             'email_sent': False,
             'whatsapp_sent': False,
             'email_error': None,
             'whatsapp_error': None
         }
-        
-        context = {
-            "name": user.name or user.email,
-            "week": week
-        }
-        
-        # Send email
-        if 'email' in methods and user.email:
-            try:
-                # Use the email_service instance with send_email method
-                self.email_service.send_email(
-                    to_email=user.email,
-                    subject="Attendance Reminder",
-                    template_name="attendance_reminder",
-                    context=context
-                )
-                results['email_sent'] = True
-            except Exception as e:
-                results['email_error'] = str(e)
-        
-        # Send WhatsApp
-        if 'whatsapp' in methods and user.phone:
+
+        for channel, future in futures.items():
             try:
-                whatsapp_service.send_attendance_reminder(
-                    to_phone=user.phone,
-                    name=context["name"],
-                    week=week
-                )
-                results['whatsapp_sent'] = True
+                sent = future.result()
+                error = None if sent else f"{channel} message was not delivered"
             except Exception as e:
-                results['whatsapp_error'] = str(e)
-        
+                sent, error = False, str(e)
+            results[f'{channel}_sent'] = sent
+            results[f'{channel}_error'] = error
+
         return results
 
+    def send_attendance_reminders(self, reminders, methods=['email', 'whatsapp']):
+        """
+        Send attendance reminders for many (user, week) pairs at once.
+        Every send is queued up front, so email and WhatsApp - and all
+        recipients - go out concurrently, bounded per channel. Returns one
+        send_attendance_reminder result dict per pair, in order.
+        """
+        dispatched = [self._dispatch(user, week, methods) for user, week in reminders]
+        return [self._collect(futures) for futures in dispatched]
+
+    def _reminder_messages(self, user, week, methods):
+        """Outbox rows for one user's reminder, one per requested channel they can receive."""
+        name = user.name or user.email
+        messages = []
+
+        if 'email' in methods and user.email:
+            messages.append({
+                "channel": OutboundNotification.EMAIL,
+                "recipient": user.email,
+                "user_id": user.id,
+                "payload": {
+                    "subject": "Attendance Reminder",
+                    "template_name": "attendance_reminder",
+                    "context": {"name": name, "week": week}
+                }
+            })
+
+        if 'whatsapp' in methods and user.phone:
+            messages.append({
+                "channel": OutboundNotification.WHATSAPP,
+                "recipient": user.phone,
+                "user_id": user.id,
+                "payload": {"message": self.whatsapp.attendance_reminder_message(name, week)}
+            })
+
+        return messages
+
+    def queue_attendance_reminders(self, reminders, methods=['email', 'whatsapp'], created_by=None):
+        """
+        Put reminders for many (user, week) pairs on the notification outbox
+        instead of sending them now; the outbox workers deliver and retry them.
+        Returns {'email_queued': id or None, 'whatsapp_queued': id or None} per pair, in order.
+        """
+        per_reminder = [self._reminder_messages(user, week, methods) for user, week in reminders]
+        ids = iter(enqueue_notifications([m for messages in per_reminder for m in messages], created_by=created_by))
+
+        queued = []
+        for messages in per_reminder:
+            results = {'email_queued': None, 'whatsapp_queued': None}
+            for message in messages:
+                results[f"{message['channel']}_queued"] = next(ids)
+            queued.append(results)
+        return queued
+
+    def send_attendance_reminder(self, user, week, methods=['email', 'whatsapp']):
+        """
+        Send attendance reminder via multiple channels
+        """
+        return self.send_attendance_reminders([(user, week)], methods)[0]
+
 # Global instance
-notification_service = NotificationService()
\ No newline at end of file
+notification_service = NotificationService()
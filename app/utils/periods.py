@@ -0,0 +1,71 @@
+from datetime import date
+
+# Month names as they arrive from forms and CSVs ("October", "october", "Oct") -> 1..12
+MONTH_NUMBERS = {}
+for _number, _name in enumerate(["january", "february", "march", "april", "may", "june", "july",
+                                 "august", "september", "october", "november", "december"], start=1):
+    MONTH_NUMBERS[_name] = _number
+    MONTH_NUMBERS[_name[:3]] = _number
+MONTH_NUMBERS["sept"] = 9
+
+
+def month_number(month):
+    """1..12 for a month name or number, or None if it isn't one."""
+    if month is None:
+        return None
+    text = str(month).strip().lower()
+    if text.isdigit():
+        number = int(text)
+        return number if 1 <= number <= 12 else None
+    return MONTH_NUMBERS.get(text)
+
+
+def period_start(year, month):
+    """
+    First day of the reporting month, e.g. (2025, "October") -> date(2025, 10, 1).
+    None if the year or month is missing or unrecognised.
+    """
+    number = month_number(month)
+    if not year or number is None:
+        return None
+    try:
+        return date(int(year), number, 1)
+    except (TypeError, ValueError):
+        return None
+
+
+def period_start_default(context):
+    """Column default deriving period_start from the year and month being inserted."""
+    params = context.get_current_parameters()
+    return period_start(params.get("year"), params.get("month"))
+
+
+def parse_period(value):
+    """
+    Parse a 'YYYY-MM' (or 'YYYY-MM-DD') query argument into the first day of
+    that month. Raises ValueError otherwise.
+    """
+    parts = value.strip().split("-")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid period: {value}")
+    result = period_start(int(parts[0]), int(parts[1]))
+    if result is None:
+        raise ValueError(f"Invalid period: {value}")
+    return result
+
+
+def parse_period_args(args):
+    """
+    The optional 'from' / 'to' query arguments as (period_from, period_to)
+    month-start dates, None when absent. Raises ValueError naming the bad
+    argument - a mistyped bound must be rejected, not dropped (which would
+    widen the result to every period).
+    """
+    bounds = []
+    for name in ("from", "to"):
+        value = args.get(name)
+        try:
+            bounds.append(parse_period(value) if value else None)
+        except ValueError:
+            raise ValueError(f"Invalid '{name}' period '{value}', expected YYYY-MM")
+    return tuple(bounds)
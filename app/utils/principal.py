@@ -0,0 +1,145 @@
+from collections import namedtuple
+from flask import current_app, g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from app.models import User, Role, Permission
+from app.utils.cache import get_cache
+
+RoleRef = namedtuple("RoleRef", ["name"])
+
+HIERARCHY_FIELDS = ("state_id", "region_id", "district_id", "group_id", "old_group_id")
+
+
+class Principal:
+    """
+    Read-only snapshot of the authenticated user: identity, hierarchy links,
+    role names and the permission codes granted through those roles.
+
+    It mirrors the parts of `User` that handlers read (`roles` with `.name`,
+    `has_role()`, `access_level()`, the *_id fields) so it can stand in for
+    the ORM user on every authenticated request without touching the DB.
+    Use `User.query.get(principal.id)` when the ORM object is really needed.
+    """
+
+    def __init__(self, data):
+        self.id = data["id"]
+        self.email = data["email"]
+        self.name = data["name"]
+        self.phone = data["phone"]
+        self.is_active = data["is_active"]
+        self.must_reset_password = data.get("must_reset_password", False)
+        for field in HIERARCHY_FIELDS:
+            setattr(self, field, data[field])
+        self.roles = tuple(RoleRef(name) for name in data["roles"])
+        self.permissions = frozenset(data["permissions"])
+        self._data = data
+
+    @classmethod
+    def from_user(cls, user):
+        return cls({
+            "id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "phone": user.phone,
+            "is_active": user.is_active,
+            "must_reset_password": bool(user.must_reset_password),
+            **{field: getattr(user, field) for field in HIERARCHY_FIELDS},
+            "roles": [r.name for r in user.roles],
+            "permissions": sorted({p.code for r in user.roles for p in r.permissions}),
+        })
+
+    def to_cache(self):
+        return self._data
+
+    @property
+    def role_names(self):
+        return [r.name for r in self.roles]
+
+    @property
+    def is_super_admin(self):
+        return self.has_role("Super Admin")
+
+    def has_permission(self, code):
+        return code in self.permissions
+
+    # Same role / access level rules as the User model
+    has_role = User.has_role
+    access_level = User.access_level
+
+
+def _user_version_key(user_id):
+    return f"principal_version:{user_id}"
+
+
+def _principal_key(user_id):
+    cache = get_cache()
+    global_version = cache.get("principal_version:global") or 0
+    user_version = cache.get(_user_version_key(user_id)) or 0
+    return f"principal:{user_id}:v{global_version}.{user_version}"
+
+
+def load_principal(user_id):
+    """Load a principal straight from the DB with roles and permissions eager-loaded."""
+    user = User.query.options(
+        selectinload(User.roles).selectinload(Role.permissions)
+    ).filter_by(id=user_id).first()
+    return Principal.from_user(user) if user else None
+
+
+def get_principal(user_id):
+    """Principal for `user_id`, served from the short-TTL cache when possible."""
+    if user_id is None:
+        return None
+    user_id = int(user_id)
+
+    cache = get_cache()
+    key = _principal_key(user_id)
+    data = cache.get(key)
+    if data is not None:
+        return Principal(data)
+
+    principal = load_principal(user_id)
+    if principal:
+        cache.set(key, principal.to_cache(), ttl=current_app.config.get("PRINCIPAL_CACHE_TTL", 60))
+    return principal
+
+
+def get_current_principal():
+    """The JWT user's principal, loaded at most once per request."""
+    if "principal" not in g:
+        g.principal = get_principal(get_jwt_identity())
+    return g.principal
+
+
+def invalidate_principal(user_id=None):
+    """Drop the cached principal for one user, or for everyone when user_id is None."""
+    key = _user_version_key(user_id) if user_id is not None else "principal_version:global"
+    get_cache().incr(key)
+
+
+# -----------------------------
+# AUTOMATIC INVALIDATION
+# -----------------------------
+# Users, roles and permissions touched in a flush are remembered on the
+# session and invalidated once the transaction commits.
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session, flush_context):
+    pending = session.info.setdefault("principal_invalidations", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            pending.add(obj.id)
+        elif isinstance(obj, (Role, Permission)):
+            pending.add(None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_changes(session):
+    for user_id in session.info.pop("principal_invalidations", ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session):
+    session.info.pop("principal_invalidations", None)
@@ -0,0 +1,31 @@
+import json
+from flask import Response, stream_with_context
+
+
+def stream_json_array(records, serialize):
+    """Stream records as one JSON array without building the whole list in memory."""
+    def generate():
+        yield "["
+        first = True
+        for record in records:
+            yield ("" if first else ",") + json.dumps(serialize(record))
+            first = False
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def stream_ndjson(records, serialize):
+    """Stream records as newline-delimited JSON (one object per line)."""
+    def generate():
+        for record in records:
+            yield json.dumps(serialize(record)) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def wants_ndjson(request):
+    """True if the client asked for NDJSON via ?format=ndjson or the Accept header."""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
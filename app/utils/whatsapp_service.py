@@ -1,55 +1,173 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import os
 
+# 🎯 Graph API client limits
+WHATSAPP_CONCURRENCY = int(os.getenv('WHATSAPP_CONCURRENCY', 16))          # sender threads = kept-alive connections
+WHATSAPP_RATE_LIMIT = float(os.getenv('WHATSAPP_RATE_LIMIT', 50))          # messages per second, 0 = unlimited
+WHATSAPP_CONNECT_TIMEOUT = float(os.getenv('WHATSAPP_CONNECT_TIMEOUT', 5))  # seconds
+WHATSAPP_TIMEOUT = float(os.getenv('WHATSAPP_TIMEOUT', 10))                # seconds to wait for the response
+WHATSAPP_MAX_RETRIES = int(os.getenv('WHATSAPP_MAX_RETRIES', 3))
+
+# Throttled or temporarily failing - retried with exponential backoff, honouring Retry-After
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class WhatsAppDeliveryError(Exception):
+    """
+    The Graph API did not accept a message (after the session's own retries).
+    `ambiguous` is set when the request went out but no response came back
+    (read timeout, connection dropped) - the message may have been delivered,
+    so it must not be sent again automatically.
+    """
+
+    def __init__(self, message, status_code=None, ambiguous=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.ambiguous = ambiguous
+
+
+def _sent_without_response(error):
+    """True if a requests error happened after the request was sent, not while connecting."""
+    if isinstance(error, requests.ReadTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (ReadTimeoutError, ProtocolError))
+
+
 class WhatsAppService:
-    def __init__(self):
+    def __init__(self, concurrency=WHATSAPP_CONCURRENCY, rate_limit=WHATSAPP_RATE_LIMIT,
+                 timeout=(WHATSAPP_CONNECT_TIMEOUT, WHATSAPP_TIMEOUT), max_retries=WHATSAPP_MAX_RETRIES):
         self.phone_number_id = os.getenv('WHATSAPP_PHONE_NUMBER_ID', '808921198974802')
         self.token = os.getenv('WHATSAPP_TOKEN', 'EAAZAErWsgvsIBPlmpJAo1tGuVxXaLDcjyPAuNAlQfZBG1w4U337P1etgINLjLlOCLbtWqttnmsIpTXqn9vjKqAajjoUHjTFpUHZC2M1ex62ZBRPLqXuolfzFIyZClYgmurq4fG4kRYrZBrRey2h3QFJvR7ODlHaIB9QBM7t8jU0wpTi0z8QteN64nX4PPNlVf31gZDZD')
         self.base_url = f"https://graph.facebook.com/v17.0/{self.phone_number_id}/messages"
-        
-    def send_message(self, to_phone, message):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.session = self._build_session(concurrency, max_retries)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _build_session(self, pool_size, max_retries):
+        """One keep-alive connection pool shared by every send, retrying throttled and 5xx responses."""
+        retry = Retry(
+            total=max_retries,
+            read=0,  # the message may already have gone out - only retry on a status or connect error
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_maxsize=pool_size, max_retries=retry))
+        session.mount("http://", HTTPAdapter(pool_maxsize=pool_size, max_retries=retry))
+        session.headers.update({
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json'
+        })
+        return session
+
+    def deliver_message(self, to_phone, message, timeout=None):
+        """Send one message, raising WhatsAppDeliveryError unless the API accepted it."""
+        # Format phone number (add country code if needed)
+        # Assuming Indian numbers - adjust as needed
+        # if to_phone.len(to_phone) == 10:
+        #     to_phone = '91' + to_phone
+
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": to_phone,
+            "type": "text",
+            "text": {
+                "body": message
+            }
+        }
+
+        self.rate_limiter.wait()
+        try:
+            response = self.session.post(self.base_url, json=payload, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            raise WhatsAppDeliveryError(str(e), ambiguous=_sent_without_response(e)) from e
+
+        if response.status_code != 200:
+            raise WhatsAppDeliveryError(f"WhatsApp API error: {response.status_code} - {response.text}",
+                                        status_code=response.status_code)
+
+    def send_message(self, to_phone, message, timeout=None):
         """
         Send WhatsApp message to a phone number
         Phone number should be in format: 1234567890 (without country code prefix)
         """
         try:
-            headers = {
-                'Authorization': f'Bearer {self.token}',
-                'Content-Type': 'application/json'
-            }
-            
-            # Format phone number (add country code if needed)
-            # Assuming Indian numbers - adjust as needed
-            # if to_phone.len(to_phone) == 10:
-            #     to_phone = '91' + to_phone
-            
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": to_phone,
-                "type": "text",
-                "text": {
-                    "body": message
-                }
-            }
-            
-            response = requests.post(self.base_url, json=payload, headers=headers)
-            
-            if response.status_code == 200:
-                print(f"WhatsApp message sent to {to_phone}")
-                return True
-            else:
-                print(f"WhatsApp API error: {response.status_code} - {response.text}")
-                return False
-                
+            self.deliver_message(to_phone, message, timeout)
+            print(f"WhatsApp message sent to {to_phone}")
+            return True
+
+        except WhatsAppDeliveryError as e:
+            print(str(e))
+            return False
         except Exception as e:
             print(f"Error sending WhatsApp message: {str(e)}")
             return False
-    
-    def send_attendance_reminder(self, to_phone, name, week):
+
+    def _sender_pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="whatsapp-sender")
+            return self._executor
+
+    def send_message_async(self, to_phone, message, timeout=None):
+        """Queue one message on the bounded sender pool; the future resolves to send_message's result."""
+        return self._sender_pool().submit(self.send_message, to_phone, message, timeout)
+
+    def deliver_message_async(self, to_phone, message, timeout=None):
+        """Queue one message on the sender pool; the future raises if delivery failed."""
+        return self._sender_pool().submit(self.deliver_message, to_phone, message, timeout)
+
+    def send_many(self, messages):
         """
-        Send formatted attendance reminder via WhatsApp
+        Send (to_phone, message) pairs concurrently over the kept-alive
+        connections, paced by the rate limit. Returns True/False per pair, in order.
         """
-        message = f"""Hello {name},
+        futures = [self.send_message_async(to_phone, message) for to_phone, message in messages]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+        self.session.close()
+
+    def attendance_reminder_message(self, name, week):
+        return f"""Hello {name},
 
 📊 Attendance Reminder
 
@@ -58,8 +176,15 @@ This is a friendly reminder to submit your attendance for week {week}.
 Please log in to the system and complete your attendance at your earliest convenience.
 
 Thank you!"""
-        
-        return self.send_message(to_phone, message)
+
+    def send_attendance_reminder(self, to_phone, name, week, timeout=None):
+        """
+        Send formatted attendance reminder via WhatsApp
+        """
+        return self.send_message(to_phone, self.attendance_reminder_message(name, week), timeout=timeout)
+
+    def send_attendance_reminder_async(self, to_phone, name, week):
+        return self.send_message_async(to_phone, self.attendance_reminder_message(name, week))
 
 # Create global instance
-whatsapp_service = WhatsAppService()
\ No newline at end of file
+whatsapp_service = WhatsAppService()
@@ -0,0 +1,252 @@
+# benchmark_attendance_indexes.py
+"""
+Query plans and timings for the attendance access paths, with and without
+the composite indexes declared on Attendance / YouthAttendance.
+
+    python benchmark_attendance_indexes.py [--states 4] [--years 3] [--runs 5]
+
+The benchmark DROPS AND RECREATES every table in the target database, so it
+only runs against BENCHMARK_DATABASE_URL (default: a throwaway SQLite file),
+never DATABASE_URL. Point it at a scratch PostgreSQL database to see the
+production planner, e.g.
+    BENCHMARK_DATABASE_URL=postgresql://localhost/attendance_bench
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import event, insert
+from app.extensions import db
+from app.models import State, Region, OldGroup, Group, District, Attendance, YouthAttendance
+from app.controllers import attendance_controller, youth_attendance_controller
+from app.controllers.attendance_monitor_controller import get_last_weeks_by_level
+from app.utils import attendance_monitor
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+SERVICE_TYPES = ["Sunday Service", "Bible Study", "Revival"]
+
+BENCHMARKED_TABLES = (Attendance.__table__, YouthAttendance.__table__)
+
+
+def create_benchmark_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def access_path_indexes():
+    """The composite (non-unique) indexes under test."""
+    return [index for table in BENCHMARKED_TABLES for index in table.indexes if not index.unique]
+
+
+# -----------------------------
+# SEED DATA
+# -----------------------------
+
+def seed(states, years, groups_per_region=5, districts_per_group=4):
+    """A hierarchy of `states` states with `years` years of weekly attendance per district."""
+    print(f"🌱 Seeding {states} states x {years} years...")
+    node_id = {"region": 0, "old_group": 0, "group": 0, "district": 0}
+    hierarchy = {"state": [], "region": [], "old_group": [], "group": [], "district": []}
+
+    for s in range(1, states + 1):
+        hierarchy["state"].append({"id": s, "name": f"State {s}", "code": f"S{s}"})
+        for _ in range(3):
+            node_id["region"] += 1
+            region_id = node_id["region"]
+            hierarchy["region"].append({"id": region_id, "name": f"Region {region_id}", "code": f"R{region_id}", "state_id": s})
+            node_id["old_group"] += 1
+            old_group_id = node_id["old_group"]
+            hierarchy["old_group"].append({"id": old_group_id, "name": f"Old Group {old_group_id}", "code": f"O{old_group_id}",
+                                           "state_id": s, "region_id": region_id})
+            for _ in range(groups_per_region):
+                node_id["group"] += 1
+                group_id = node_id["group"]
+                hierarchy["group"].append({"id": group_id, "name": f"Group {group_id}", "code": f"G{group_id}",
+                                           "state_id": s, "region_id": region_id, "old_group_id": old_group_id})
+                for _ in range(districts_per_group):
+                    node_id["district"] += 1
+                    hierarchy["district"].append({
+                        "id": node_id["district"], "name": f"District {node_id['district']}", "code": f"D{node_id['district']}",
+                        "state_id": s, "region_id": region_id, "old_group_id": old_group_id, "group_id": group_id,
+                    })
+
+    for model, level in [(State, "state"), (Region, "region"), (OldGroup, "old_group"), (Group, "group"), (District, "district")]:
+        db.session.execute(insert(model.__table__), hierarchy[level])
+
+    this_year = attendance_monitor.CURRENT_YEAR
+    rng = random.Random(42)
+    batch, youth, total = [], [], 0
+    for year in range(this_year - years + 1, this_year + 1):
+        for month in MONTHS:
+            for district in hierarchy["district"]:
+                ids = {k: district[k] for k in ("state_id", "region_id", "old_group_id", "group_id")}
+                for week in range(1, 5):
+                    for service_type in SERVICE_TYPES:
+                        batch.append({
+                            "service_type": service_type, "year": year, "month": month, "week": week,
+                            "district_id": district["id"], **ids,
+                            "men": rng.randint(0, 80), "women": rng.randint(0, 80),
+                            "youth_boys": 0, "youth_girls": 0, "children_boys": 0, "children_girls": 0,
+                        })
+                youth.append({"attendance_type": "weekly", "year": year, "month": month, "week": 1,
+                              "district_id": district["id"], **ids, "member_boys": rng.randint(0, 20)})
+            db.session.execute(insert(Attendance.__table__), batch)
+            total += len(batch)
+            batch = []
+    db.session.execute(insert(YouthAttendance.__table__), youth)
+    db.session.commit()
+    print(f"🌱 Seeded {total} attendance rows and {len(youth)} youth attendance rows")
+    return hierarchy
+
+
+# -----------------------------
+# QUERIES UNDER TEST
+# -----------------------------
+
+def access_path_queries(hierarchy):
+    """(label, callable) pairs calling the real controller code for each access path."""
+    year, month = attendance_monitor.CURRENT_YEAR, attendance_monitor.CURRENT_MONTH
+    state_id = hierarchy["state"][-1]["id"]
+    region_id = hierarchy["region"][-1]["id"]
+    group_id = hierarchy["group"][-1]["id"]
+    district_id = hierarchy["district"][-1]["id"]
+
+    return [
+        ("get_all_attendance(state, year, month)",
+         lambda: attendance_controller.get_all_attendance(state_id=state_id, year=year, month=month)),
+        ("get_attendance_page(region, first 100)",
+         lambda: attendance_controller.get_attendance_page(region_id=region_id, limit=100)),
+        ("get_last_attendance_week(district)",
+         lambda: attendance_monitor.get_last_attendance_week("district", district_id)),
+        ("get_last_attendance_week(group)",
+         lambda: attendance_monitor.get_last_attendance_week("group", group_id)),
+        ("get_last_weeks_by_level(year, month)",
+         lambda: get_last_weeks_by_level(year, month)),
+        ("get_last_weeks_by_level(region scope)",
+         lambda: get_last_weeks_by_level(year, month, "region", region_id)),
+        ("get_all_youth_attendance(state, year, month)",
+         lambda: youth_attendance_controller.get_all_youth_attendance(state_id=state_id, year=year, month=month)),
+    ]
+
+
+def quietly(fn):
+    # the controllers print their filters on every call; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+
+def capture_statements(fn):
+    """Run fn once and return the (sql, params) it sent to the database."""
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        quietly(fn)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return statements
+
+
+def explain(statement, parameters):
+    dialect = db.engine.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+    if dialect == "sqlite":
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def time_call(fn, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        quietly(fn)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure(queries, runs):
+    results = {}
+    for label, fn in queries:
+        plans = [explain(sql, params) for sql, params in capture_statements(fn)]
+        results[label] = {"plans": plans, "ms": time_call(fn, runs)}
+    return results
+
+
+def analyze():
+    if db.engine.dialect.name == "postgresql":
+        with db.engine.begin() as connection:
+            for table in BENCHMARKED_TABLES:
+                connection.exec_driver_sql(f"ANALYZE {table.name}")
+    else:
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+
+
+def report(before, after):
+    print("\n=== ATTENDANCE ACCESS PATHS: without vs with composite indexes ===")
+    for label in before:
+        b, a = before[label], after[label]
+        speedup = b["ms"] / a["ms"] if a["ms"] else float("inf")
+        print(f"\n▶ {label}")
+        print(f"   time: {b['ms']:.2f} ms -> {a['ms']:.2f} ms  ({speedup:.1f}x)")
+        for name, result in (("before", b), ("after", a)):
+            for plan in result["plans"]:
+                print(f"   {name}: " + " | ".join(line.strip() for line in plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--states", type=int, default=4)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query (median is reported)")
+    args = parser.parse_args()
+
+    url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.gettempdir(), "attendance_index_benchmark.db")
+    print(f"📊 Benchmark database: {url}")
+
+    app = create_benchmark_app(url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        hierarchy = seed(args.states, args.years)
+        queries = access_path_queries(hierarchy)
+
+        indexes = access_path_indexes()
+        for index in indexes:
+            index.drop(db.engine)
+        analyze()
+        before = measure(queries, args.runs)
+
+        for index in indexes:
+            index.create(db.engine)
+        analyze()
+        after = measure(queries, args.runs)
+
+        report(before, after)
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmark_notifications.py
+"""
+Wall-clock time of a reminder run (email + WhatsApp per recipient) against
+local stand-ins: the old one-recipient-at-a-time loop versus
+NotificationService.send_attendance_reminders.
+
+    pip install aiosmtpd
+    python benchmark_notifications.py [--recipients 5000] [--smtp-latency 20] [--http-latency 100]
+
+The SMTP stand-in is the STARTTLS + AUTH aiosmtpd stub from
+benchmark_smtp_pool.py; the WhatsApp stand-in is a threaded HTTP server
+answering 200. Both wait --smtp-latency / --http-latency ms per message to
+stand in for the real relay and Graph API. The serial loop is linear in the
+number of recipients, so it is timed on --serial-sample recipients and
+scaled up rather than run for minutes.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_smtp_pool import SMTP_USER, SMTP_PASSWORD, self_signed_context, start_stub_server, send_unpooled
+from app.utils.email_service import EmailService
+from app.utils.notification_service import NotificationService
+from app.utils.whatsapp_service import WhatsAppService, WHATSAPP_CONCURRENCY
+
+
+class WhatsAppStub(BaseHTTPRequestHandler):
+    latency = 0
+    received = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        with self.lock:
+            WhatsAppStub.received += 1
+        body = b'{"messages": [{"id": "wamid.stub"}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_whatsapp_stub(latency):
+    WhatsAppStub.latency = latency
+    ThreadingHTTPServer.request_queue_size = 256
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WhatsAppStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def recipients(count):
+    return [SimpleNamespace(name=f"Admin {i}", email=f"admin{i}@example.org", phone=f"234800{i:07d}")
+            for i in range(count)]
+
+
+def serial_run(email_service, whatsapp_url, users, week=3):
+    """The pre-dispatcher loop: per recipient, a fresh SMTP session, then an unpooled WhatsApp POST."""
+    for user in users:
+        send_unpooled(email_service, [{"to_email": user.email, "subject": "Attendance Reminder",
+                                       "template_name": "attendance_reminder",
+                                       "context": {"name": user.name, "week": week}}])
+        requests.post(whatsapp_url, json={"messaging_product": "whatsapp", "to": user.phone, "type": "text",
+                                          "text": {"body": f"Hello {user.name}, week {week}"}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=5000)
+    parser.add_argument("--serial-sample", type=int, default=100)
+    parser.add_argument("--smtp-latency", type=float, default=20, help="ms per message at the SMTP stub")
+    parser.add_argument("--http-latency", type=float, default=100, help="ms per call at the WhatsApp stub")
+    parser.add_argument("--smtp-pool-size", type=int, default=4)
+    parser.add_argument("--whatsapp-concurrency", type=int, default=WHATSAPP_CONCURRENCY)
+    args = parser.parse_args()
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+    users = recipients(args.recipients)
+    with tempfile.TemporaryDirectory() as directory:
+        controller, smtp_stub = start_stub_server(self_signed_context(directory), args.smtp_latency / 1000)
+        http_stub = start_whatsapp_stub(args.http_latency / 1000)
+
+        whatsapp_url = f"http://127.0.0.1:{http_stub.server_port}/messages"
+        whatsapp = WhatsAppService(concurrency=args.whatsapp_concurrency, rate_limit=0)
+        whatsapp.base_url = whatsapp_url
+
+        def email_service():
+            return EmailService(controller.hostname, controller.port, SMTP_USER, SMTP_PASSWORD,
+                                pool_size=args.smtp_pool_size)
+
+        print(f"📮 {args.recipients} recipients, SMTP stub {args.smtp_latency:g} ms/message, "
+              f"WhatsApp stub {args.http_latency:g} ms/call")
+        try:
+            sample = users[:args.serial_sample]
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                serial_run(email_service(), whatsapp_url, sample)
+            per_recipient = (time.perf_counter() - started) / len(sample)
+            serial_estimate = per_recipient * len(users)
+            print(f"▶ serial loop            {per_recipient * 1000:7.1f} ms/recipient over {len(sample)} "
+                  f"-> {serial_estimate:8.1f}s ({serial_estimate / 60:.1f} min) for {len(users)}")
+
+            service = NotificationService(email_service=email_service(), whatsapp=whatsapp)
+            smtp_before, http_before = smtp_stub.received, WhatsAppStub.received
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = service.send_attendance_reminders([(user, 3) for user in users])
+            elapsed = time.perf_counter() - started
+            service.email_service.close()
+            whatsapp.close()
+
+            emailed = sum(r["email_sent"] for r in results)
+            messaged = sum(r["whatsapp_sent"] for r in results)
+            print(f"▶ concurrent dispatcher  {elapsed:8.1f}s  email {emailed}/{len(users)} "
+                  f"(stub got {smtp_stub.received - smtp_before}), whatsapp {messaged}/{len(users)} "
+                  f"(stub got {WhatsAppStub.received - http_before}); "
+                  f"{args.smtp_pool_size} SMTP connections, {args.whatsapp_concurrency} WhatsApp senders")
+            print(f"\n📊 {serial_estimate / elapsed:.0f}x faster than the serial loop")
+        finally:
+            controller.stop()
+            http_stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
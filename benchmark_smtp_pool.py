@@ -0,0 +1,163 @@
+# benchmark_smtp_pool.py
+"""
+Reminder fan-out throughput against a local stub SMTP server: a fresh
+connection + STARTTLS + login per email (the old EmailService behaviour)
+versus the pooled transport, sequentially and through the sender pool.
+
+    pip install aiosmtpd
+    python benchmark_smtp_pool.py [--messages 300] [--pool-size 4] [--latency 0] [--no-tls]
+
+The stub (aiosmtpd) offers STARTTLS with a throwaway self-signed certificate
+made by the openssl CLI, and requires AUTH, so each new connection pays the
+same handshake a real relay would - minus the network round trips, which
+only widen the gap in production. --latency adds a per-message delay to the
+stub's DATA reply, like a real relay, which is where the concurrent senders pay off.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import smtplib
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(os.path.dirname(os.path.abspath(__file__)))  # email templates are loaded relative to the repo root
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:
+    sys.exit("❌ aiosmtpd is required for this benchmark: pip install aiosmtpd")
+
+from app.utils.email_service import EmailService
+
+SMTP_USER = "reminders@example.org"
+SMTP_PASSWORD = "benchmark"
+
+
+class CountingHandler:
+    def __init__(self, latency=0):
+        self.received = 0
+        self.latency = latency
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    ok = auth_data.login == SMTP_USER.encode() and auth_data.password == SMTP_PASSWORD.encode()
+    return AuthResult(success=ok)
+
+
+def self_signed_context(directory):
+    """Server-side TLS context with a fresh self-signed certificate, or None without openssl."""
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_server(tls_context, latency=0):
+    handler = CountingHandler(latency)
+    options = {"authenticator": authenticate, "auth_require_tls": tls_context is not None}
+    if tls_context is not None:
+        options.update(tls_context=tls_context, require_starttls=True)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port(), **options)
+    controller.start()
+    return controller, handler
+
+
+def reminder(i):
+    return {"to_email": f"admin{i}@example.org", "subject": "Attendance Reminder",
+            "template_name": "attendance_reminder", "context": {"name": f"Admin {i}", "week": 3}}
+
+
+def send_unpooled(service, emails):
+    """What EmailService.send_email did before pooling: connect, STARTTLS, login, send, quit."""
+    for email in emails:
+        message = service._build_message(**email)
+        with smtplib.SMTP(service.smtp_server, service.smtp_port, timeout=service.timeout) as server:
+            if service.use_tls:
+                server.starttls()
+            server.login(service.smtp_user, service.smtp_password)
+            server.sendmail(service.smtp_user, email["to_email"], message)
+    return len(emails)
+
+
+def send_pooled_sequential(service, emails):
+    return sum(service.send_email(**email) for email in emails)
+
+
+def send_pooled_concurrent(service, emails):
+    return sum(service.send_many(emails))
+
+
+def run(label, fn, make_service, emails, handler):
+    service = make_service()
+    before = handler.received
+    started = time.perf_counter()
+    sent = fn(service, emails)
+    elapsed = time.perf_counter() - started
+    service.close()
+    delivered = handler.received - before
+    connections = service.pool.connections_opened or len(emails)
+    print(f"▶ {label:<34} {elapsed:7.2f}s  {len(emails) / elapsed:8.1f} msg/s  "
+          f"sent={sent} delivered={delivered} connections={connections}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0, help="stub server delay per message, in ms")
+    parser.add_argument("--no-tls", action="store_true", help="plain SMTP (no STARTTLS) on the stub")
+    args = parser.parse_args()
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tls_context = None if args.no_tls else self_signed_context(directory)
+        controller, handler = start_stub_server(tls_context, args.latency / 1000)
+        print(f"📮 Stub SMTP server on {controller.hostname}:{controller.port} "
+              f"({'STARTTLS + AUTH' if tls_context else 'plain + AUTH'}, {args.latency:g} ms per message), "
+              f"{args.messages} messages")
+
+        def make_service(pool_size=args.pool_size):
+            return EmailService(controller.hostname, controller.port, SMTP_USER, SMTP_PASSWORD,
+                                use_tls=tls_context is not None, pool_size=pool_size)
+
+        emails = [reminder(i) for i in range(args.messages)]
+        try:
+            baseline = run("connection per message", send_unpooled, make_service, emails, handler)
+            sequential = run("pooled, sequential", send_pooled_sequential, make_service, emails, handler)
+            concurrent = run(f"pooled, send_many ({args.pool_size} senders)", send_pooled_concurrent,
+                             make_service, emails, handler)
+        finally:
+            controller.stop()
+
+    print(f"\n📊 pooled sequential: {baseline / sequential:.1f}x faster, "
+          f"send_many: {baseline / concurrent:.1f}x faster than a connection per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmark_whatsapp.py
+"""
+WhatsAppService against a local mock of the Graph API messages endpoint:
+one requests.post per message (the old client) versus send_many over the
+pooled keep-alive session, with throttling and server errors injected to
+exercise the retries.
+
+    python benchmark_whatsapp.py [--messages 1000] [--latency 50] [--throttle-every 20] [--fail-every 50]
+
+The mock speaks HTTP/1.1 keep-alive, waits --latency ms per request, answers
+every --throttle-every'th request with 429 + Retry-After and every
+--fail-every'th with 503, and counts the TCP connections it accepted.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.whatsapp_service import WhatsAppService, WHATSAPP_CONCURRENCY
+
+
+class MockGraphAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0
+    throttle_every = 0
+    fail_every = 0
+    lock = threading.Lock()
+    stats = {}
+
+    @classmethod
+    def reset(cls):
+        cls.stats = {"connections": 0, "requests": 0, "throttled": 0, "failed": 0, "delivered": {}}
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.latency)
+        with self.lock:
+            self.stats["requests"] += 1
+            n = self.stats["requests"]
+            if self.throttle_every and n % self.throttle_every == 0:
+                self.stats["throttled"] += 1
+                status = 429
+            elif self.fail_every and n % self.fail_every == 0:
+                self.stats["failed"] += 1
+                status = 503
+            else:
+                status = 200
+                delivered = self.stats["delivered"]
+                delivered[payload["to"]] = delivered.get(payload["to"], 0) + 1
+
+        if status == 429:
+            self._reply(429, {"error": {"code": 130429, "message": "Rate limit hit"}}, [("Retry-After", "0")])
+        elif status == 503:
+            self._reply(503, {"error": {"code": 2, "message": "Service temporarily unavailable"}})
+        else:
+            self._reply(200, {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.{n}"}]})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock(latency, throttle_every, fail_every):
+    MockGraphAPI.latency = latency
+    MockGraphAPI.throttle_every = throttle_every
+    MockGraphAPI.fail_every = fail_every
+    MockGraphAPI.reset()
+    ThreadingHTTPServer.request_queue_size = 256
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockGraphAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def unpooled(url, messages):
+    """The old client: a bare requests.post per message - new connection, no retries, no timeout."""
+    sent = 0
+    for to_phone, text in messages:
+        response = requests.post(url, json={"messaging_product": "whatsapp", "to": to_phone, "type": "text",
+                                            "text": {"body": text}})
+        sent += response.status_code == 200
+    return sent
+
+
+def report(label, elapsed, sent, total):
+    stats = MockGraphAPI.stats
+    duplicates = sum(count - 1 for count in stats["delivered"].values())
+    print(f"▶ {label:<30} {elapsed:7.2f}s  {total / elapsed:7.1f} msg/s  sent={sent}/{total} "
+          f"connections={stats['connections']} requests={stats['requests']} "
+          f"429s={stats['throttled']} 503s={stats['failed']} duplicates={duplicates}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=50, help="ms per request at the mock")
+    parser.add_argument("--throttle-every", type=int, default=20, help="answer every Nth request with 429, 0 = never")
+    parser.add_argument("--fail-every", type=int, default=50, help="answer every Nth request with 503, 0 = never")
+    parser.add_argument("--concurrency", type=int, default=WHATSAPP_CONCURRENCY)
+    parser.add_argument("--rate-limit", type=float, default=0, help="messages per second, 0 = unlimited")
+    args = parser.parse_args()
+
+    server = start_mock(args.latency / 1000, args.throttle_every, args.fail_every)
+    url = f"http://127.0.0.1:{server.server_port}/v17.0/123/messages"
+    messages = [(f"234800{i:07d}", f"Reminder {i}") for i in range(args.messages)]
+    print(f"📱 Mock Graph API on {url}, {args.latency:g} ms/request, "
+          f"429 every {args.throttle_every or '-'}, 503 every {args.fail_every or '-'}")
+
+    try:
+        sample = messages[:max(1, args.messages // 10)]
+        started = time.perf_counter()
+        sent = unpooled(url, sample)
+        report(f"requests.post x{len(sample)} (serial)", time.perf_counter() - started, sent, len(sample))
+
+        MockGraphAPI.reset()
+        service = WhatsAppService(concurrency=args.concurrency, rate_limit=args.rate_limit)
+        service.base_url = url
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = service.send_many(messages)
+        elapsed = time.perf_counter() - started
+        service.close()
+        report(f"send_many ({args.concurrency} senders)", elapsed, sum(results), len(messages))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
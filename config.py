@@ -31,6 +31,33 @@ class Config:
     EMAIL_USER = os.environ.get("EMAIL_USER")
     EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")
     SUPPORT_EMAIL = os.environ.get("SUPPORT_EMAIL")
+    SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 4))     # reused SMTP connections / sender threads
+    SMTP_MAX_IDLE = int(os.environ.get("SMTP_MAX_IDLE", 60))      # seconds before an idle connection is replaced
+
+    # 🎯 CACHING - process-local by default, Redis when CACHE_REDIS_URL is set
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    MONITOR_CACHE_TTL = int(os.environ.get("MONITOR_CACHE_TTL", 300))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+    HIERARCHY_SNAPSHOT_MAX_AGE = int(os.environ.get("HIERARCHY_SNAPSHOT_MAX_AGE", 300))  # bounds staleness from writes made outside the app
+
+    # 🎯 BACKGROUND IMPORT JOBS - queued in the import_jobs table
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))                 # worker threads per process, 0 = don't run jobs here
+    JOB_POLL_INTERVAL = int(os.environ.get("JOB_POLL_INTERVAL", 5))     # seconds between queue polls when idle
+    JOB_PROGRESS_INTERVAL = int(os.environ.get("JOB_PROGRESS_INTERVAL", 2))
+    JOB_STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", 1800))      # running jobs silent this long are requeued
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+    JOB_UPLOAD_DIR = os.environ.get("JOB_UPLOAD_DIR")                   # must be shared if workers run on other hosts
+
+    # 🎯 NOTIFICATION OUTBOX - reminders queued in notification_outbox, sent by workers
+    OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", 1))            # worker threads per process, 0 = don't send here
+    OUTBOX_POLL_INTERVAL = int(os.environ.get("OUTBOX_POLL_INTERVAL", 5))
+    OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 200))    # messages claimed per batch
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 6))  # then the message is kept as a dead letter
+    OUTBOX_RETRY_BASE = int(os.environ.get("OUTBOX_RETRY_BASE", 30))     # seconds before the first retry, doubling after
+    OUTBOX_RETRY_MAX = int(os.environ.get("OUTBOX_RETRY_MAX", 3600))
+    OUTBOX_STALE_AFTER = int(os.environ.get("OUTBOX_STALE_AFTER", 600))  # 'sending' rows this old are requeued
+    OUTBOX_HEARTBEAT_INTERVAL = int(os.environ.get("OUTBOX_HEARTBEAT_INTERVAL", 60))  # keep a slow batch's rows fresh, well under STALE_AFTER
+    OUTBOX_KEEP_SENT_DAYS = int(os.environ.get("OUTBOX_KEEP_SENT_DAYS", 30))
 
 
 
@@ -0,0 +1,73 @@
+"""Add attendance_rollups table
+
+Revision ID: 3f1c7a9e2b40
+Revises: d9543240a67e
+Create Date: 2026-10-17 09:12:05.418223
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c7a9e2b40'
+down_revision = 'd9543240a67e'
+branch_labels = None
+depends_on = None
+
+
+ROLLUP_LEVELS = {
+    'state': 'state_id',
+    'region': 'region_id',
+    'old_group': 'old_group_id',
+    'group': 'group_id',
+    'district': 'district_id',
+}
+
+
+def upgrade():
+    op.create_table('attendance_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('level', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=20), nullable=False),
+    sa.Column('week', sa.Integer(), nullable=False),
+    sa.Column('service_type', sa.String(length=50), nullable=False),
+    sa.Column('men', sa.Integer(), nullable=False),
+    sa.Column('women', sa.Integer(), nullable=False),
+    sa.Column('youth_boys', sa.Integer(), nullable=False),
+    sa.Column('youth_girls', sa.Integer(), nullable=False),
+    sa.Column('children_boys', sa.Integer(), nullable=False),
+    sa.Column('children_girls', sa.Integer(), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('level', 'entity_id', 'year', 'month', 'week', 'service_type', name='uq_attendance_rollup_key')
+    )
+    with op.batch_alter_table('attendance_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_rollup_level_period', ['level', 'year', 'month'], unique=False)
+
+    # Backfill from existing attendance rows
+    for level, column in ROLLUP_LEVELS.items():
+        op.execute(f"""
+            INSERT INTO attendance_rollups
+                (level, entity_id, year, month, week, service_type,
+                 men, women, youth_boys, youth_girls, children_boys, children_girls,
+                 record_count, updated_at)
+            SELECT '{level}', {column}, year, month, week, service_type,
+                   COALESCE(SUM(men), 0), COALESCE(SUM(women), 0),
+                   COALESCE(SUM(youth_boys), 0), COALESCE(SUM(youth_girls), 0),
+                   COALESCE(SUM(children_boys), 0), COALESCE(SUM(children_girls), 0),
+                   COUNT(id), CURRENT_TIMESTAMP
+            FROM attendance
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}, year, month, week, service_type
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_rollup_level_period')
+
+    op.drop_table('attendance_rollups')
@@ -0,0 +1,69 @@
+"""Add hierarchy_closure table
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c7a9e2b40
+Create Date: 2026-10-17 11:40:27.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a93'
+down_revision = '3f1c7a9e2b40'
+branch_labels = None
+depends_on = None
+
+
+LEVEL_ORDER = ['state', 'region', 'old_group', 'group', 'district']
+
+LEVEL_TABLES = {
+    'state': 'states',
+    'region': 'regions',
+    'old_group': 'old_groups',
+    'group': 'groups',
+    'district': 'districts',
+}
+
+PARENT_FIELDS = {
+    'state': [],
+    'region': [('state', 'state_id')],
+    'old_group': [('state', 'state_id'), ('region', 'region_id')],
+    'group': [('state', 'state_id'), ('region', 'region_id'), ('old_group', 'old_group_id')],
+    'district': [('state', 'state_id'), ('region', 'region_id'),
+                 ('old_group', 'old_group_id'), ('group', 'group_id')],
+}
+
+
+def upgrade():
+    op.create_table('hierarchy_closure',
+    sa.Column('ancestor_level', sa.String(length=20), nullable=False),
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_level', sa.String(length=20), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ancestor_level', 'ancestor_id', 'descendant_level', 'descendant_id')
+    )
+    with op.batch_alter_table('hierarchy_closure', schema=None) as batch_op:
+        batch_op.create_index('ix_hierarchy_closure_descendant', ['descendant_level', 'descendant_id'], unique=False)
+
+    # Backfill: every node paired with itself and with each ancestor it references
+    for level, table in LEVEL_TABLES.items():
+        pairs = [(level, 'id')] + PARENT_FIELDS[level]
+        for ancestor_level, column in pairs:
+            depth = LEVEL_ORDER.index(level) - LEVEL_ORDER.index(ancestor_level)
+            op.execute(f"""
+                INSERT INTO hierarchy_closure
+                    (ancestor_level, ancestor_id, descendant_level, descendant_id, depth)
+                SELECT '{ancestor_level}', {column}, '{level}', id, {depth}
+                FROM {table}
+                WHERE {column} IS NOT NULL
+            """)
+
+
+def downgrade():
+    with op.batch_alter_table('hierarchy_closure', schema=None) as batch_op:
+        batch_op.drop_index('ix_hierarchy_closure_descendant')
+
+    op.drop_table('hierarchy_closure')
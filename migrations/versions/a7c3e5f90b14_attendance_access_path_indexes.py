@@ -0,0 +1,54 @@
+"""Composite indexes for attendance access paths
+
+Revision ID: a7c3e5f90b14
+Revises: e1a6c9d42f58
+Create Date: 2026-10-17 17:35:12.448061
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f90b14'
+down_revision = 'e1a6c9d42f58'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_attendance_period', 'attendance', ['year', 'month', 'week']),
+    ('ix_attendance_state_period', 'attendance', ['state_id', 'year', 'month', 'week']),
+    ('ix_attendance_region_period', 'attendance', ['region_id', 'year', 'month', 'week']),
+    ('ix_attendance_old_group_period', 'attendance', ['old_group_id', 'year', 'month', 'week']),
+    ('ix_attendance_group_period', 'attendance', ['group_id', 'year', 'month', 'week']),
+    ('ix_attendance_district_period', 'attendance', ['district_id', 'year', 'month', 'week']),
+    ('ix_youth_attendance_type_period', 'youth_attendance', ['attendance_type', 'year', 'month']),
+    ('ix_youth_attendance_state_period', 'youth_attendance', ['state_id', 'year', 'month']),
+    ('ix_youth_attendance_region_period', 'youth_attendance', ['region_id', 'year', 'month']),
+    ('ix_youth_attendance_district_period', 'youth_attendance', ['district_id', 'year', 'month']),
+]
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if _is_postgres():
+        # Build without blocking attendance writes on a live database
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True)
+        op.execute('ANALYZE attendance')
+        op.execute('ANALYZE youth_attendance')
+        return
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
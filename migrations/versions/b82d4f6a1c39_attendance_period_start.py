@@ -0,0 +1,73 @@
+"""Add derived period_start date to attendance tables
+
+Revision ID: b82d4f6a1c39
+Revises: a7c3e5f90b14
+Create Date: 2026-10-17 18:52:40.183529
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date
+
+
+# revision identifiers, used by Alembic.
+revision = 'b82d4f6a1c39'
+down_revision = 'a7c3e5f90b14'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['attendance', 'youth_attendance']
+
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+
+
+def _period_start(year, month):
+    # Same rules as app.utils.periods.period_start, frozen for this migration
+    text = str(month or '').strip().lower()
+    if text.isdigit():
+        number = int(text)
+    elif text == 'sept':
+        number = 9
+    else:
+        names = [m for m in MONTHS if text in (m, m[:3])]
+        number = MONTHS.index(names[0]) + 1 if names else None
+    if not year or not number or not 1 <= number <= 12:
+        return None
+    return date(int(year), number, 1)
+
+
+def _backfill(table_name):
+    """One UPDATE per distinct (year, month) pair - there are only a few hundred."""
+    table = sa.table(table_name, sa.column('year', sa.Integer), sa.column('month', sa.String),
+                     sa.column('period_start', sa.Date))
+    bind = op.get_bind()
+    pairs = bind.execute(sa.select(table.c.year, table.c.month).distinct()).all()
+    for year, month in pairs:
+        start = _period_start(year, month)
+        if start is None:
+            continue  # unrecognised month - left NULL, like new rows
+        bind.execute(
+            table.update()
+            .where(table.c.year == year, table.c.month == month)
+            .values(period_start=start)
+        )
+
+
+def upgrade():
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('period_start', sa.Date(), nullable=True))
+        _backfill(table_name)
+
+    op.create_index('ix_attendance_period_start', 'attendance', ['period_start', 'week'], unique=False)
+    op.create_index('ix_youth_attendance_period_start', 'youth_attendance', ['period_start', 'week'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_youth_attendance_period_start', table_name='youth_attendance')
+    op.drop_index('ix_attendance_period_start', table_name='attendance')
+    for table_name in reversed(TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('period_start')
@@ -0,0 +1,70 @@
+"""Unique natural key on attendance
+
+Revision ID: c47a0e91d5b2
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-17 14:05:51.227614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a0e91d5b2'
+down_revision = '8b2e4d6f1a93'
+branch_labels = None
+depends_on = None
+
+
+NATURAL_KEY = [
+    'service_type', 'year', 'month', 'week', 'state_id', 'region_id',
+    'COALESCE(old_group_id, 0)', 'COALESCE(group_id, 0)', 'COALESCE(district_id, 0)',
+]
+
+ROLLUP_LEVELS = {
+    'state': 'state_id',
+    'region': 'region_id',
+    'old_group': 'old_group_id',
+    'group': 'group_id',
+    'district': 'district_id',
+}
+
+
+def upgrade():
+    # Keep the most recent submission for each natural key
+    op.execute(f"""
+        DELETE FROM attendance
+        WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MAX(id) AS keep_id FROM attendance GROUP BY {', '.join(NATURAL_KEY)}
+            ) latest
+        )
+    """)
+
+    op.create_index(
+        'uq_attendance_natural_key', 'attendance',
+        [sa.text(element) for element in NATURAL_KEY],
+        unique=True
+    )
+
+    # Duplicates were counted in the rollups - recompute them
+    op.execute("DELETE FROM attendance_rollups")
+    for level, column in ROLLUP_LEVELS.items():
+        op.execute(f"""
+            INSERT INTO attendance_rollups
+                (level, entity_id, year, month, week, service_type,
+                 men, women, youth_boys, youth_girls, children_boys, children_girls,
+                 record_count, updated_at)
+            SELECT '{level}', {column}, year, month, week, service_type,
+                   COALESCE(SUM(men), 0), COALESCE(SUM(women), 0),
+                   COALESCE(SUM(youth_boys), 0), COALESCE(SUM(youth_girls), 0),
+                   COALESCE(SUM(children_boys), 0), COALESCE(SUM(children_girls), 0),
+                   COUNT(id), CURRENT_TIMESTAMP
+            FROM attendance
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}, year, month, week, service_type
+        """)
+
+
+def downgrade():
+    op.drop_index('uq_attendance_natural_key', table_name='attendance')
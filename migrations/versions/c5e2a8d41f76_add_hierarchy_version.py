@@ -0,0 +1,31 @@
+"""Add hierarchy_version counter
+
+Revision ID: c5e2a8d41f76
+Revises: f3a9c1e7b520
+Create Date: 2026-10-17 22:41:09.512337
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a8d41f76'
+down_revision = 'f3a9c1e7b520'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    hierarchy_version = op.create_table('hierarchy_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(hierarchy_version, [{'id': 1, 'version': 0, 'updated_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table('hierarchy_version')
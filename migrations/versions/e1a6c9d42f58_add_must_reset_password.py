@@ -0,0 +1,26 @@
+"""Add must_reset_password to users
+
+Revision ID: e1a6c9d42f58
+Revises: 5d8f3b1c6e27
+Create Date: 2026-10-17 16:48:31.905214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a6c9d42f58'
+down_revision = '5d8f3b1c6e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('must_reset_password', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('must_reset_password')
@@ -84,6 +84,38 @@ def bootstrap_roles():
     for role in Role.query.all():
         print(f"  - {role.name}: {role.description}")
 
+@app.cli.command("rebuild-rollups")
+@with_appcontext
+def rebuild_rollups():
+    """Recompute attendance_rollups from the raw attendance table."""
+    from app.utils.attendance_rollups import rebuild_attendance_rollups
+    rebuild_attendance_rollups()
+    print("Attendance rollups rebuilt.")
+
+@app.cli.command("rebuild-hierarchy-closure")
+@with_appcontext
+def rebuild_hierarchy_closure():
+    """Recompute hierarchy_closure from the hierarchy tables."""
+    from app.utils.hierarchy_closure import rebuild_hierarchy_closure
+    rebuild_hierarchy_closure()
+    print("Hierarchy closure rebuilt.")
+
+@app.cli.command("run-jobs")
+@with_appcontext
+def run_jobs():
+    """Run an import job worker in the foreground (pair with JOB_WORKERS=0 on web processes)."""
+    from app.tasks.job_runner import work_jobs
+    print("Import job worker started - Ctrl+C to stop.")
+    work_jobs(app)
+
+@app.cli.command("run-outbox")
+@with_appcontext
+def run_outbox():
+    """Run a notification outbox worker in the foreground (pair with OUTBOX_WORKERS=0 on web processes)."""
+    from app.tasks.notification_outbox import work_outbox
+    print("Notification outbox worker started - Ctrl+C to stop.")
+    work_outbox(app)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
@@ -13,7 +13,9 @@ def test_enhanced_import_final():
     
     try:
         with open(FILE_PATH, "rb") as file:
+            # wait=true runs the import inside the request and returns its summary
             response = requests.post(url, 
+                                   params={"wait": "true"},
                                    files={"file": file}, 
                                    data={"state_name": STATE_NAME})
             
@@ -0,0 +1,38 @@
+"""Shared fixtures: an app on a throwaway SQLite database, with a Super Admin token."""
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+from config import Config
+from app.extensions import db
+from app.models import User, Role
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    uri = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        JOB_WORKERS = 0
+        OUTBOX_WORKERS = 0
+
+    # create_app seeds the roles on startup, so the tables must already exist
+    engine = create_engine(uri)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.start_scheduler", lambda: None)
+        from app import create_app
+        flask_app = create_app(TestConfig)
+
+    with flask_app.app_context():
+        super_admin = User(email="super@example.org", password_hash="x")
+        super_admin.roles.append(Role.query.filter_by(name="Super Admin").one())
+        db.session.add(super_admin)
+        db.session.commit()
+        flask_app.config["TEST_TOKEN"] = create_access_token(identity=str(super_admin.id))
+
+    yield flask_app
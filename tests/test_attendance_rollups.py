@@ -0,0 +1,100 @@
+"""
+The rollup table is maintained incrementally on every attendance write; after
+any sequence of writes it must hold exactly what a full rebuild computes.
+"""
+import pytest
+from app.controllers.attendance_controller import (
+    ATTENDANCE_DEFAULTS, DuplicateAttendanceError, InvalidAttendanceError, create_attendance, delete_attendance,
+    update_attendance, upsert_attendance_rows,
+)
+from app.extensions import db
+from app.models import AttendanceRollup, State, Region, OldGroup, Group, District
+from app.utils.attendance_rollups import ROLLUP_KEY_FIELDS, SUM_FIELDS, rebuild_attendance_rollups
+
+
+@pytest.fixture(scope="module")
+def hierarchy(app):
+    with app.app_context():
+        state = State(name="State", code="S")
+        db.session.add(state)
+        db.session.flush()
+        region = Region(name="Region", code="R", state_id=state.id)
+        db.session.add(region)
+        db.session.flush()
+        old_group = OldGroup(name="Old Group", code="O", state_id=state.id, region_id=region.id)
+        db.session.add(old_group)
+        db.session.flush()
+        group = Group(name="Group", code="G", state_id=state.id, region_id=region.id, old_group_id=old_group.id)
+        db.session.add(group)
+        db.session.flush()
+        district = District(name="District", code="D", state_id=state.id, region_id=region.id,
+                            old_group_id=old_group.id, group_id=group.id)
+        db.session.add(district)
+        db.session.commit()
+        return dict(state_id=state.id, region_id=region.id, old_group_id=old_group.id,
+                    group_id=group.id, district_id=district.id)
+
+
+def attendance(hierarchy, week=1, **counts):
+    return {**ATTENDANCE_DEFAULTS, **hierarchy, "service_type": "Sunday Service",
+            "year": 2025, "month": "March", "week": week, **counts}
+
+
+def rollups():
+    return sorted(
+        tuple(getattr(row, field) for field in (*ROLLUP_KEY_FIELDS, *SUM_FIELDS))
+        for row in AttendanceRollup.query.all()
+    )
+
+
+def assert_rollups_match_rebuild():
+    live = rollups()
+    rebuild_attendance_rollups()
+    assert live == rollups()
+
+
+def test_resubmitting_a_key_replaces_its_rollup_contribution(app, hierarchy):
+    with app.app_context():
+        create_attendance(attendance(hierarchy, men=10, women=4))
+        create_attendance(attendance(hierarchy, men=7))
+        assert_rollups_match_rebuild()
+
+        # Same key twice in one batch, plus one already stored and one new row
+        upsert_attendance_rows([
+            attendance(hierarchy, men=3),
+            attendance(hierarchy, men=5, children_boys=2),
+            attendance(hierarchy, week=2, men=8),
+        ])
+        db.session.commit()
+        assert_rollups_match_rebuild()
+
+        district_week_1 = AttendanceRollup.query.filter_by(level="district", week=1).one()
+        assert (district_week_1.men, district_week_1.children_boys, district_week_1.record_count) == (5, 2, 1)
+
+
+def test_edits_and_deletes_move_rollup_contributions(app, hierarchy):
+    with app.app_context():
+        record = create_attendance(attendance(hierarchy, week=3, men=6, women=6))
+        update_attendance(record.id, {"men": 9})
+        assert_rollups_match_rebuild()
+
+        # Moving the record to another week takes its counts along
+        update_attendance(record.id, {"week": 4, "women": 1})
+        assert_rollups_match_rebuild()
+        assert not AttendanceRollup.query.filter_by(week=3).count()
+
+        assert delete_attendance(record.id)
+        assert_rollups_match_rebuild()
+        assert not AttendanceRollup.query.filter_by(week=4).count()
+
+
+def test_update_errors_leave_rollups_untouched(app, hierarchy):
+    with app.app_context():
+        record = create_attendance(attendance(hierarchy, week=5, men=2))
+        create_attendance(attendance(hierarchy, week=6, men=3))
+
+        with pytest.raises(DuplicateAttendanceError):
+            update_attendance(record.id, {"week": 6})
+        with pytest.raises(InvalidAttendanceError, match="state_id"):
+            update_attendance(record.id, {"state_id": None})
+        assert_rollups_match_rebuild()
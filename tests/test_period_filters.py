@@ -0,0 +1,30 @@
+"""A malformed from/to bound is rejected, never dropped (dropping it widens the result to every period)."""
+import pytest
+
+PERIOD_ENDPOINTS = [
+    "/attendance/attendance",
+    "/attendance/attendance/export",
+    "/youth-attendance/youth-attendance",
+    "/youth-attendance/youth-attendance/export",
+]
+
+
+@pytest.mark.parametrize("url", PERIOD_ENDPOINTS)
+@pytest.mark.parametrize("query", ["from=2025-13", "to=2025-xx", "from=March"])
+def test_malformed_period_is_rejected(app, url, query):
+    headers = {"Authorization": f"Bearer {app.config['TEST_TOKEN']}"}
+    with app.test_client() as client:
+        response = client.get(f"{url}?{query}", headers=headers)
+        response.close()
+    assert response.status_code == 400
+    assert "expected YYYY-MM" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("url", PERIOD_ENDPOINTS)
+def test_valid_period_is_accepted(app, url):
+    headers = {"Authorization": f"Bearer {app.config['TEST_TOKEN']}"}
+    with app.test_client() as client:
+        response = client.get(f"{url}?from=2025-01&to=2025-12", headers=headers)
+        response.get_data()
+        response.close()
+    assert response.status_code == 200
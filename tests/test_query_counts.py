@@ -0,0 +1,89 @@
+"""
+Listing endpoints must not issue a query per row: the statement count of a
+request stays the same however many users and hierarchy nodes exist.
+"""
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models import User, Role, State, Region, OldGroup, Group, District
+
+LISTING_ENDPOINTS = [
+    "/hierarchy/regions",
+    "/hierarchy/oldgroups",
+    "/hierarchy/groups",
+    "/hierarchy/districts",
+    "/dashboard/dashboard/users",
+    "/api/users/",
+]
+
+ADMIN_ROLES = ("State Admin", "Region Admin", "Group Admin", "District Admin")
+
+
+def seed(count):
+    """Add `count` state → region → old group → group → district chains, each with its admins."""
+    roles = {name: Role.query.filter_by(name=name).one() for name in ADMIN_ROLES}
+    start = State.query.count()
+    for n in range(start, start + count):
+        state = State(name=f"State {n}", code=f"S{n}")
+        db.session.add(state)
+        db.session.flush()
+        region = Region(name=f"Region {n}", code=f"R{n}", state_id=state.id)
+        db.session.add(region)
+        db.session.flush()
+        old_group = OldGroup(name=f"Old Group {n}", code=f"O{n}", state_id=state.id, region_id=region.id)
+        db.session.add(old_group)
+        db.session.flush()
+        group = Group(name=f"Group {n}", code=f"G{n}", state_id=state.id, region_id=region.id,
+                      old_group_id=old_group.id)
+        db.session.add(group)
+        db.session.flush()
+        district = District(name=f"District {n}", code=f"D{n}", state_id=state.id, region_id=region.id,
+                            old_group_id=old_group.id, group_id=group.id)
+        db.session.add(district)
+        db.session.flush()
+
+        links = dict(state_id=state.id, region_id=region.id, old_group_id=old_group.id,
+                     group_id=group.id, district_id=district.id)
+        for role_name, role in roles.items():
+            user = User(email=f"{role_name.replace(' ', '').lower()}{n}@example.org", password_hash="x", **links)
+            user.roles.append(role)
+            db.session.add(user)
+    db.session.commit()
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def queries_for(app, url):
+    """Statements issued by one warm request (principal and hierarchy snapshot already loaded)."""
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {app.config['TEST_TOKEN']}"}
+    assert client.get(url, headers=headers).status_code == 200
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("url", LISTING_ENDPOINTS)
+def test_listing_query_count_is_independent_of_row_count(app, url):
+    with app.app_context():
+        seed(3)
+    small = queries_for(app, url)
+
+    with app.app_context():
+        seed(30)
+    large = queries_for(app, url)
+
+    assert large == small, f"{url}: {small} queries with few rows, {large} with many"